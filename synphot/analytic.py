@@ -7,6 +7,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 # STDLIB
 import abc
+from math import erf, factorial
 
 # THIRD-PARTY
 import numpy as np
@@ -19,13 +20,16 @@ from astropy.extern import six
 
 # LOCAL
 from . import exceptions, planck, spectrum, units, utils
+from .metadata import Provenance
 
 
 __all__ = ['BaseMixinAnalytic', 'MixinAnalyticPassband',
            'MixinAnalyticFlamSource', 'MixinAnalyticSource',
            'BlackBody1D', 'class_factory', 'Box1DSpectrum',
            'Const1DSpectrum', 'Gaussian1DSpectrum', 'PowerLaw1DSpectrum',
-           'BlackBody1DSpectrum', 'flat_spectrum', 'gaussian_spectrum']
+           'BlackBody1DSpectrum', 'SummedCompositeSpectrum',
+           'SerialCompositeSpectrum', 'SerialCompositePassband',
+           'flat_spectrum', 'gaussian_spectrum', 'band_integral']
 
 
 @six.add_metaclass(abc.ABCMeta)
@@ -35,8 +39,9 @@ class BaseMixinAnalytic(object):
 
     .. note::
 
-        Math operators will be inherited from `astropy.modeling`
-        for use to create composite model.
+        Addition and multiplication create lazily evaluated composites,
+        i.e., `SummedCompositeSpectrum`, `SerialCompositeSpectrum`,
+        or `SerialCompositePassband`.
 
     Parameters
     ----------
@@ -85,6 +90,15 @@ class BaseMixinAnalytic(object):
         """Flux/throughput unit of the spectrum/passband."""
         return self._flux_unit
 
+    def __add__(self, other):
+        return SummedCompositeSpectrum(self, other)
+
+    def __mul__(self, other):
+        return _serial_composite(self, other)
+
+    def __rmul__(self, other):
+        return _serial_composite(other, self)
+
     @property
     def wave_unit(self):
         """Wavelength unit of the spectrum/passband."""
@@ -149,6 +163,15 @@ class BaseMixinAnalytic(object):
         resampled_result = self(wavelengths.value)
         return u.Quantity(resampled_result, unit=self.flux_unit)
 
+    def _get_expr_template(self):
+        """Format string for individual parameter set, with one
+        argument per parameter. See :func:`_get_expr`.
+
+        """
+        return '{0}({1})'.format(self.__class__.__name__, ','.join(
+            ['{0}={{{1}}}'.format(name, i)
+             for i, name in enumerate(self.param_names)]))
+
     def _get_expr(self, i_pset=0):
         """A hack on :func:`astropy.modeling.core.Model.__repr__`
         to return string for individual parameter set for use
@@ -167,17 +190,80 @@ class BaseMixinAnalytic(object):
         expr : str
 
         """
-        n_par = len(self.param_names)
-        fmt = '{0}('.format(self.__class__.__name__)
-        for i in xrange(n_par):
-            fmt += '{0}={1}'.format(
-                self.param_names[i], getattr(self, self.param_names[i])[i_pset])
-            if i < n_par - 1:
-                fmt += ','
-        fmt += ')'
-        return fmt
-
-    def to_spectrum(self, wavelengths):
+        return self._get_expr_template().format(
+            *[getattr(self, name)[i_pset] for name in self.param_names])
+
+    def _get_exprs(self):
+        """Descriptive strings of all parameter sets, which are
+        only formatted when needed.
+
+        Returns
+        -------
+        exprs : list of `~synphot.metadata.Provenance`
+
+        """
+        template = self._get_expr_template()
+        values = [getattr(self, name) for name in self.param_names]
+        return [Provenance(template, *[v[i] for v in values])
+                for i in xrange(self.param_dim)]
+
+    def adaptive_wavelengths(self, wavelengths=None, rtol=1e-4, **kwargs):
+        """Generate wavelengths that sample the model to the given
+        relative integration error using
+        :func:`synphot.utils.adaptive_wavelengths`.
+
+        The grid is only refined where the model is curved. Known
+        discontinuities and features of the model are always included,
+        e.g., `Box1DSpectrum` only needs 4 wavelengths.
+
+        Parameters
+        ----------
+        wavelengths : array_like, `astropy.units.quantity.Quantity`, or `None`
+            Only their minimum and maximum are used, as the wavelength
+            range. If not a Quantity, assumed to be in
+            ``self.wave_unit``. If `None`, the extent of the model is
+            used, which is only defined for `Box1DSpectrum` and
+            `Gaussian1DSpectrum` (within 10 sigma).
+
+        rtol : float
+            Relative integration error.
+
+        kwargs : dict
+            Keywords accepted by :func:`synphot.utils.adaptive_wavelengths`,
+            except ``breakpoints``.
+
+        Returns
+        -------
+        waveset : `astropy.units.quantity.Quantity`
+            Wavelengths in ``self.wave_unit``.
+
+        Raises
+        ------
+        synphot.exceptions.SynphotError
+            Wavelength range is needed but not given, or invalid inputs.
+
+        """
+        breakpoints, support = _breakpoints(self)
+
+        if wavelengths is None:
+            if support is None:
+                raise exceptions.SynphotError(
+                    'Wavelength range is needed for {0}.'.format(
+                        self.__class__.__name__))
+            minwave, maxwave = support
+        else:
+            wavelengths = units.validate_quantity(
+                wavelengths, self.wave_unit, equivalencies=u.spectral())
+            minwave = wavelengths.value.min()
+            maxwave = wavelengths.value.max()
+
+        waveset = utils.adaptive_wavelengths(
+            self, minwave, maxwave, rtol=rtol, breakpoints=breakpoints,
+            **kwargs)
+
+        return u.Quantity(waveset, unit=self.wave_unit)
+
+    def to_spectrum(self, wavelengths=None, batch=False, rtol=None):
         """Generate spectrum object(s).
 
         `astropy.modeling` supports defining a single model with
@@ -188,22 +274,56 @@ class BaseMixinAnalytic(object):
         Parameters
         ----------
         wavelengths
-            See :func:`sample`.
+            See :func:`sample`. If ``rtol`` is given, only the range
+            of the wavelengths is used, and can be `None`; see
+            :func:`adaptive_wavelengths`.
+
+        batch : bool
+            If `True`, return all parameter sets as one
+            `~synphot.spectrum.SpectrumBatch`, with fluxes sampled
+            into a 2D array on the shared wavelengths.
+
+        rtol : float or `None`
+            If given, sample at wavelengths from
+            :func:`adaptive_wavelengths` with this relative
+            integration error, instead of the given wavelengths.
 
         Returns
         -------
-        newspec : `~synphot.spectrum.SourceSpectrum` or `~synphot.spectrum.SpectralElement` or tuple
+        newspec : `~synphot.spectrum.SourceSpectrum` or `~synphot.spectrum.SpectralElement` or tuple or `~synphot.spectrum.SpectrumBatch`
             Sampled spectrum/spectra from analytic model.
 
+        Raises
+        ------
+        synphot.exceptions.SynphotError
+            No wavelengths for sampling.
+
         """
+        if rtol is not None:
+            wavelengths = self.adaptive_wavelengths(wavelengths, rtol=rtol)
+        elif wavelengths is None:
+            raise exceptions.SynphotError('No wavelengths for sampling.')
+
         flux = self.sample(wavelengths)
 
-        if self.param_dim > 1:
+        if batch:
+            if self.param_dim > 1:
+                flux = flux.T
+                exprs = self._get_exprs()
+            else:
+                flux = flux.reshape((1, flux.size))
+                exprs = [repr(self)]
+
+            specs = spectrum.SpectrumBatch(
+                self._spec_cls, wavelengths, flux, area=self.primary_area,
+                exprs=exprs)
+
+        elif self.param_dim > 1:
             flux = flux.T
             specs = tuple(
                 [self._spec_cls(wavelengths, flux[i], area=self.primary_area,
-                                header={'expr': self._get_expr(i_pset=i)})
-                 for i in xrange(self.param_dim)])
+                                header={'expr': expr})
+                 for i, expr in enumerate(self._get_exprs())])
         else:
             specs = self._spec_cls(
                 wavelengths, flux, area=self.primary_area,
@@ -232,6 +352,78 @@ class MixinAnalyticPassband(BaseMixinAnalytic):
 
         super(MixinAnalyticPassband, self).__init__(*args, **kwargs)
 
+    def _moment(self, power):
+        """Integral of throughput times wavelength to the given power,
+        in Angstrom, without sampling.
+
+        Raises
+        ------
+        synphot.exceptions.SynphotError
+            No closed form for this passband.
+
+        """
+        result = _band_integral(None, self, units.THROUGHPUT, power)
+
+        if result is None:
+            raise exceptions.SynphotError(
+                'No closed form for {0}, use to_spectrum() and the '
+                'corresponding SpectralElement method.'.format(
+                    self.__class__.__name__))
+
+        return result
+
+    def equivwidth(self):
+        """Calculate :ref:`passband equivalent width
+        <synphot-formula-equvw>` without sampling.
+
+        Returns
+        -------
+        equvw : `astropy.units.quantity.Quantity`
+            Passband equivalent width in Angstrom.
+
+        Raises
+        ------
+        synphot.exceptions.SynphotError
+            No closed form for this passband.
+
+        """
+        return u.Quantity(self._moment(0), unit=u.AA)
+
+    def avgwave(self):
+        """Calculate :ref:`passband average wavelength
+        <synphot-formula-avgwv>` without sampling.
+
+        Returns
+        -------
+        avg_wave : `astropy.units.quantity.Quantity`
+            Passband average wavelength in Angstrom.
+
+        Raises
+        ------
+        synphot.exceptions.SynphotError
+            No closed form for this passband.
+
+        """
+        return u.Quantity(self._moment(1) / self._moment(0), unit=u.AA)
+
+    def pivot(self):
+        """Calculate :ref:`passband pivot wavelength
+        <synphot-formula-pivwv>` without sampling.
+
+        Returns
+        -------
+        pivwv : `astropy.units.quantity.Quantity`
+            Passband pivot wavelength in Angstrom.
+
+        Raises
+        ------
+        synphot.exceptions.SynphotError
+            No closed form for this passband.
+
+        """
+        return u.Quantity(
+            np.sqrt(self._moment(1) / self._moment(-1)), unit=u.AA)
+
 
 class MixinAnalyticFlamSource(BaseMixinAnalytic):
     """Like `MixinAnalyticPassband` but for source spectrum
@@ -322,11 +514,10 @@ class BlackBody1D(modeling.Parametric1DModel):
             Blackbody radiation in FLAM.
 
         """
-        wave = u.Quantity(np.ascontiguousarray(x), unit=u.AA)
-        t = u.Quantity(temperature, unit=u.K)
-        bbflux = planck.bb_photlam(wave, t)
-        fluxes = bbflux.to(units.FLAM, equivalencies=u.spectral_density(wave))
-        return fluxes.value
+        wave = np.ascontiguousarray(x, dtype=np.float64)
+        bbflux = planck._bb_photlam_values(wave, temperature)
+        kernel = units.get_conversion_kernel(units.PHOTLAM, units.FLAM)
+        return kernel(wave, bbflux)
 
     def deriv(self, x, temperature):
         raise NotImplementedError(
@@ -404,14 +595,616 @@ PowerLaw1DSpectrum = class_factory(
     MixinAnalyticSource, modeling.models.PowerLaw1D)
 PowerLaw1DSpectrum.__doc__ += 'See :ref:`power-law spectrum <synphot-powerlaw>`.'
 
-#-----------------------------------------------------------------------------#
-# Generate analytic composite source spectrum with modeling behavior.         #
-#                                                                             #
-# These are not exactly what synphot wants. They do x + model1(x) + model2(x) #
-# and not model1(x) + model2(x). Nadia will implement something else.         #
-#-----------------------------------------------------------------------------#
-#SummedCompositeSpectrum = class_factory(MixinAnalyticSource, modeling.SummedCompositeModel)
-#SerialCompositeSpectrum = class_factory(MixinAnalyticSource, modeling.SerialCompositeModel)
+
+class BaseCompositeAnalytic(BaseMixinAnalytic):
+    """Base class to handle lazily evaluated composite of analytic
+    spectra or passbands. Do not use directly.
+
+    Composites of `astropy.modeling` do not do what synphot wants
+    (e.g., they do ``x + model1(x) + model2(x)``), so they are
+    implemented here. Components are not sampled until the composite
+    is, i.e., only once on the final wavelengths, where each component
+    evaluates all of its parameter sets in one call. Nested
+    composites of the same operation are flattened.
+
+    Parameters
+    ----------
+    components : tuple
+        Analytic spectra, passbands, or composites. Numbers are
+        also allowed for multiplication.
+
+    kwargs : dict
+        Keywords below are accepted:
+            * ``flux_unit`` - Output flux unit of a composite source
+              spectrum. Components are converted to it. Defaults to
+              the flux unit of the first source component.
+            * ``area`` - Defaults to the first defined component area.
+
+    Raises
+    ------
+    synphot.exceptions.IncompatibleSources
+        Invalid components.
+
+    """
+    _op_str = None
+
+    def __init__(self, *components, **kwargs):
+        flat_components = []
+        for comp in components:
+            if isinstance(comp, self._flatten_cls):
+                flat_components += comp.components
+            else:
+                flat_components.append(comp)
+
+        self._components = tuple(flat_components)
+        models = self._validate_components()
+
+        dims = set([comp.param_dim for comp in models]) - set([1])
+        if len(dims) > 1:
+            raise exceptions.IncompatibleSources(
+                'Components have different numbers of parameter sets: '
+                '{0}'.format(sorted(dims)))
+        self._param_dim = dims.pop() if dims else 1
+
+        if self._spec_cls is spectrum.SourceSpectrum:
+            sources = [comp for comp in models
+                       if comp._spec_cls is spectrum.SourceSpectrum]
+            self.flux_unit = kwargs.get('flux_unit', sources[0].flux_unit)
+            if units.validate_unit(self.flux_unit).decompose() == u.mag:
+                raise exceptions.IncompatibleSources(
+                    'Composite flux unit cannot be in magnitudes.')
+
+        areas = [comp.primary_area for comp in models
+                 if comp.primary_area is not None]
+        self._wave_unit = models[0].wave_unit
+        self.primary_area = kwargs.get('area', areas[0] if areas else None)
+
+    @property
+    def components(self):
+        """Components of the composite."""
+        return list(self._components)
+
+    @property
+    def param_dim(self):
+        """Number of parameter sets, which is 1 or the number for
+        components with multiple sets.
+
+        """
+        return self._param_dim
+
+    def _models(self):
+        """Components that are not numbers."""
+        return [comp for comp in self._components
+                if isinstance(comp, BaseMixinAnalytic)]
+
+    def _validate_components(self):
+        """Check components and return those that are not numbers."""
+        raise NotImplementedError('To be implemented by subclass.')
+
+    def __repr__(self):
+        return '({0})'.format(' {0} '.format(self._op_str).join(
+            [repr(comp) for comp in self._components]))
+
+    def _get_exprs(self):
+        """Descriptive strings of all parameter sets, which are
+        only formatted when needed.
+
+        Returns
+        -------
+        exprs : list of `~synphot.metadata.Provenance`
+
+        """
+        template = '({0})'.format(' {0} '.format(self._op_str).join(
+            ['{{{0}}}'.format(i) for i in xrange(len(self._components))]))
+        comp_exprs = []
+
+        for comp in self._components:
+            if isinstance(comp, BaseMixinAnalytic) and comp.param_dim > 1:
+                comp_exprs.append(comp._get_exprs())
+            else:
+                comp_exprs.append([repr(comp)] * self.param_dim)
+
+        return [Provenance(template, *[exprs[i] for exprs in comp_exprs])
+                for i in xrange(self.param_dim)]
+
+    def _combine(self, result, values):
+        """Combine evaluated components."""
+        raise NotImplementedError('To be implemented by subclass.')
+
+    def __call__(self, x):
+        """Evaluate all components at given wavelengths and
+        combine them.
+
+        Parameters
+        ----------
+        x : array_like
+            Wavelength values in ``self.wave_unit``.
+
+        Returns
+        -------
+        y : array_like
+            Combined values in ``self.flux_unit``, with a column
+            per parameter set if there are multiple sets.
+
+        """
+        x = np.asarray(x, dtype=np.float64)
+        wave_unit = u.Unit(self.wave_unit)
+        out_unit = units.validate_unit(self.flux_unit)
+        wave_aa = None
+        result = None
+
+        for comp in self._models():
+            comp_wave_unit = u.Unit(comp.wave_unit)
+            if comp_wave_unit == wave_unit:
+                comp_x = x
+            else:
+                comp_x = wave_unit.to(
+                    comp_wave_unit, x, equivalencies=u.spectral())
+
+            values = np.asarray(comp(comp_x), dtype=np.float64)
+            if self.param_dim > 1 and values.ndim == x.ndim:
+                values = values[..., np.newaxis]
+
+            # Flux conversion only depends on wavelengths
+            comp_unit = units.validate_unit(comp.flux_unit)
+            if comp_unit != units.THROUGHPUT and comp_unit != out_unit:
+                kernel = units.get_conversion_kernel(comp_unit, out_unit)
+                if kernel is None:
+                    raise exceptions.IncompatibleSources(
+                        'Cannot convert {0} to {1} in composite.'.format(
+                            comp_unit, out_unit))
+                if wave_aa is None:
+                    wave_aa = wave_unit.to(u.AA, x, equivalencies=u.spectral())
+                    if self.param_dim > 1:
+                        wave_aa = wave_aa[..., np.newaxis]
+                values = kernel(wave_aa, values)
+
+            result = values if result is None else self._combine(
+                result, values)
+
+        return result
+
+
+class SummedCompositeSpectrum(BaseCompositeAnalytic, MixinAnalyticSource):
+    """Class to handle sum of analytic source spectra, e.g.,
+    ``bb + gauss``. See `BaseCompositeAnalytic`.
+
+    Components with different flux units are converted to
+    ``flux_unit`` before they are added.
+
+    """
+    _op_str = '+'
+
+    def __init__(self, *components, **kwargs):
+        self._spec_cls = spectrum.SourceSpectrum
+        super(SummedCompositeSpectrum, self).__init__(*components, **kwargs)
+
+    @property
+    def _flatten_cls(self):
+        return SummedCompositeSpectrum
+
+    def _validate_components(self):
+        """Check components and return those that are not numbers."""
+        for comp in self._components:
+            if (not isinstance(comp, BaseMixinAnalytic) or
+                    comp._spec_cls is not spectrum.SourceSpectrum):
+                raise exceptions.IncompatibleSources(
+                    'Only analytic source spectra can be added, '
+                    'got {0}'.format(comp.__class__.__name__))
+        return self._models()
+
+    def _combine(self, result, values):
+        return result + values
+
+
+class _BaseSerialComposite(BaseCompositeAnalytic):
+    """Product of analytic spectra/passbands and numbers.
+    Do not use directly, see `_serial_composite`.
+
+    """
+    _op_str = '*'
+
+    @property
+    def _flatten_cls(self):
+        return _BaseSerialComposite
+
+    def _validate_components(self):
+        """Check components and return those that are not numbers."""
+        n_sources = 0
+
+        for comp in self._components:
+            if isinstance(comp, BaseMixinAnalytic):
+                if comp._spec_cls is spectrum.SourceSpectrum:
+                    n_sources += 1
+            elif not isinstance(comp, (int, long, float)):
+                raise exceptions.IncompatibleSources(
+                    'Cannot multiply with {0}'.format(
+                        comp.__class__.__name__))
+
+        if n_sources > 1:
+            raise exceptions.IncompatibleSources(
+                'Source spectra cannot be multiplied together.')
+
+        models = self._models()
+        if len(models) == 0:  # pragma: no cover
+            raise exceptions.IncompatibleSources('No analytic component.')
+
+        return models
+
+    def _combine(self, result, values):
+        return result * values
+
+    def __call__(self, x):
+        """Evaluate components and multiply them, including numbers.
+        See :func:`BaseCompositeAnalytic.__call__`.
+
+        """
+        result = super(_BaseSerialComposite, self).__call__(x)
+
+        for comp in self._components:
+            if not isinstance(comp, BaseMixinAnalytic):
+                result = result * comp
+
+        return result
+
+
+class SerialCompositeSpectrum(_BaseSerialComposite, MixinAnalyticSource):
+    """Class to handle analytic source spectrum multiplied by
+    analytic passbands and numbers, e.g., ``bb * box * 2``.
+    See `BaseCompositeAnalytic`.
+
+    """
+    def __init__(self, *components, **kwargs):
+        self._spec_cls = spectrum.SourceSpectrum
+        super(SerialCompositeSpectrum, self).__init__(*components, **kwargs)
+
+
+class SerialCompositePassband(_BaseSerialComposite, MixinAnalyticPassband):
+    """Class to handle product of analytic passbands and numbers,
+    e.g., ``box1 * box2``. See `BaseCompositeAnalytic`.
+
+    """
+    def __init__(self, *components, **kwargs):
+        self._spec_cls = spectrum.SpectralElement
+        self._flux_unit = units.THROUGHPUT
+        super(SerialCompositePassband, self).__init__(*components, **kwargs)
+
+
+def _serial_composite(*components):
+    """Multiply analytic components, where the result is a source
+    spectrum if any component is.
+
+    """
+    for comp in components:
+        if isinstance(comp, _BaseSerialComposite):
+            comps = comp.components
+        else:
+            comps = [comp]
+        for c in comps:
+            if (isinstance(c, BaseMixinAnalytic) and
+                    c._spec_cls is spectrum.SourceSpectrum):
+                return SerialCompositeSpectrum(*components)
+
+    return SerialCompositePassband(*components)
+
+
+# Box edges are sampled at this fraction of the width on each side,
+# see _breakpoints()
+_BOX_EDGE = 1e-8
+
+# Wien displacement constant in Angstrom * Kelvin
+_WIEN_B = 2.8977721e7
+
+
+def _breakpoints(model):
+    """Wavelengths that adaptive sampling of a model must include,
+    and its extent, in the wavelength unit of the model.
+
+    Returns
+    -------
+    breakpoints : array_like or `None`
+
+    support : tuple of float or `None`
+        Minimum and maximum wavelengths, if the model has
+        a finite extent.
+
+    """
+    if isinstance(model, BaseCompositeAnalytic):
+        return _composite_breakpoints(model)
+
+    elif isinstance(model, modeling.models.Box1D):
+        x_0 = _param(model, 'x_0')
+        half_width = 0.5 * np.abs(_param(model, 'width'))
+        # Trapezoid integral of the sampled box is exact, regardless of
+        # whether the edges are considered inside or outside.
+        edge = 2 * half_width * _BOX_EDGE
+        breakpoints = np.array([x_0 - half_width - edge,
+                                x_0 - half_width + edge,
+                                x_0 + half_width - edge,
+                                x_0 + half_width + edge])
+
+    elif isinstance(model, modeling.models.Gaussian1D):
+        nsigma = np.array([-10, -3, -1, 0, 1, 3, 10], dtype=np.float64)
+        breakpoints = (_param(model, 'mean')[..., np.newaxis] +
+                       _param(model, 'stddev')[..., np.newaxis] * nsigma)
+
+    elif isinstance(model, modeling.models.PowerLaw1D):
+        return _param(model, 'x_0').ravel(), None
+
+    # Around the peak of Planck law
+    elif isinstance(model, BlackBody1D):
+        peak = _WIEN_B / _param(model, 'temperature')[..., np.newaxis]
+        return (peak * np.array([0.5, 1, 2])).ravel(), None
+
+    else:
+        return None, None
+
+    breakpoints = breakpoints[breakpoints > 0].ravel()
+    if breakpoints.size == 0:
+        return None, None
+
+    return breakpoints, (breakpoints.min(), breakpoints.max())
+
+
+def _composite_breakpoints(model):
+    """Like :func:`_breakpoints` but for composite model, where
+    breakpoints of all components are used. Sum extends over all
+    components, while product is limited to their overlap.
+
+    """
+    wave_unit = u.Unit(model.wave_unit)
+    all_points = []
+    supports = []
+    is_infinite = False
+
+    for comp in model._models():
+        points, support = _breakpoints(comp)
+        comp_wave_unit = u.Unit(comp.wave_unit)
+
+        if comp_wave_unit != wave_unit:
+            if points is not None:
+                points = comp_wave_unit.to(
+                    wave_unit, points, equivalencies=u.spectral())
+            if support is not None:
+                support = sorted(comp_wave_unit.to(
+                    wave_unit, np.array(support), equivalencies=u.spectral()))
+
+        if points is not None:
+            all_points.append(points)
+
+        if support is None:
+            is_infinite = True
+        else:
+            supports.append(support)
+
+    if all_points:
+        all_points = np.concatenate(all_points)
+    else:
+        all_points = None
+
+    if isinstance(model, SummedCompositeSpectrum):
+        if is_infinite or not supports:
+            support = None
+        else:
+            support = (min([w[0] for w in supports]),
+                       max([w[1] for w in supports]))
+    elif supports:
+        support = (max([w[0] for w in supports]),
+                   min([w[1] for w in supports]))
+    else:
+        support = None
+
+    return all_points, support
+
+
+# Element-wise error function, without depending on SciPy
+_erf = np.vectorize(erf, otypes=[np.float64])
+
+
+def _param(model, name):
+    """Parameter values of a model as float array, with one value
+    per parameter set.
+
+    """
+    return np.asarray(getattr(model, name), dtype=np.float64).squeeze()
+
+
+def _power_integral(x1, x2, power):
+    """Integral of :math:`x^{p}` from ``x1`` to ``x2``, where ``x1 > 0``."""
+    power = np.asarray(power, dtype=np.float64)
+    is_log = np.abs(power + 1) < 1e-12
+    p1 = np.where(is_log, 1.0, power + 1)
+
+    return np.where(is_log, np.log(x2 / x1), (x2 ** p1 - x1 ** p1) / p1)
+
+
+def _gaussian_integral(x1, x2, amplitude, mean, stddev, power):
+    """Integral of :math:`x^{p}` times a Gaussian from ``x1`` to ``x2``.
+
+    Moments about the mean follow from the recurrence
+    :math:`J_{n} = (n-1) \\sigma^{2} J_{n-2} -
+    \\sigma^{2} [t^{n-1} g(t)]_{t_1}^{t_2}`, starting from the
+    error function for :math:`J_{0}`. Moments about zero are then
+    their binomial sum.
+
+    """
+    t1 = x1 - mean
+    t2 = x2 - mean
+    s2 = stddev * stddev
+    g1 = amplitude * np.exp(-0.5 * t1 * t1 / s2)
+    g2 = amplitude * np.exp(-0.5 * t2 * t2 / s2)
+    sqrt2s = np.sqrt(2.0) * stddev
+
+    moments = [amplitude * stddev * np.sqrt(0.5 * np.pi) *
+               (_erf(t2 / sqrt2s) - _erf(t1 / sqrt2s))]
+    for n in xrange(1, power + 1):
+        j_n = -s2 * (t2 ** (n - 1) * g2 - t1 ** (n - 1) * g1)
+        if n > 1:
+            j_n = j_n + (n - 1) * s2 * moments[n - 2]
+        moments.append(j_n)
+
+    return sum([factorial(power) // (factorial(k) * factorial(power - k)) *
+                mean ** (power - k) * moments[k] for k in xrange(power + 1)])
+
+
+def _source_integral(spec, x1, x2, power):
+    """Integral of :math:`f(x) x^{p}` from ``x1`` to ``x2``
+    in the native units of the model, or `None` if there is no
+    closed form. ``spec=None`` means :math:`f(x) = 1`.
+
+    """
+    if spec is None:
+        return _power_integral(x1, x2, power)
+
+    if isinstance(spec, modeling.models.Const1D):
+        return _param(spec, 'amplitude') * _power_integral(x1, x2, power)
+
+    if isinstance(spec, modeling.models.PowerLaw1D):
+        x_0 = _param(spec, 'x_0')
+        alpha = _param(spec, 'alpha')
+        return (_param(spec, 'amplitude') * x_0 ** alpha *
+                _power_integral(x1, x2, power - alpha))
+
+    if isinstance(spec, modeling.models.Gaussian1D):
+        if power < 0 or power != int(power):
+            return None
+        return _gaussian_integral(
+            x1, x2, _param(spec, 'amplitude'), _param(spec, 'mean'),
+            _param(spec, 'stddev'), int(power))
+
+    # Blackbody in FLAM is PHOTLAM * HC / wave, with wave in Angstrom
+    if isinstance(spec, BlackBody1D):
+        if power > 3 or power != int(power):
+            return None
+        return (units.HC.value * planck._DEFAULT_SOLID_ANGLE *
+                planck._bb_integral_values(
+                    x1, x2, _param(spec, 'temperature'), int(power) - 1))
+
+    return None
+
+
+def _band_integral(spec, band, flux_unit, wave_power, wave_range=None):
+    """Like :func:`band_integral` but returns `None` if there is
+    no closed form. If ``spec`` is `None`, throughput is integrated
+    instead, where ``flux_unit`` must be THROUGHPUT. If ``wave_range``
+    is given as ``(min, max)`` in Angstrom, only the part of the
+    passband within it is integrated.
+
+    """
+    if not isinstance(band, modeling.models.Box1D):
+        return None
+
+    # Integral of sum is sum of integrals
+    if isinstance(spec, SummedCompositeSpectrum):
+        results = [_band_integral(comp, band, flux_unit, wave_power,
+                                  wave_range=wave_range)
+                   for comp in spec.components]
+        if any([r is None for r in results]):
+            return None
+        return sum(results)
+
+    if spec is None:
+        in_unit = units.THROUGHPUT
+        wave_unit = band.wave_unit
+    else:
+        in_unit = units.validate_unit(spec.flux_unit)
+        wave_unit = spec.wave_unit
+
+    # Flux conversion from model to output unit must only depend on
+    # wavelength in Angstrom, i.e., out = scale * wave**power * in.
+    if in_unit == units.THROUGHPUT or flux_unit == units.THROUGHPUT:
+        if in_unit != flux_unit:
+            return None
+        scale, power = 1.0, 0
+    else:
+        in_rel = units._photlam_relation(in_unit, in_unit.to_string())
+        out_rel = units._photlam_relation(flux_unit, flux_unit.to_string())
+        if (in_rel is None or out_rel is None or in_rel[2] is not None or
+                out_rel[2] is not None):
+            return None
+        scale = out_rel[0] / in_rel[0]
+        power = out_rel[1] - in_rel[1]
+
+    # Integrate in model wavelength unit, which must be a length
+    try:
+        to_aa = u.Unit(wave_unit).to(u.AA)
+        band_to_model = u.Unit(band.wave_unit).to(wave_unit)
+    except u.UnitsError:
+        return None
+
+    # Box limits in model wavelength unit. Only positive
+    # wavelengths contribute.
+    x_0 = _param(band, 'x_0') * band_to_model
+    half_width = 0.5 * np.abs(_param(band, 'width')) * band_to_model
+    x1 = np.maximum(x_0 - half_width, np.finfo(np.float64).tiny)
+    x2 = np.maximum(x_0 + half_width, x1)
+    if wave_range is not None:
+        x1 = np.clip(x1, wave_range[0] / to_aa, wave_range[1] / to_aa)
+        x2 = np.clip(x2, x1, wave_range[1] / to_aa)
+
+    power = power + wave_power
+    result = _source_integral(spec, x1, x2, power)
+    if result is None:
+        return None
+
+    return scale * _param(band, 'amplitude') * to_aa ** (power + 1) * result
+
+
+def band_integral(spec, band, flux_unit=units.PHOTLAM, wave_power=0):
+    """Integrate analytic source spectrum through analytic passband
+    without sampling, i.e.,
+    :math:`\\int f(\\lambda) T(\\lambda) \\lambda^{p} d\\lambda`
+    with :math:`\\lambda` in Angstrom.
+
+    Closed forms are available for `Box1DSpectrum` passband with
+    `Const1DSpectrum` and `PowerLaw1DSpectrum` (power law),
+    `Gaussian1DSpectrum` (error function), or `BlackBody1DSpectrum`
+    (series expansion of Planck law) source spectrum. The latter two
+    only support some integer values of :math:`p`.
+
+    Parameters
+    ----------
+    spec : `MixinAnalyticFlamSource` or `MixinAnalyticSource`
+        Analytic source spectrum.
+
+    band : `MixinAnalyticPassband`
+        Analytic passband.
+
+    flux_unit : str or `astropy.units.core.Unit`
+        Flux unit for integration. It must be convertible from
+        the flux unit of ``spec`` using wavelengths alone.
+        Default is PHOTLAM.
+
+    wave_power : number
+        Power of wavelength, :math:`p`, in the integrand.
+        Default is 0.
+
+    Returns
+    -------
+    result : `astropy.units.quantity.Quantity`
+        Integrated result, with one value per parameter set.
+
+    Raises
+    ------
+    synphot.exceptions.SynphotError
+        No closed form is available for the given inputs.
+
+    """
+    if not isinstance(spec, (MixinAnalyticFlamSource, MixinAnalyticSource)):
+        raise exceptions.SynphotError('Invalid source spectrum')
+    if not isinstance(band, MixinAnalyticPassband):
+        raise exceptions.SynphotError('Invalid passband')
+
+    flux_unit = units.validate_unit(flux_unit)
+    result = _band_integral(spec, band, flux_unit, wave_power)
+
+    if result is None:
+        raise exceptions.SynphotError(
+            'No closed form for {0} through {1} in {2}'.format(
+                spec.__class__.__name__, band.__class__.__name__,
+                flux_unit))
+
+    return u.Quantity(result, unit=flux_unit * u.AA ** (wave_power + 1))
 
 
 def flat_spectrum(flux_unit, wave_unit=u.AA, area=None):
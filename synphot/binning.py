@@ -1,13 +1,16 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 """Utilities related to wavelength bin calculations.
 
-Also imports this C-extension to local namespace:
+Bin fluxes are summed by this C-extension, if available:
 
     - :ref:`calcbinflux(len_binwave, i_beg, i_end, avflux, deltaw) <synphot-c-ext>`
 
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+# STDLIB
+from multiprocessing.pool import ThreadPool
+
 # THIRD-PARTY
 import numpy as np
 
@@ -23,42 +26,202 @@ __all__ = ['calcbinflux', 'calculate_bin_edges', 'calculate_bin_widths',
            'calculate_bin_centers', 'wave_range', 'pixel_range']
 
 
-def _slow_calcbinflux(len_binwave, i_beg, i_end, avflux, deltaw):
-    """Python implementation of ``calcbinflux``.
+def _numpy_calcbinflux(len_binwave, i_beg, i_end, avflux, deltaw):
+    """NumPy implementation of ``calcbinflux``.
 
     This is only used if ``synphot.synphot_utils`` C-extension
     import fails.
 
+    This loops over either the bins or the position within a bin,
+    whichever needs fewer Python iterations. In the latter case,
+    the value at each position is added to all the bins long enough
+    to have it at once. Either way, the sums are done in the same
+    order as the C-extension, with identical results.
+
     See docstrings.py
 
     """
-    binflux = np.empty(shape=(len_binwave, ), dtype=np.float64)
-    intwave = np.empty(shape=(len_binwave, ), dtype=np.float64)
-
-    # Note that, like all Python striding, the range over which
-    # we integrate is [first:last).
-    for i in xrange(len(i_beg)):
-        first = i_beg[i]
-        last = i_end[i]
-        cur_dw = deltaw[first:last]
-        intwave[i] = cur_dw.sum()
-        binflux[i] = np.sum(avflux[first:last] * cur_dw) / intwave[i]
+    i_beg = np.asarray(i_beg, dtype=np.int64)
+    i_end = np.asarray(i_end, dtype=np.int64)
+    avflux = np.asarray(avflux, dtype=np.float64)
+    deltaw = np.asarray(deltaw, dtype=np.float64)
+
+    if i_beg.shape != (len_binwave, ) or i_end.shape != (len_binwave, ):
+        raise ValueError('i_beg and i_end must have len_binwave values.')
+    if avflux.ndim not in (1, 2) or deltaw.ndim != 1:
+        raise ValueError('avflux must be 1D or 2D and deltaw must be 1D.')
+    if avflux.shape[-1] != deltaw.size:
+        raise ValueError(
+            'avflux and deltaw must have the same number of values.')
+
+    lengths = i_end - i_beg
+    if np.any(i_beg < 0) or np.any(lengths < 0) or np.any(i_end > deltaw.size):
+        raise IndexError('Bin indices out of range in calcbinflux.')
+
+    binflux = np.zeros(shape=avflux.shape[:-1] + (len_binwave, ),
+                       dtype=np.float64)
+    intwave = np.zeros(shape=(len_binwave, ), dtype=np.float64)
+
+    maxlen = lengths.max() if len_binwave > 0 else 0
+
+    # Few wide bins: loop over bins. Sequential cumsum, unlike sum,
+    # adds values in the same order as the C-extension.
+    if len_binwave < maxlen:
+        for i in xrange(len_binwave):
+            if lengths[i] == 0:
+                continue
+            cur_dw = deltaw[i_beg[i]:i_end[i]]
+            intwave[i] = np.cumsum(cur_dw)[-1]
+            binflux[..., i] = np.cumsum(
+                avflux[..., i_beg[i]:i_end[i]] * cur_dw, axis=-1)[..., -1]
+
+    # Many narrow bins: loop over position within a bin. Widest bins
+    # first, so the bins that still have values at a given position
+    # are always the first ones.
+    else:
+        order = np.argsort(-lengths, kind='mergesort')
+        neg_lengths = -lengths[order]
+        first = i_beg[order]
+
+        for j in xrange(maxlen):
+            n = neg_lengths.searchsorted(-j, side='left')
+            ibin = order[:n]
+            iwave = first[:n] + j
+            cur_dw = deltaw[iwave]
+            intwave[ibin] += cur_dw
+            binflux[..., ibin] += avflux[..., iwave] * cur_dw
+
+    if np.any(intwave == 0):
+        raise ZeroDivisionError('Division by zero in calcbinflux.')
+
+    binflux /= intwave
 
     return binflux, intwave
 
 
 # Try to import the C version of calcbinflux, otherwise fall back
-# to the Python implementation above.
+# to the NumPy implementation above.
 try:
     from . import synphot_utils
 except ImportError:
-    calcbinflux = _slow_calcbinflux
-    log.warn('synphot_utils import failed, using Python implementation')
+    _calcbinflux = _numpy_calcbinflux
+    log.warn('synphot_utils import failed, using NumPy implementation')
 else:
-    calcbinflux = synphot_utils.calcbinflux
+    _calcbinflux = synphot_utils.calcbinflux
+
+
+def calcbinflux(len_binwave, i_beg, i_end, avflux, deltaw, nthreads=1):
+    """Sum over each bin, for one or more flux arrays.
+
+    This calls the ``synphot.synphot_utils`` C-extension, which
+    releases the GIL, so rows of ``avflux`` can be split across
+    threads. If the C-extension is not available, a NumPy
+    implementation with identical results is used instead.
+
+    Parameters
+    ----------
+    len_binwave : int
+        Number of wavelength bin centers.
+
+    i_beg, i_end : array_like
+        Locations of bin edges in ``deltaw``.
+
+    avflux : array_like
+        Average flux associated with ``deltaw``. If 2D, each row
+        is a separate spectrum sampled at the same wavelengths.
+
+    deltaw : array_like
+        Delta of merge wavelengths (native + centers + edges).
+        Values are in ascending order.
+
+    nthreads : int
+        Number of threads to split the rows of a 2D ``avflux`` over.
+
+    Returns
+    -------
+    binflux : array_like
+        Integrated flux associated with given bins in ascending order.
+        It is 2D, with one row per spectrum, if ``avflux`` is 2D.
+
+    intwave : array_like
+        Integrated delta wavelength associated with ``binflux``.
+
+    """
+    i_beg = np.asarray(i_beg, dtype=np.int64)
+    i_end = np.asarray(i_end, dtype=np.int64)
+    avflux = np.asarray(avflux, dtype=np.float64)
+    deltaw = np.asarray(deltaw, dtype=np.float64)
+
+    if avflux.ndim < 2:
+        nthreads = 1
+    else:
+        nthreads = max(min(int(nthreads), avflux.shape[0]), 1)
+
+    if nthreads == 1:
+        return _calcbinflux(len_binwave, i_beg, i_end, avflux, deltaw)
+
+    bounds = np.linspace(0, avflux.shape[0], nthreads + 1).astype(np.intp)
 
+    def _calc_rows(k):
+        return _calcbinflux(len_binwave, i_beg, i_end,
+                            avflux[bounds[k]:bounds[k + 1]], deltaw)
 
-def calculate_bin_edges(centers):
+    pool = ThreadPool(nthreads)
+    try:
+        results = pool.map(_calc_rows, range(nthreads))
+    finally:
+        pool.close()
+        pool.join()
+
+    binflux = np.concatenate([r[0] for r in results])
+
+    return binflux, results[0][1]
+
+
+def _validate_bin_input(arr, name):
+    """Return values and unit of 1D bin centers or edges.
+
+    If not a Quantity, values are assumed to be in Angstrom.
+
+    """
+    if isinstance(arr, u.Quantity):
+        unit = arr.unit
+        values = np.asarray(arr.value, dtype=np.float64)
+    else:
+        unit = u.AA
+        values = np.asarray(arr, dtype=np.float64)
+
+    if values.ndim != 1:
+        raise exceptions.SynphotError('Bin {0} must be 1D array.'.format(name))
+
+    if values.size < 2:
+        raise exceptions.SynphotError(
+            'Bin {0} must have at least two values.'.format(name))
+
+    return values, unit
+
+
+def _validate_out(out, size):
+    """Return output buffer of given size, allocating it if needed."""
+    if out is None:
+        return np.empty(size, dtype=np.float64)
+
+    if (not isinstance(out, np.ndarray) or isinstance(out, u.Quantity) or
+            out.dtype != np.float64 or out.shape != (size, )):
+        raise exceptions.SynphotError(
+            'out must be a float64 array of shape ({0},).'.format(size))
+
+    return out
+
+
+def _wrap_output(values, unit, as_quantity):
+    """Return output values as Quantity without copying, if requested."""
+    if as_quantity:
+        return u.Quantity(values, unit=unit, copy=False)
+    return values
+
+
+def calculate_bin_edges(centers, out=None, as_quantity=True):
     """Calculate the edges of wavelength bins given the centers.
 
     The algorithm calculates bin edges as the midpoints between bin centers
@@ -70,9 +233,17 @@ def calculate_bin_edges(centers):
         Sequence of bin centers. Must be 1D and have at least two values.
         If not a Quantity, assumed to be in Angstrom.
 
+    out : `numpy.ndarray` or `None`
+        Float64 array with one more value than ``centers``
+        to store the results in. If `None`, a new array is allocated.
+
+    as_quantity : bool
+        If `False`, return a plain array in the unit of ``centers``
+        instead of a Quantity.
+
     Returns
     -------
-    edges : `astropy.units.quantity.Quantity`
+    edges : `astropy.units.quantity.Quantity` or `numpy.ndarray`
         Array of bin edges. Will be 1D, have one more value
         than ``centers``, and also the same unit.
 
@@ -82,27 +253,20 @@ def calculate_bin_edges(centers):
         If input is invalid.
 
     """
-    if not isinstance(centers, u.Quantity):
-        centers = u.Quantity(centers, unit=u.AA)
-
-    if centers.ndim != 1:
-        raise exceptions.SynphotError('Bin centers must be 1D array.')
-
-    if centers.size < 2:
-        raise exceptions.SynphotError(
-            'Bin centers must have at least two values.')
+    centers, unit = _validate_bin_input(centers, 'centers')
+    edges = _validate_out(out, centers.size + 1)
 
-    edges = np.empty(centers.size + 1, dtype=np.float64)
-    edges[1:-1] = (centers.value[1:] + centers.value[:-1]) * 0.5
+    np.add(centers[1:], centers[:-1], out=edges[1:-1])
+    edges[1:-1] *= 0.5
 
     # Compute the first and last by making them symmetric
-    edges[0] = 2.0 * centers.value[0] - edges[1]
-    edges[-1] = 2.0 * centers.value[-1] - edges[-2]
+    edges[0] = 2.0 * centers[0] - edges[1]
+    edges[-1] = 2.0 * centers[-1] - edges[-2]
 
-    return u.Quantity(edges, unit=centers.unit)
+    return _wrap_output(edges, unit, as_quantity)
 
 
-def calculate_bin_widths(edges):
+def calculate_bin_widths(edges, out=None, as_quantity=True):
     """Calculate the widths of wavelengths bins given their edges.
 
     Parameters
@@ -111,9 +275,17 @@ def calculate_bin_widths(edges):
         Sequence of bin edges. Must be 1D and have at least two values.
         If not a Quantity, assumed to be in Angstrom.
 
+    out : `numpy.ndarray` or `None`
+        Float64 array with one less value than ``edges``
+        to store the results in. If `None`, a new array is allocated.
+
+    as_quantity : bool
+        If `False`, return a plain array in the unit of ``edges``
+        instead of a Quantity.
+
     Returns
     -------
-    widths : `astropy.units.quantity.Quantity`
+    widths : `astropy.units.quantity.Quantity` or `numpy.ndarray`
         Array of bin widths. Will be 1D, have one less value
         than ``edges``, and also the same unit.
 
@@ -123,31 +295,44 @@ def calculate_bin_widths(edges):
         If input is invalid.
 
     """
-    if not isinstance(edges, u.Quantity):
-        edges = u.Quantity(edges, unit=u.AA)
+    edges, unit = _validate_bin_input(edges, 'edges')
+    widths = _validate_out(out, edges.size - 1)
 
-    if edges.ndim != 1:
-        raise exceptions.SynphotError('Bin edges must be 1D array.')
-
-    if edges.size < 2:
-        raise exceptions.SynphotError(
-            'Bin edges must have at least two values.')
+    np.subtract(edges[1:], edges[:-1], out=widths)
+    np.abs(widths, out=widths)
 
-    return np.abs(edges[1:] - edges[:-1])
+    return _wrap_output(widths, unit, as_quantity)
 
 
-def calculate_bin_centers(edges):
+def calculate_bin_centers(edges, out=None, as_quantity=True):
     """Calculate the centers of wavelengths bins given their edges.
 
+    The first center is the midpoint of the first bin, and each
+    following bin is symmetric about its center, i.e.,
+    :math:`c_{i} = 2 e_{i} - c_{i-1}`. This recurrence is solved
+    in closed form as an alternating cumulative sum of bin widths,
+    :math:`c_{i} = e_{i} + (-1)^{i} (w_{0} / 2 +
+    \\sum_{k=1}^{i} (-1)^{k} w_{k-1})`, where
+    :math:`w_{k} = e_{k+1} - e_{k}`. Summing widths instead of edges
+    keeps the rounding errors small.
+
     Parameters
     ----------
     edges : array_like or `astropy.units.quantity.Quantity`
         Sequence of bin edges. Must be 1D and have at least two values.
         If not a Quantity, assumed to be in Angstrom.
 
+    out : `numpy.ndarray` or `None`
+        Float64 array with one less value than ``edges``
+        to store the results in. If `None`, a new array is allocated.
+
+    as_quantity : bool
+        If `False`, return a plain array in the unit of ``edges``
+        instead of a Quantity.
+
     Returns
     -------
-    centers : `astropy.units.quantity.Quantity`
+    centers : `astropy.units.quantity.Quantity` or `numpy.ndarray`
         Array of bin centers. Will be 1D, have one less value
         than ``edges``, and also the same unit.
 
@@ -157,39 +342,67 @@ def calculate_bin_centers(edges):
         If input is invalid.
 
     """
-    if not isinstance(edges, u.Quantity):
-        edges = u.Quantity(edges, unit=u.AA)
+    edges, unit = _validate_bin_input(edges, 'edges')
+    centers = _validate_out(out, edges.size - 1)
 
-    if edges.ndim != 1:
-        raise exceptions.SynphotError('Bin edges must be 1D array.')
+    # Alternating signs, (-1)^i
+    signs = np.ones(centers.size, dtype=np.float64)
+    signs[1::2] = -1.0
 
-    if edges.size < 2:
+    # centers is used as scratch space for signed cumulative sum
+    np.subtract(edges[1:], edges[:-1], out=centers)
+    centers[1:] = centers[:-1] * signs[1:]
+    centers[0] *= 0.5
+    np.cumsum(centers, out=centers)
+    centers *= signs
+    centers += edges[:-1]
+
+    return _wrap_output(centers, unit, as_quantity)
+
+
+def _validate_bins_mode(bins, mode):
+    """Check mode and return bin centers in ascending order, with
+    virtual bins added at both ends such that the first and last
+    bins are symmetric about their centers."""
+    mode = mode.lower()
+
+    if mode not in ('round', 'min', 'max', 'none'):
         raise exceptions.SynphotError(
-            'Bin edges must have at least two values.')
+            'mode={0} is invalid, must be "round", "min", "max", '
+            'or "none".'.format(mode))
 
-    centers = np.empty(edges.size - 1, dtype=np.float64)
-    centers[0] = edges.value[:2].mean()
+    bins = np.asarray(bins, dtype=np.float64)
 
-    for i in xrange(1, centers.size):
-        centers[i] = 2.0 * edges.value[i] - centers[i - 1]
+    # Bin values must be in ascending order.
+    if bins[0] > bins[-1]:
+        bins = bins[::-1]
+
+    ext_bins = np.empty(bins.size + 2, dtype=np.float64)
+    ext_bins[1:-1] = bins
+    ext_bins[0] = bins[0] - (bins[1] - bins[0])
+    ext_bins[-1] = bins[-1] + (bins[-1] - bins[-2])
 
-    return u.Quantity(centers, unit=edges.unit)
+    return bins, ext_bins, mode
 
 
 def wave_range(bins, cenwave, npix, mode='round'):
     """Calculate the wavelength range covered by the given number of pixels
     centered on the given central wavelength of the given bins.
 
+    Many ranges can be calculated at once by giving arrays of
+    ``cenwave`` and/or ``npix``, which are broadcast against each
+    other.
+
     Parameters
     ----------
     bins : array_like
         Wavelengths at bin centers, each centered on a pixel.
         Must be 1D array.
 
-    cenwave : float
+    cenwave : float or array_like
         Desired central wavelength, in the same unit as ``bins``.
 
-    npix : int
+    npix : int or array_like
         Desired number of pixels, centered on ``cenwave``.
 
     mode : {'round', 'min', 'max', 'none'}
@@ -216,49 +429,53 @@ def wave_range(bins, cenwave, npix, mode='round'):
 
     Returns
     -------
-    wave1, wave2 : float
-        Lower and upper limits of the wavelength range.
+    wave1, wave2 : float or array_like
+        Lower and upper limits of the wavelength range(s).
 
     Raises
     ------
     synphot.exceptions.OverlapError
-        If given central wavelength is not within the given bins
-        or the wavelength range would exceed the bin limits.
+        If any given central wavelength is not within the given bins
+        or any wavelength range would exceed the bin limits.
 
     synphot.exceptions.SynphotError
         Invalid inputs or calculation failed.
 
     """
-    mode = mode.lower()
-
-    if mode not in ('round', 'min', 'max', 'none'):
-        raise exceptions.SynphotError(
-            'mode={0} is invalid, must be "round", "min", "max", '
-            'or "none".'.format(mode))
+    bins, ext_bins, mode = _validate_bins_mode(bins, mode)
+    nbins = bins.size
 
-    if not isinstance(npix, (int, long)):
+    npix = np.asarray(npix)
+    if not issubclass(npix.dtype.type, np.integer):
         raise exceptions.SynphotError('npix={0} is invalid.'.format(npix))
 
-    # Bin values must be in ascending order.
-    if bins[0] > bins[-1]:
-        bins = bins[::-1]
+    cenwave, npix = np.broadcast_arrays(
+        np.asarray(cenwave, dtype=np.float64), npix)
+    is_scalar = cenwave.ndim == 0
+    cenwave = np.atleast_1d(cenwave)
+    npix = np.atleast_1d(npix)
 
     # Central wavelength must be within given bins.
-    if cenwave < bins[0] or cenwave > bins[-1]:
+    bad = (cenwave < bins[0]) | (cenwave > bins[-1])
+    if np.any(bad):
         raise exceptions.OverlapError(
             'cenwave={0} is not within binset (min={1}, max={2}).'.format(
-                cenwave, bins[0], bins[-1]))
-
-    # Find the index the central wavelength among bins
-    diff = cenwave - bins
-    ind = np.argmin(np.abs(diff))
-
-    # Calculate fractional index
-    frac_ind = float(ind)
-    if diff[ind] < 0:
-        frac_ind += diff[ind] / (bins[ind] - bins[ind - 1])
-    elif diff[ind] > 0:
-        frac_ind += diff[ind] / (bins[ind + 1] - bins[ind])
+                cenwave[bad][0], bins[0], bins[-1]))
+
+    # Find the index the central wavelength among bins,
+    # the lower one if it is halfway between two bins.
+    ind = bins.searchsorted(cenwave)
+    ind_lo = np.maximum(ind - 1, 0)
+    use_lo = np.abs(cenwave - bins[ind_lo]) <= np.abs(cenwave - bins[ind])
+    ind[use_lo] = ind_lo[use_lo]
+    diff = cenwave - bins[ind]
+
+    # Calculate fractional index, using virtual bins beyond the ends
+    frac_ind = ind.astype(np.float64)
+    neg = diff < 0
+    pos = diff > 0
+    frac_ind[neg] += diff[neg] / (bins[ind[neg]] - ext_bins[ind[neg]])
+    frac_ind[pos] += diff[pos] / (ext_bins[ind[pos] + 2] - bins[ind[pos]])
 
     # Calculate fractional indices of the edges
     half_npix = npix / 2.0
@@ -266,106 +483,87 @@ def wave_range(bins, cenwave, npix, mode='round'):
     frac_ind2 = frac_ind + half_npix
 
     # Calculated edges must not exceed bin edges
-    if frac_ind1 < -0.5:
+    if np.any(frac_ind1 < -0.5):
         raise exceptions.OverlapError(
             'Lower limit of wavelength range is out of bounds.')
-    if frac_ind2 > (bins.size - 0.5):
+    if np.any(frac_ind2 > (nbins - 0.5)):
         raise exceptions.OverlapError(
             'Upper limit of wavelength range is out of bounds.')
 
     frac1, int1 = np.modf(frac_ind1)
     frac2, int2 = np.modf(frac_ind2)
+    int1 = int1.astype(np.intp)
+    int2 = int2.astype(np.intp)
+
+    def _edge(i):
+        """Edge between bins i and i+1, where -1 and nbins are
+        the virtual bins."""
+        return (ext_bins[i + 1] + ext_bins[i + 2]) / 2.0
 
-    if mode != 'none':
-        int1 = int(int1)
-        int2 = int(int2)
+    # Pixel edges at both ends, symmetric about first and last bins
+    min_edge = bins[0] - (_edge(0) - bins[0])
+    max_edge = bins[-1] + (bins[-1] - _edge(nbins - 2))
 
     if mode == 'round':
-        # Lower end of wavelength range
-        if frac1 >= 0:
-            # end is somewhere greater than binset[0] so we can just
-            # interpolate between two neighboring values going with upper edge
-            wave1 = bins[int1:int1+2].mean()
-        else:
-            # end is below the lowest binset value, but not by enough to
-            # trigger an exception
-            wave1 = bins[0] - (bins[0:2].mean() - bins[0])
-
-        # Upper end of wavelength range
-        if int2 < bins.shape[0] - 1:
-            # end is somewhere below binset[-1] so we can just interpolate
-            # between two neighboring values, going with the upper edge.
-            wave2 = bins[int2:int2+2].mean()
-        else:
-            # end is above highest binset value but not by enough to
-            # trigger an exception
-            wave2 = bins[-1] + (bins[-1] - bins[-2:].mean())
+        # Lower end of wavelength range: if it is below binset[0],
+        # it is not by enough to trigger an exception.
+        wave1 = np.where(frac1 >= 0, _edge(int1), min_edge)
+
+        # Upper end of wavelength range: if it is above binset[-1],
+        # it is not by enough to trigger an exception.
+        wave2 = np.where(int2 < nbins - 1, _edge(np.minimum(int2, nbins - 2)),
+                         max_edge)
 
     elif mode == 'min':
-        # Lower end of wavelength range
-        if frac1 <= 0.5 and int1 < bins.shape[0] - 1:
-            # not at the lowest possible edge and pixel i included
-            wave1 = bins[int1:int1+2].mean()
-        elif frac1 > 0.5 and int1 < bins.shape[0] - 2:
-            # not at the lowest possible edge and pixel i not included
-            wave1 = bins[int1+1:int1+3].mean()
-        elif frac1 == -0.5:
-            # at the lowest possible edge
-            wave1 = bins[0] - (bins[0:2].mean() - bins[0])
-        else:  # pragma: no cover
-            raise exceptions.SynphotError(
-                'mode={0} gets unexpected frac1={1}, int1={2}'.format(
-                    mode, frac1, int1))
-
-        # Upper end of wavelength range
-        if frac2 >= 0.5 and int2 < bins.shape[0] - 1:
-            # not out at the end and pixel i included
-            wave2 = bins[int2:int2+2].mean()
-        elif frac2 < 0.5 and int2 < bins.shape[0]:
-            # not out at end and pixel i not included
-            wave2 = bins[int2-1:int2+1].mean()
-        elif frac2 == 0.5 and int2 == bins.shape[0] - 1:
-            # at the very end
-            wave2 = bins[-1] + (bins[-1] - bins[-2:].mean())
-        else:  # pragma: no cover
-            raise exceptions.SynphotError(
-                'mode={0} gets unexpected frac2={1}, int2={2}'.format(
-                    mode, frac2, int2))
+        # Lower end of wavelength range: at the lowest possible edge,
+        # pixel i included, or pixel i not included.
+        wave1 = np.select(
+            [frac1 == -0.5, (frac1 <= 0.5) & (int1 < nbins - 1),
+             (frac1 > 0.5) & (int1 < nbins - 2)],
+            [min_edge, _edge(np.minimum(int1, nbins - 2)),
+             _edge(np.minimum(int1 + 1, nbins - 2))], np.nan)
+
+        # Upper end of wavelength range: pixel i included,
+        # pixel i not included, or at the very end.
+        wave2 = np.select(
+            [(frac2 >= 0.5) & (int2 < nbins - 1), (frac2 < 0.5) & (int2 < nbins),
+             (frac2 == 0.5) & (int2 == nbins - 1)],
+            [_edge(np.minimum(int2, nbins - 2)),
+             _edge(np.clip(int2 - 1, -1, nbins - 2)), max_edge], np.nan)
 
     elif mode == 'max':
-        # Lower end of wavelength range
-        if frac1 < 0.5 and int1 < bins.shape[0]:
-            # not at the lowest possible edge and pixel i included
-            wave1 = bins[int1-1:int1+1].mean()
-        elif frac1 >= 0.5 and int1 < bins.shape[0] - 1:
-            # not at the lowest possible edge and pixel i not included
-            wave1 = bins[int1:int1+2].mean()
-        elif frac1 == -0.5:
-            # at the lowest possible edge
-            wave1 = bins[0] - (bins[0:2].mean() - bins[0])
-        else:  # pragma: no cover
-            raise exceptions.SynphotError(
-                'mode={0} gets unexpected frac1={1}, int1={2}'.format(
-                    mode, frac1, int1))
-
-        # Upper end of wavelength range
-        if frac2 > 0.5 and int2 < bins.shape[0] - 2:
-            # not out at the end and pixel i included
-            wave2 = bins[int2+1:int2+3].mean()
-        elif frac2 <= 0.5 and int2 < bins.shape[0] - 1:
-            # not out at end and pixel i not included
-            wave2 = bins[int2:int2+2].mean()
-        elif frac2 == 0.5 and int2 == bins.shape[0] - 1:
-            # at the very end
-            wave2 = bins[-1] + (bins[-1] - bins[-2:].mean())
-        else:  # pragma: no cover
-            raise exceptions.SynphotError(
-                'mode={0} gets unexpected frac2={1}, int2={2}'.format(
-                    mode, frac2, int2))
+        # Lower end of wavelength range: at the lowest possible edge,
+        # pixel i included, or pixel i not included.
+        wave1 = np.select(
+            [frac1 == -0.5, (frac1 < 0.5) & (int1 < nbins),
+             (frac1 >= 0.5) & (int1 < nbins - 1)],
+            [min_edge, _edge(np.clip(int1 - 1, -1, nbins - 2)),
+             _edge(np.minimum(int1, nbins - 2))], np.nan)
+
+        # Upper end of wavelength range: pixel i included,
+        # pixel i not included, or at the very end.
+        wave2 = np.select(
+            [(frac2 > 0.5) & (int2 < nbins - 2),
+             (frac2 <= 0.5) & (int2 < nbins - 1),
+             (frac2 == 0.5) & (int2 == nbins - 1)],
+            [_edge(np.minimum(int2 + 1, nbins - 2)),
+             _edge(np.minimum(int2, nbins - 2)), max_edge], np.nan)
 
     else:  # mode == 'none'
-        wave1 = bins[int1] + frac1 * (bins[int1 + 1] - bins[int1])
-        wave2 = bins[int2] + frac2 * (bins[int2 + 1] - bins[int2])
+        # Interpolate between neighboring bins, or extrapolate from
+        # the virtual bins beyond the ends.
+        wave1 = ext_bins[int1 + 1] + frac1 * (
+            ext_bins[int1 + 2] - ext_bins[int1 + 1])
+        wave2 = ext_bins[int2 + 1] + frac2 * (
+            ext_bins[int2 + 2] - ext_bins[int2 + 1])
+
+    if np.any(np.isnan(wave1)) or np.any(np.isnan(wave2)):  # pragma: no cover
+        raise exceptions.SynphotError(
+            'mode={0} gets unexpected fractional indices'.format(mode))
+
+    if is_scalar:
+        wave1 = float(wave1[0])
+        wave2 = float(wave2[0])
 
     return wave1, wave2
 
@@ -374,15 +572,19 @@ def pixel_range(bins, waverange, mode='round'):
     """Calculate the number of pixels within the given wavelength range
     and the given bins.
 
+    Many ranges can be calculated at once by giving an array of
+    shape ``(K, 2)``.
+
     Parameters
     ----------
     bins : array_like
         Wavelengths at bin centers, each centered on a pixel.
         Must be 1D array.
 
-    waverange : tuple of float
+    waverange : tuple of float or array_like
         Lower and upper limits of the desired wavelength range,
-        in the same unit as ``bins``.
+        in the same unit as ``bins``. For many ranges, each row
+        of a 2D array is a range.
 
     mode : {'round', 'min', 'max', 'none'}
         Determines how the pixels at the edges of the wavelength range
@@ -406,53 +608,44 @@ def pixel_range(bins, waverange, mode='round'):
 
     Returns
     -------
-    npix : number
-        Number of pixels.
+    npix : number or array_like
+        Number of pixels, one per range for 2D ``waverange``.
 
     Raises
     ------
     synphot.exceptions.OverlapError
-        If given wavelength range exceeds the bounds of given bins.
+        If any given wavelength range exceeds the bounds of given bins.
 
     synphot.exceptions.SynphotError
         Invalid mode.
 
     """
-    mode = mode.lower()
-
-    if mode not in ('round', 'min', 'max', 'none'):
-        raise exceptions.SynphotError(
-            'mode={0} is invalid, must be "round", "min", "max", '
-            'or "none".'.format(mode))
+    bins, ext_bins, mode = _validate_bins_mode(bins, mode)
 
-    if waverange[0] < waverange[-1]:
-        wave1 = waverange[0]
-        wave2 = waverange[-1]
-    else:
-        wave1 = waverange[-1]
-        wave2 = waverange[0]
-
-    # Bin values must be in ascending order.
-    if bins[0] > bins[-1]:
-        bins = bins[::-1]
+    waverange = np.asarray(waverange, dtype=np.float64)
+    is_scalar = waverange.ndim == 1
+    waverange = np.atleast_2d(waverange)
+    wave1 = np.minimum(waverange[:, 0], waverange[:, -1])
+    wave2 = np.maximum(waverange[:, 0], waverange[:, -1])
 
     # Wavelength range must be within bins
     minwave = bins[0] - (bins[0:2].mean() - bins[0])
     maxwave = bins[-1] + (bins[-1] - bins[-2:].mean())
-    if wave1 < minwave or wave2 > maxwave:
+    bad = (wave1 < minwave) | (wave2 > maxwave)
+    if np.any(bad):
         raise exceptions.OverlapError(
             'Wavelength range ({0}, {1}) is out of bounds of bins '
-            '(min={2}, max={3}).'.format(wave1, wave2, minwave, maxwave))
-
-    if wave1 == wave2:
-        return 0
+            '(min={2}, max={3}).'.format(
+                wave1[bad][0], wave2[bad][0], minwave, maxwave))
 
     if mode == 'round':
-        ind1 = bins.searchsorted(wave1, side='right')
-        ind2 = bins.searchsorted(wave2, side='right')
+        side = 'right'
     else:
-        ind1 = bins.searchsorted(wave1, side='left')
-        ind2 = bins.searchsorted(wave2, side='left')
+        side = 'left'
+
+    # Indices of bins in ext_bins, which has a virtual bin at each end
+    ind1 = bins.searchsorted(wave1, side=side) + 1
+    ind2 = bins.searchsorted(wave2, side=side) + 1
 
     if mode == 'round':
         npix = ind2 - ind1
@@ -460,39 +653,47 @@ def pixel_range(bins, waverange, mode='round'):
     elif mode == 'min':
         # for ind1, figure out if pixel ind1 is wholly included or not.
         # do this by figuring out where wave1 is between ind1 and ind1-1.
-        frac = (bins[ind1] - wave1) / (bins[ind1] - bins[ind1-1])
-        if frac < 0.5:
-            # ind1 is only partially included
-            ind1 += 1
+        frac = ((ext_bins[ind1] - wave1) /
+                (ext_bins[ind1] - ext_bins[ind1 - 1]))
+        # ind1 is only partially included
+        ind1 = ind1 + (frac < 0.5)
 
         # similar but reversed procedure for ind2
-        frac = (wave2 - bins[ind2-1]) / (bins[ind2] - bins[ind2-1])
-        if frac < 0.5:
-            # ind2 is only partially included
-            ind2 -= 1
+        frac = ((wave2 - ext_bins[ind2 - 1]) /
+                (ext_bins[ind2] - ext_bins[ind2 - 1]))
+        # ind2 is only partially included
+        ind2 = ind2 - (frac < 0.5)
 
-        npix = ind2 - ind1
+        # range within a single pixel that is not wholly included
+        npix = np.maximum(ind2 - ind1, 0)
 
     elif mode == 'max':
         # for ind1, figure out if pixel ind1-1 is partially included or not.
         # do this by figuring out where wave1 is between ind1 and ind1-1.
-        frac = (wave1 - bins[ind1-1]) / (bins[ind1] - bins[ind1-1])
-        if frac < 0.5:
-            # ind1 is partially included
-            ind1 -= 1
+        frac = ((wave1 - ext_bins[ind1 - 1]) /
+                (ext_bins[ind1] - ext_bins[ind1 - 1]))
+        # ind1 is partially included
+        ind1 = ind1 - (frac < 0.5)
 
         # similar but reversed procedure for ind2
-        frac = (bins[ind2] - wave2) / (bins[ind2] - bins[ind2-1])
-        if frac < 0.5:
-            # ind2 is partially included
-            ind2 += 1
+        frac = ((ext_bins[ind2] - wave2) /
+                (ext_bins[ind2] - ext_bins[ind2 - 1]))
+        # ind2 is partially included
+        ind2 = ind2 + (frac < 0.5)
 
         npix = ind2 - ind1
 
     else:  # mode == 'none'
         # calculate fractional indices
-        frac1 = ind1 - (bins[ind1] - wave1) / (bins[ind1] - bins[ind1-1])
-        frac2 = ind2 - (bins[ind2] - wave2) / (bins[ind2] - bins[ind2-1])
+        frac1 = ind1 - ((ext_bins[ind1] - wave1) /
+                        (ext_bins[ind1] - ext_bins[ind1 - 1]))
+        frac2 = ind2 - ((ext_bins[ind2] - wave2) /
+                        (ext_bins[ind2] - ext_bins[ind2 - 1]))
         npix = frac2 - frac1
 
+    npix = np.where(wave1 == wave2, 0, npix)
+
+    if is_scalar:
+        npix = npix[0]
+
     return npix
@@ -18,7 +18,8 @@ from astropy.config.configuration import ConfigurationItem
 __all__ = ['STDSTAR_DIR', 'VEGA_FILE', 'EXTINCTION_DIR', 'LMC30DOR_FILE',
            'LMCAVG_FILE', 'MWAVG_FILE', 'MWDENSE_FILE', 'MWRV21_FILE',
            'MWRV40_FILE', 'SMCBAR_FILE', 'XGAL_FILE', 'PASSBAND_DIR',
-           'BESSEL_H_FILE', 'BESSEL_J_FILE', 'BESSEL_K_FILE', 'set_files']
+           'BESSEL_H_FILE', 'BESSEL_J_FILE', 'BESSEL_K_FILE', 'FLUX_PRECISION',
+           'VEGA_ZPT_FILE', 'set_files']
 
 # STANDARD STARS
 STDSTAR_DIR = ConfigurationItem(
@@ -68,6 +69,16 @@ JOHNSON_R_FILE = ConfigurationItem('johnson_r_file', '', 'Johnson R')
 JOHNSON_U_FILE = ConfigurationItem('johnson_u_file', '', 'Johnson U')
 JOHNSON_V_FILE = ConfigurationItem('johnson_v_file', '', 'Johnson V')
 
+# COMPUTATION
+FLUX_PRECISION = ConfigurationItem(
+    'flux_precision', ['double', 'single'],
+    'Default precision of flux and throughput values. Wavelengths and '
+    'integrations always use double precision.')
+VEGA_ZPT_FILE = ConfigurationItem(
+    'vega_zpt_file', '',
+    'JSON file of Vega zero points. If not set, it is stored in Astropy '
+    'cache directory. Set to "none" to only keep them in memory.')
+
 
 def set_files():
     """Convenience function to update paths of configurable
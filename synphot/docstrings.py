@@ -12,7 +12,10 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 calcbinflux = """
 calcbinflux(len_binwave, i_beg, i_end, avflux, deltaw)
 
-Sum over each bin.
+Sum over each bin, for one or more flux arrays.
+
+The GIL is released while summing, so separate calls can run
+in parallel threads (see :func:`synphot.binning.calcbinflux`).
 
 Parameters
 ----------
@@ -21,9 +24,11 @@ len_binwave : int
 
 i_beg, i_end : array_like
     Locations of bin edges in ``deltaw``.
+    Each must have ``len_binwave`` values.
 
 avflux : array_like
-    Average flux associated with ``deltaw``.
+    Average flux associated with ``deltaw``. If 2D, each row
+    is a separate spectrum sampled at the same wavelengths.
 
 deltaw : array_like
     Delta of merge wavelengths (native + centers + edges).
@@ -33,8 +38,20 @@ Returns
 -------
 binflux : array_like
     Integrated flux associated with given bins in ascending order.
+    It is 2D, with one row per spectrum, if ``avflux`` is 2D.
 
 intwave : array_like
     Integrated delta wavelength associated with ``binflux``.
 
+Raises
+------
+ValueError
+    Inputs have inconsistent shapes.
+
+IndexError
+    Bin edge locations are out of range.
+
+ZeroDivisionError
+    A bin has zero width.
+
 """
@@ -0,0 +1,220 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""This module handles metadata and provenance of synphot objects.
+
+Metadata of a derived spectrum is layered on top of the metadata of
+its operands, which are referenced instead of copied. This keeps
+operations cheap even when the operands carry large FITS headers.
+
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+# STDLIB
+from collections import MutableMapping
+
+
+__all__ = ['Provenance', 'Metadata']
+
+
+class Provenance(object):
+    """Immutable expression node that describes how an object
+    was created.
+
+    Arguments may be other provenance nodes, so a chain of operations
+    shares the nodes of its operands instead of building a new string
+    at every step. The descriptive string is only rendered when
+    needed and then remembered.
+
+    Parameters
+    ----------
+    template : str
+        Format string, e.g., ``'{0} at z={1}'``.
+
+    args : tuple
+        Arguments for ``template``, usually other `Provenance`
+        or strings.
+
+    """
+    __slots__ = ('_template', '_args', '_rendered')
+
+    def __init__(self, template, *args):
+        self._template = template
+        self._args = args
+        self._rendered = None
+
+    @property
+    def template(self):
+        """Format string of the node."""
+        return self._template
+
+    @property
+    def args(self):
+        """Arguments of the node."""
+        return self._args
+
+    def __str__(self):
+        """Render the expression, avoiding recursion for long chains."""
+        if self._rendered is None:
+            stack = [self]
+
+            while stack:
+                node = stack[-1]
+
+                # Shared node already rendered through another path
+                if node._rendered is not None:
+                    stack.pop()
+                    continue
+
+                pending = []
+                for a in node._args:
+                    if (isinstance(a, Provenance) and a._rendered is None and
+                            all(a is not b for b in pending)):
+                        pending.append(a)
+                if pending:
+                    stack.extend(pending)
+                else:
+                    node._rendered = node._template.format(*[
+                        a._rendered if isinstance(a, Provenance) else a
+                        for a in node._args])
+                    stack.pop()
+
+        return self._rendered
+
+    def __repr__(self):
+        return '<{0}: {1}>'.format(self.__class__.__name__, str(self))
+
+    def __eq__(self, other):
+        return str(self) == str(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(str(self))
+
+
+class Metadata(MutableMapping):
+    """Dictionary-like metadata layered on top of parent mappings.
+
+    Lookups go through the object's own entries first, then the
+    parents in the given order. Parents are referenced, not copied,
+    and they are never modified; new values and deletions only
+    affect this object.
+
+    Values stored as `Provenance` are rendered into strings on
+    access. Use :meth:`get_raw` to obtain the node itself.
+
+    Parameters
+    ----------
+    data : dict, optional
+        Own entries. This is used as-is, not copied.
+
+    parents : tuple of dict, optional
+        Mappings to inherit from, with decreasing priority.
+
+    """
+    def __init__(self, data=None, parents=()):
+        if data is None:
+            data = {}
+
+        self._data = data
+        self._parents = tuple(parents)
+        self._hidden = set()
+
+    def _find(self, key):
+        """Return ``(True, raw_value)`` if key exists, else
+        ``(False, None)``. The search is done without recursion to
+        support long chains of operations. Parents shared by several
+        layers are only searched once.
+
+        """
+        stack = [self]
+        visited = set()
+
+        while stack:
+            node = stack.pop()
+
+            if id(node) in visited:
+                continue
+            visited.add(id(node))
+
+            if isinstance(node, Metadata):
+                if key in node._data:
+                    return True, node._data[key]
+                if key in node._hidden:
+                    continue
+                stack.extend(node._parents[::-1])
+            elif key in node:
+                return True, node[key]
+
+        return False, None
+
+    def get_raw(self, key, default=None):
+        """Like ``get()`` but `Provenance` is not rendered."""
+        found, val = self._find(key)
+        if not found:
+            val = default
+        return val
+
+    def __getitem__(self, key):
+        found, val = self._find(key)
+
+        if not found:
+            raise KeyError(key)
+
+        if isinstance(val, Provenance):
+            val = str(val)
+
+        return val
+
+    def __contains__(self, key):
+        return self._find(key)[0]
+
+    def __setitem__(self, key, val):
+        self._hidden.discard(key)
+        self._data[key] = val
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+
+        self._data.pop(key, None)
+        self._hidden.add(key)
+
+    def __iter__(self):
+        seen = set()
+        stack = [(self, frozenset())]
+
+        # Hidden keys each node was visited with. A shared parent is
+        # skipped if it was already visited with no more hidden keys,
+        # as that visit yielded all the keys this one would.
+        visited = {}
+
+        while stack:
+            node, hidden = stack.pop()
+
+            prev_hidden = visited.setdefault(id(node), [])
+            if any(h <= hidden for h in prev_hidden):
+                continue
+            prev_hidden.append(hidden)
+
+            if isinstance(node, Metadata):
+                keys = node._data
+                new_hidden = hidden | node._hidden
+                stack.extend((p, new_hidden) for p in node._parents[::-1])
+            else:
+                keys = node
+
+            for key in keys:
+                if key not in seen and key not in hidden:
+                    seen.add(key)
+                    yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return '{0}({1})'.format(self.__class__.__name__, dict(self.items()))
+
+    def copy(self):
+        """Return a new layer on top of this one."""
+        return self.__class__(parents=(self, ))
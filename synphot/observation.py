@@ -6,7 +6,7 @@ that has gone through a passband.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 # STDLIB
-from copy import deepcopy
+from copy import copy, deepcopy
 
 # THIRD-PARTY
 import numpy as np
@@ -16,10 +16,12 @@ from astropy import log
 from astropy import units as u
 
 # LOCAL
-from . import analytic, binning, spectrum, exceptions, specio, utils, units
+from . import (analytic, binning, spectrum, exceptions, specio, utils, units,
+               zeropoints)
+from .metadata import Provenance
 
 
-__all__ = ['Observation']
+__all__ = ['Observation', 'CompiledObservationMode']
 
 
 class Observation(spectrum.SourceSpectrum):
@@ -72,7 +74,7 @@ class Observation(spectrum.SourceSpectrum):
     primary_area : `astropy.units.quantity.Quantity` or `None`
         Area that flux covers in cm^2.
 
-    metadata : dict
+    metadata : `~synphot.metadata.Metadata`
         Metadata. ``self.metadata['expr']`` must contain a descriptive string of the object.
 
     warnings : dict
@@ -98,14 +100,27 @@ class Observation(spectrum.SourceSpectrum):
 
         if binwave is None:
             self.binwave = None
-            self.binflux = None
-            self.bin_edges = None
+            self._binned_from = None
+            self._binflux = None
+            self._bin_edges = None
         else:
             self.binspec(binwave)
 
         # This is set internally before calculations, as needed
         self._set_data(False)
 
+        # Analytic source spectrum and passband, if any, that were
+        # sampled to create this observation. See _analytic_effstim().
+        self._analytic = None
+
+        # Prefix sums for effstim of many wavelength ranges, built as
+        # needed. See _get_range_index().
+        self._range_index = {}
+
+        # Moments for avgwave(), barlam(), and effective_wavelength(),
+        # calculated as needed. See _get_moments().
+        self._moments = {}
+
     def binspec(self, binwave):
         """Set binning attributes based on given binned wavelength
         centers.
@@ -116,6 +131,11 @@ class Observation(spectrum.SourceSpectrum):
         Thus, it makes sense to interpolate ``self.wave`` and
         ``self.flux``, but not ``self.binwave`` and ``self.binflux``.
 
+        Only ``self.binwave`` is set here. ``self.bin_edges`` and
+        ``self.binflux`` are calculated from current native data when
+        they are first accessed, so calculations that only use native
+        data never pay for binning.
+
         Parameters
         ----------
         binwave : array_like or `astropy.units.quantity.Quantity`
@@ -134,11 +154,40 @@ class Observation(spectrum.SourceSpectrum):
             self.binwave = u.Quantity(
                 self.binwave.value[::-1], unit=self.binwave.unit)
 
-        self.bin_edges = binning.calculate_bin_edges(self.binwave)
+        # Native data to bin. Operations that change them replace
+        # these objects (or call this method again), so no copy is needed.
+        self._binned_from = (self.wave, self.flux)
+        self._binflux = None
+        self._bin_edges = None
+
+    @property
+    def bin_edges(self):
+        """Edges of the binned wavelengths, calculated on first access.
+        `None` if there is no binned data."""
+        if self._bin_edges is None and self.binwave is not None:
+            self._bin_edges = binning.calculate_bin_edges(self.binwave)
+        return self._bin_edges
+
+    @property
+    def binflux(self):
+        """Binned flux corresponding to ``self.binwave``, calculated on
+        first access. `None` if there is no binned data."""
+        if self._binflux is None and self.binwave is not None:
+            self._binflux = self._calc_binflux()
+        return self._binflux
+
+    @binflux.setter
+    def binflux(self, value):
+        self._binflux = value
+
+    def _calc_binflux(self):
+        """Bin the native data given to :func:`binspec`, in the flux
+        unit they had, and convert the result to current flux unit."""
+        wave, flux = self._binned_from
 
         # Merge bin edges and centers in with the natural waveset
         spwave = utils.merge_wavelengths(utils.merge_wavelengths(
-                self.wave.value, self.bin_edges.value), self.binwave.value)
+                wave.value, self.bin_edges.value), self.binwave.value)
 
         # Compute indices associated to each endpoint.
         indices = np.searchsorted(spwave, self.bin_edges.value)
@@ -146,15 +195,29 @@ class Observation(spectrum.SourceSpectrum):
         i_end = indices[1:]
 
         # Prepare integration variables.
-        flux = self.resample(spwave)
-        avflux = (flux.value[1:] + flux.value[:-1]) * 0.5
+        # This is resample() of the native data given to binspec().
+        wave_values = wave.value
+        flux_values = flux.value
+        if wave_values[0] > wave_values[-1]:
+            wave_values = wave_values[::-1]
+            flux_values = flux_values[::-1]
+        flux_values = self._cast_flux(u.Quantity(
+            np.interp(spwave, wave_values, flux_values),
+            unit=flux.unit)).value.astype(np.float64)
+        avflux = (flux_values[1:] + flux_values[:-1]) * 0.5
         deltaw = spwave[1:] - spwave[:-1]
 
         # Sum over each bin.
         binflux, intwave = binning.calcbinflux(
             self.binwave.size, i_beg, i_end, avflux, deltaw)
+        binflux = u.Quantity(binflux, unit=flux.unit)
+
+        if binflux.unit != self.flux.unit:
+            binflux = units.convert_flux(
+                self.binwave, binflux, self.flux.unit,
+                area=self.primary_area, vegaspec=None)
 
-        self.binflux = u.Quantity(binflux, unit=self.flux.unit)
+        return self._cast_flux(binflux)
 
     def _set_data(self, binned):
         """Set the data for calculations, either native or binned."""
@@ -186,6 +249,31 @@ class Observation(spectrum.SourceSpectrum):
         new_obs.binspec(self.binwave)
         return new_obs
 
+    def __iadd__(self, other):
+        raise NotImplementedError('Observations cannot be added.')
+
+    def __isub__(self, other):
+        raise NotImplementedError('Observations cannot be subtracted.')
+
+    def __imul__(self, other):
+        """Extends base class imul to handle binned data."""
+        new_obs = spectrum.BaseSpectrum.__imul__(self, other)
+        if new_obs is self and self.binwave is not None:
+            self.binspec(self.binwave)
+        return new_obs
+
+    def __itruediv__(self, other):
+        """Extends base class itruediv to handle binned data."""
+        new_obs = spectrum.BaseSpectrum.__itruediv__(self, other)
+        if new_obs is self and self.binwave is not None:
+            self.binspec(self.binwave)
+        return new_obs
+
+    def _clear_caches(self):
+        """Forget range indices and moments after in-place operation."""
+        self._range_index.clear()
+        self._moments.clear()
+
     def apply_redshift(self, z):
         raise NotImplementedError('Observations cannot be redshifted.')
 
@@ -202,13 +290,15 @@ class Observation(spectrum.SourceSpectrum):
 
         """
         self._validate_flux_unit(out_flux_unit)
-        self.flux = units.convert_flux(self.wave, self.flux, out_flux_unit,
-                                       area=self.primary_area, vegaspec=None)
+        self.flux = self._cast_flux(units.convert_flux(
+            self.wave, self.flux, out_flux_unit, area=self.primary_area,
+            vegaspec=None))
 
-        if self.binwave is not None and self.binflux is not None:
-            self.binflux = units.convert_flux(
-                self.binwave, self.binflux, out_flux_unit,
-                area=self.primary_area, vegaspec=None)
+        # Binned flux not calculated yet is converted when it is
+        if self.binwave is not None and self._binflux is not None:
+            self._binflux = self._cast_flux(units.convert_flux(
+                self.binwave, self._binflux, out_flux_unit,
+                area=self.primary_area, vegaspec=None))
 
         # Also update hidden attributes, just in case
         self._set_data(False)
@@ -241,16 +331,53 @@ class Observation(spectrum.SourceSpectrum):
         """
         self._set_data(True)  # Use binned data
 
-        # Convert wavelengths to self.binwave unit, and do validation
+        # Convert wavelengths to self.binwave unit
         wavelengths = units.validate_quantity(
             wavelengths, self._wave.unit, equivalencies=u.spectral())
-        utils.validate_wavelengths(wavelengths)
 
-        if not np.all(np.in1d(wavelengths, self._wave)):
+        return self._flux[self._binned_indices(wavelengths.value)]
+
+    def _binned_indices(self, wave):
+        """Indices of given wavelengths in ``self.binwave``.
+
+        ``self.binwave`` is always in ascending order, so each value
+        is looked up with a binary search and an exact comparison.
+        Given wavelengths must be valid and all in ``self.binwave``.
+        If they are, they are monotonic without duplicates exactly
+        when their indices are, so only the indices are checked.
+        Otherwise, the full validation is done to find out why.
+
+        Parameters
+        ----------
+        wave : number or array_like
+            Wavelength values in the unit of ``self.binwave``.
+
+        Returns
+        -------
+        indices : int or array_like
+            Indices of ``wave`` in ``self.binwave``.
+
+        Raises
+        ------
+        synphot.exceptions.InterpolationNotAllowed
+            Interpolation of binned data is not allowed.
+
+        """
+        binwave = self.binwave.value
+        wave = np.asarray(wave)
+        indices = np.clip(binwave.searchsorted(wave), 0, binwave.size - 1)
+        found = np.all(binwave[indices] == wave)
+
+        if found and indices.ndim > 0 and indices.size > 1:
+            dind = np.diff(indices)
+            found = np.all(dind > 0) or np.all(dind < 0)
+
+        if not found:
+            utils.validate_wavelengths(wave)
             raise exceptions.InterpolationNotAllowed(
                 'Given wavelengths are not in binwave attribute')
 
-        return self._flux[np.searchsorted(self._wave, wavelengths)]
+        return indices
 
     def wave_range(self, cenwave, npix, **kwargs):
         """Calculate the wavelength range covered by the given number
@@ -259,11 +386,11 @@ class Observation(spectrum.SourceSpectrum):
 
         Parameters
         ----------
-        cenwave : float or `astropy.units.quantity.Quantity`
-            Desired central wavelength. If not a Quantity,
+        cenwave : float, array_like, or `astropy.units.quantity.Quantity`
+            Desired central wavelength(s). If not a Quantity,
             assumed to be in the unit of ``self.binwave``.
 
-        npix : int
+        npix : int or array_like
             Desired number of pixels, centered on ``cenwave``.
 
         kwargs : dict
@@ -272,7 +399,7 @@ class Observation(spectrum.SourceSpectrum):
         Returns
         -------
         wave1, wave2 : `astropy.units.quantity.Quantity`
-            Lower and upper limits of the wavelength range,
+            Lower and upper limits of the wavelength range(s),
             in the unit of ``cenwave``.
 
         Raises
@@ -303,8 +430,9 @@ class Observation(spectrum.SourceSpectrum):
 
         Parameters
         ----------
-        waverange : tuple of float or `astropy.units.quantity.Quantity`
+        waverange : tuple of float, array_like, or `astropy.units.quantity.Quantity`
             Lower and upper limits of the desired wavelength range.
+            For many ranges, give an array of shape ``(K, 2)``.
             If not a Quantity, assumed to be in the same unit as
             ``self.binwave``.
 
@@ -313,8 +441,8 @@ class Observation(spectrum.SourceSpectrum):
 
         Returns
         -------
-        npix : number
-            Number of pixels.
+        npix : number or array_like
+            Number of pixels, one per range for many ranges.
 
         Raises
         ------
@@ -324,17 +452,95 @@ class Observation(spectrum.SourceSpectrum):
         """
         self._set_data(True)  # Use binned data
 
-        w1 = units.validate_quantity(
-            waverange[0], self._wave.unit, equivalencies=u.spectral())
-        w2 = units.validate_quantity(
-            waverange[-1], self._wave.unit, equivalencies=u.spectral())
+        if isinstance(waverange, u.Quantity):
+            waverange = units.validate_quantity(
+                waverange, self._wave.unit, equivalencies=u.spectral()).value
+        elif _is_many_ranges(waverange):
+            waverange = np.asarray(waverange, dtype=np.float64)
+        else:
+            w1 = units.validate_quantity(
+                waverange[0], self._wave.unit, equivalencies=u.spectral())
+            w2 = units.validate_quantity(
+                waverange[-1], self._wave.unit, equivalencies=u.spectral())
+            waverange = (w1.value, w2.value)
+
+        return binning.pixel_range(self._wave.value, waverange, **kwargs)
 
-        return binning.pixel_range(
-            self._wave.value, (w1.value, w2.value), **kwargs)
+    def _get_moments(self, binned, flux_unit=None):
+        """Spectral moments for :func:`avgwave`, :func:`barlam`, and
+        :func:`effective_wavelength`.
+
+        They are integrated together, in one pass over the data, and
+        cached until the data change (e.g., after :func:`convert_flux`).
+
+        Parameters
+        ----------
+        binned : bool
+            Use native or binned data.
+
+        flux_unit : `None` or `astropy.units.core.Unit`
+            Flux is converted to this unit first. If `None`, current
+            flux unit is used.
+
+        Returns
+        -------
+        moments : array_like
+            Trapezoid integrals of :math:`f`, :math:`\\lambda f`,
+            :math:`\\lambda^{2} f`, :math:`f / \\lambda`, and
+            :math:`f \\ln \\lambda / \\lambda`, where :math:`\\lambda`
+            is from :func:`synphot.utils.to_length`.
+
+        wave_unit : `astropy.units.core.Unit`
+            Unit of :math:`\\lambda`.
+
+        Raises
+        ------
+        synphot.exceptions.UndefinedBinset
+            Missing binned data.
+
+        """
+        self._set_data(binned)
+
+        if flux_unit is None:
+            flux_unit = self._flux.unit
+
+        key = (binned, flux_unit.to_string())
+        cached = self._moments.get(key)
+        if (cached is not None and cached[0][0] is self._wave and
+                cached[0][1] is self._flux):
+            return cached[1], cached[2]
+
+        if flux_unit == self._flux.unit:
+            flux = self._flux
+        else:
+            flux = units.convert_flux(
+                self._wave, self._flux, flux_unit, area=self.primary_area)
+
+        wave = utils.to_length(self._wave)
+        x = wave.value.astype(np.float64)
+
+        # Same as trapezoid_integration(), which is always positive
+        # for descending wavelengths.
+        weights = utils.trapezoid_weights(x)
+        if x[-1] < x[0]:
+            weights *= -1
+
+        terms = np.empty((5, x.size), dtype=np.float64)
+        terms[0] = flux.value
+        np.multiply(terms[0], x, out=terms[1])
+        np.multiply(terms[1], x, out=terms[2])
+        np.divide(terms[0], x, out=terms[3])
+        np.multiply(terms[3], np.log(x), out=terms[4])
+        moments = terms.dot(weights)
+
+        self._moments[key] = ((self._wave, self._flux), moments, wave.unit)
+
+        return moments, wave.unit
 
     def avgwave(self, binned=False):
-        """Calculate the observation average wavelength using
-        :func:`synphot.utils.avg_wavelength`.
+        """Calculate the observation :ref:`average wavelength
+        <synphot-formula-avgwv>`, as :func:`synphot.utils.avg_wavelength`
+        does, from cached moments.
 
         Parameters
         ----------
@@ -352,14 +558,21 @@ class Observation(spectrum.SourceSpectrum):
             Missing binned data.
 
         """
-        self._set_data(binned)
-        wave = utils.to_length(self._wave)
-        avg_wave = utils.avg_wavelength(wave.value, self._flux.value)
-        return u.Quantity(avg_wave, unit=wave.unit)
+        moments, wave_unit = self._get_moments(binned)
+        num = moments[1]
+        den = moments[0]
+
+        if den == 0:  # pragma: no cover
+            avg_wave = 0.0
+        else:
+            avg_wave = num / den
+
+        return u.Quantity(avg_wave, unit=wave_unit)
 
     def barlam(self, binned=False):
-        """Calculate the observation mean log wavelength using
-        :func:`synphot.utils.barlam`.
+        """Calculate the observation :ref:`mean log wavelength
+        <synphot-formula-barlam>`, as :func:`synphot.utils.barlam`
+        does, from cached moments.
 
         Parameters
         ----------
@@ -377,13 +590,20 @@ class Observation(spectrum.SourceSpectrum):
             Missing binned data.
 
         """
-        self._set_data(binned)
-        wave = utils.to_length(self._wave)
-        bar_lam = utils.barlam(wave.value, self._flux.value)
-        return u.Quantity(bar_lam, unit=wave.unit)
+        moments, wave_unit = self._get_moments(binned)
+        num = moments[4]
+        den = moments[3]
+
+        if num == 0 or den == 0:  # pragma: no cover
+            bar_lam = 0.0
+        else:
+            bar_lam = np.exp(num / den)
+
+        return u.Quantity(bar_lam, unit=wave_unit)
 
     def effective_wavelength(self, binned=False, mode='efflerg'):
-        """Calculate :ref:`effective wavelength <synphot-formula-effwave>`.
+        """Calculate :ref:`effective wavelength <synphot-formula-effwave>`
+        from cached moments.
 
         Parameters
         ----------
@@ -415,28 +635,24 @@ class Observation(spectrum.SourceSpectrum):
         # Convert flux to appropriate unit
         mode = mode.lower()
         if mode == 'efflerg':
-            flux = units.convert_flux(
-                self._wave, self._flux, units.FLAM, area=self.primary_area)
+            flux_unit = units.FLAM
         elif mode == 'efflphot':
-            flux = units.convert_flux(
-                self._wave, self._flux, units.PHOTLAM, area=self.primary_area)
+            flux_unit = units.PHOTLAM
         else:
             raise exceptions.SynphotError(
                 'mode={0} is invalid, must be "efflerg" or '
                 '"efflphot"'.format(mode))
 
-        wave = utils.to_length(self._wave)
-        num = utils.trapezoid_integration(
-            wave.value, flux.value * wave.value ** 2)
-        den = utils.trapezoid_integration(
-            wave.value, flux.value * wave.value)
+        moments, wave_unit = self._get_moments(binned, flux_unit=flux_unit)
+        num = moments[2]
+        den = moments[1]
 
         if den == 0.0:  # pragma: no cover
             eff_lam = 0.0
         else:
             eff_lam = num / den
 
-        return u.Quantity(eff_lam, unit=wave.unit)
+        return u.Quantity(eff_lam, unit=wave_unit)
 
     def effstim(self, binned=False, flux_unit=None, band=None,
                 vegaspec=None, wave_range=None, force=False):
@@ -445,6 +661,12 @@ class Observation(spectrum.SourceSpectrum):
         Calculations are done with flux in given unit, and wavelengths
         in Angstrom.
 
+        If the observation was created from analytic source spectrum
+        and passband, and ``band`` is also analytic, native effective
+        stimulus is calculated from closed forms given by
+        :func:`synphot.analytic.band_integral` when available,
+        instead of from sampled data.
+
         Parameters
         ----------
         binned : bool
@@ -455,17 +677,23 @@ class Observation(spectrum.SourceSpectrum):
 
         band : `~synphot.spectrum.SpectralElement` or `~synphot.analytic.MixinAnalyticPassband`
             Passband that went into the observation. This is needed
-            unless flux unit is count or OBMAG.
+            unless flux unit is count or OBMAG. For analytic passband
+            with multiple parameter sets, there is one result per set.
 
         vegaspec : `synphot.spectrum.SourceSpectrum`
             Vega spectrum from :func:`SourceSpectrum.from_vega`.
-            This is *only* used if given flux unit is VEGAMAG.
+            This is *only* used if given flux unit is VEGAMAG, where
+            the result is relative to the effective stimulus of Vega
+            through the passband from
+            :func:`synphot.zeropoints.vega_effstim`.
 
-        wave_range : tuple of float or `astropy.units.quantity.Quantity`, or `None`
+        wave_range : tuple of float, array_like, `astropy.units.quantity.Quantity`, or `None`
             Wavelength range (inclusive) for calculations in the
             form of ``(low, high)``. If not Quantity, assumed to be
             in the wavelength unit of ``self``. If `None`, the full
-            range is used.
+            range is used. For many ranges, give an array of shape
+            ``(K, 2)``; they are calculated together from prefix sums
+            that are kept with the observation.
 
         force : bool
             If a wavelength range is given, partial overlap raises
@@ -477,6 +705,7 @@ class Observation(spectrum.SourceSpectrum):
         -------
         eff_stim : `astropy.units.quantity.Quantity`
             Observation effective stimulus in given flux unit.
+            For many wavelength ranges, there is one value per range.
 
         Raises
         ------
@@ -501,6 +730,11 @@ class Observation(spectrum.SourceSpectrum):
         else:
             flux_unit = units.validate_unit(flux_unit)
 
+        # Many wavelength ranges at once
+        if wave_range is not None and _is_many_ranges(wave_range):
+            return self._effstim_ranges(
+                binned, flux_unit, band, vegaspec, wave_range, force)
+
         # Use entire wavelength range
         if wave_range is None:
             inwave = self._wave
@@ -540,7 +774,7 @@ class Observation(spectrum.SourceSpectrum):
                 i1 = np.searchsorted(self.bin_edges, w1) - 1
                 i2 = np.searchsorted(self.bin_edges, w2)
                 inwave = self._wave[i1:i2]
-                influx = self.sample_binned(inwave)
+                influx = self._flux[i1:i2]
             else:
                 mask = ((self._wave >= w1) & (self._wave <= w2))
                 inwave = u.Quantity(utils.merge_wavelengths(
@@ -555,7 +789,7 @@ class Observation(spectrum.SourceSpectrum):
         if flux_unit_name in (u.count.to_string(), units.OBMAG.to_string()):
             self_flux = units.convert_flux(
                 inwave, influx, u.count, area=self.primary_area)
-            val = self_flux.sum()
+            val = self_flux.sum(dtype=np.float64)
             utils.validate_totalflux(val.value)
 
             if flux_unit.decompose() == u.mag:
@@ -566,79 +800,352 @@ class Observation(spectrum.SourceSpectrum):
 
         # Density flux units and VEGAMAG
         else:
-            # Passband is required and must overlap
-            if isinstance(band, spectrum.SpectralElement):
-                stat = band.check_overlap(self)
-                if stat == 'none':
-                    raise exceptions.DisjointError(
-                        'Observation and passband are disjoint.')
-                elif 'partial' in stat:
-                    raise exceptions.PartialOverlap(
-                        'Observation and passband do not fully overlap.')
-                elif stat != 'full':  # pragma: no cover
-                    raise exceptions.SynphotError(
-                        'Overlap result of {0} is unexpected'.format(stat))
-            elif isinstance(band, analytic.MixinAnalyticPassband):
-                if band.param_dim > 1:
-                    raise exceptions.SynphotError(
-                        'Ambiguous analytic passband with {0} parameter '
-                        'sets.'.format(band.param_dim))
-                band = band.to_spectrum(self.wave)
+            band, analytic_band = self._effstim_band(band)
+            tmp_unit = self._effstim_linear_unit(flux_unit, vegaspec)
+
+            if (analytic_band is not None and not binned and
+                    wave_range is None):
+                val = self._analytic_effstim(analytic_band, tmp_unit)
             else:
-                raise exceptions.SynphotError('Missing passband data.')
-
-            # Convert wavelengths to Angstrom
-            band_wave = band.wave.to(u.AA, equivalencies=u.spectral())
-            self_wave = inwave.to(u.AA, equivalencies=u.spectral())
-
-            # Convert observation to given flux unit.
-            # For mag, convert to corresponding linear flux unit.
-            if flux_unit_name in (units.STMAG.to_string(),
-                                  units.VEGAMAG.to_string()):
-                tmp_unit = units.FLAM
-            elif flux_unit_name == units.ABMAG.to_string():
-                tmp_unit = units.FNU
-            elif flux_unit.decompose() != u.mag:
-                tmp_unit = flux_unit
+                val = None
+
+            if val is None:
+                # Convert wavelengths to Angstrom
+                self_wave = inwave.to(u.AA, equivalencies=u.spectral())
+                self_flux = units.convert_flux(
+                    self_wave, influx, tmp_unit, area=self.primary_area)
+
+                # Integrate
+                num = utils.trapezoid_integration(
+                    self_wave.value, self_wave.value * self_flux.value)
+                utils.validate_totalflux(num)
+
+                val = num / self._effstim_band_integral(band)
+
+            eff_stim = self._effstim_from_linear(
+                val, flux_unit, tmp_unit, band, vegaspec)
+
+        return eff_stim
+
+    def _effstim_ranges(self, binned, flux_unit, band, vegaspec, wave_range,
+                        force):
+        """Like :func:`effstim` but for an array of wavelength ranges
+        of shape ``(K, 2)``, using prefix sums from
+        :func:`_get_range_index`.
+
+        Returns
+        -------
+        eff_stim : `astropy.units.quantity.Quantity`
+            One effective stimulus per range. For analytic passband
+            with multiple parameter sets, the shape is ``(K, P)``.
+
+        """
+        # Validate ranges the same way as a single range
+        if isinstance(wave_range, u.Quantity):
+            wave_range = units.validate_quantity(
+                wave_range, self._wave.unit, equivalencies=u.spectral())
+        else:
+            wave_range = u.Quantity(wave_range, unit=self._wave.unit)
+        if wave_range.ndim != 2:
+            raise exceptions.SynphotError(
+                'Wavelength ranges must have shape (K, 2).')
+
+        w1 = wave_range.value[:, 0]
+        w2 = wave_range.value[:, -1]
+        if np.any(w1 >= w2):
+            raise exceptions.SynphotError('Invalid wavelength range.')
+
+        minwave = self._wave.value.min()
+        maxwave = self._wave.value.max()
+        if np.any((w2 < minwave) | (maxwave < w1)):
+            raise exceptions.DisjointError(
+                'Observation and wavelength range are disjoint.')
+        elif np.any((w1 < minwave) | (w2 > maxwave)):
+            if force:
+                log.warn('EFFSTIM calculated only for wavelengths in the '
+                         'overlap between observation and given range.')
+                w1 = np.maximum(w1, minwave)
+                w2 = np.minimum(w2, maxwave)
             else:
-                raise exceptions.SynphotError(
-                    'Flux unit {0} is invalid'.format(flux_unit))
+                raise exceptions.PartialOverlap(
+                    'Observation and wavelength range do not fully '
+                    'overlap. You may use force=True to force this '
+                    'calculation anyway.')
+
+        # Range limits too close to a sample are merged with it, as done
+        # by utils.merge_wavelengths() for one range at a time.
+        if not binned:
+            x = np.sort(self._wave.value)
+            w1 = _snap_to_samples(x, w1)
+            w2 = _snap_to_samples(x, w2)
+
+        # Ranges in Angstrom, in ascending order
+        wave_range = u.Quantity(np.column_stack((w1, w2)),
+                                unit=self._wave.unit)
+        wave_range = np.sort(
+            wave_range.to(u.AA, equivalencies=u.spectral()).value, axis=1)
+        w1 = wave_range[:, 0]
+        w2 = wave_range[:, 1]
+
+        index = self._get_range_index(binned)
+        flux_unit_name = flux_unit.to_string()
 
-            self_flux = units.convert_flux(
-                self_wave, influx, tmp_unit, area=self.primary_area)
+        # Special handling for non-density units
+        if flux_unit_name in (u.count.to_string(), units.OBMAG.to_string()):
+            val = index.integrate(w1, w2, u.count)
+            for v in val:
+                utils.validate_totalflux(v)
 
-            if flux_unit_name == units.VEGAMAG.to_string():
-                if not isinstance(vegaspec, spectrum.SourceSpectrum):
-                    raise exceptions.SynphotError(
-                        'Vega spectrum is missing.')
-                vega_flux = units.convert_flux(
-                    self_wave, vegaspec.resample(self_wave), tmp_unit,
-                    area=self.primary_area, vegaspec=None)
-                flux = self_flux.value / vega_flux.value
+            if flux_unit.decompose() == u.mag:
+                eff_stim = u.Quantity(-2.5 * np.log10(val), unit=flux_unit)
             else:
-                flux = self_flux.value
+                eff_stim = u.Quantity(val, unit=u.count)
+
+        # Density flux units and VEGAMAG
+        else:
+            band, analytic_band = self._effstim_band(band)
+            tmp_unit = self._effstim_linear_unit(flux_unit, vegaspec)
+
+            num = index.integrate(w1, w2, tmp_unit)
+            for v in num:
+                utils.validate_totalflux(v)
+
+            den = self._effstim_band_integral(band)
+            if np.ndim(den) > 0:
+                num = num[:, np.newaxis]
+
+            eff_stim = self._effstim_from_linear(
+                num / den, flux_unit, tmp_unit, band, vegaspec)
+
+        return eff_stim
+
+    def _get_range_index(self, binned):
+        """Return `_RangeIndex` for current native or binned data.
+        It is built on first use and rebuilt when the data change."""
+        index = self._range_index.get(binned)
+        if (index is None or index.source[0] is not self._wave or
+                index.source[1] is not self._flux):
+            if binned:
+                bin_edges = self.bin_edges
+            else:
+                bin_edges = None
+            index = _RangeIndex(self._wave, self._flux, bin_edges=bin_edges,
+                                area=self.primary_area)
+            self._range_index[binned] = index
+
+        return index
+
+    def _effstim_band(self, band):
+        """Validate passband for :func:`effstim` and sample analytic
+        passband at native wavelengths.
+
+        Returns
+        -------
+        band : `~synphot.spectrum.SpectralElement`
+            Sampled passband.
+
+        analytic_band : `~synphot.analytic.MixinAnalyticPassband` or `None`
+            Given analytic passband, if any.
+
+        """
+        # Passband is required and must overlap
+        analytic_band = None
+        if isinstance(band, spectrum.SpectralElement):
+            stat = band.check_overlap(self)
+            if stat == 'none':
+                raise exceptions.DisjointError(
+                    'Observation and passband are disjoint.')
+            elif 'partial' in stat:
+                raise exceptions.PartialOverlap(
+                    'Observation and passband do not fully overlap.')
+            elif stat != 'full':  # pragma: no cover
+                raise exceptions.SynphotError(
+                    'Overlap result of {0} is unexpected'.format(stat))
+        elif isinstance(band, analytic.MixinAnalyticPassband):
+            analytic_band = band
+            band = band.to_spectrum(
+                self.wave, batch=band.param_dim > 1)
+        else:
+            raise exceptions.SynphotError('Missing passband data.')
+
+        return band, analytic_band
+
+    @staticmethod
+    def _effstim_linear_unit(flux_unit, vegaspec):
+        """Linear flux density unit for :func:`effstim` calculations.
+        For mag, this is the corresponding linear flux unit."""
+        flux_unit_name = flux_unit.to_string()
+
+        if flux_unit_name in (units.STMAG.to_string(),
+                              units.VEGAMAG.to_string()):
+            tmp_unit = units.FLAM
+        elif flux_unit_name == units.ABMAG.to_string():
+            tmp_unit = units.FNU
+        elif flux_unit.decompose() != u.mag:
+            tmp_unit = flux_unit
+        else:
+            raise exceptions.SynphotError(
+                'Flux unit {0} is invalid'.format(flux_unit))
 
-            # Integrate
-            num = utils.trapezoid_integration(
-                self_wave.value, self_wave.value * flux)
+        if flux_unit_name == units.VEGAMAG.to_string():
+            if not isinstance(vegaspec, spectrum.SourceSpectrum):
+                raise exceptions.SynphotError(
+                    'Vega spectrum is missing.')
+
+        return tmp_unit
+
+    @staticmethod
+    def _effstim_band_integral(band):
+        """Integral of passband wavelength times throughput, in
+        Angstrom, for :func:`effstim`."""
+        band_wave = band.wave.to(u.AA, equivalencies=u.spectral())
+
+        # One value per parameter set of analytic passband
+        if isinstance(band, spectrum.SpectrumBatch):
+            den = np.abs(np.dot(
+                band_wave.value * band.flux.value,
+                utils.trapezoid_weights(band_wave.value)))
+            utils.validate_totalflux(den.min())
+        else:
             den = utils.trapezoid_integration(
                 band_wave.value, band_wave.value * band.thru.value)
-            utils.validate_totalflux(num)
             utils.validate_totalflux(den)
-            val = num / den
-
-            # Convert back to mag, if needed
-            if flux_unit_name in (units.STMAG.to_string(),
-                                  units.ABMAG.to_string()):
-                eff_stim = units.convert_flux(
-                    1, u.Quantity(val, unit=tmp_unit), flux_unit)
-            elif flux_unit_name == units.VEGAMAG.to_string():
-                eff_stim = u.Quantity(-2.5 * np.log10(val), unit=flux_unit)
+
+        return den
+
+    @staticmethod
+    def _effstim_from_linear(val, flux_unit, tmp_unit, band, vegaspec):
+        """Convert :func:`effstim` values in linear flux unit from
+        :func:`_effstim_linear_unit` to the desired flux unit."""
+        flux_unit_name = flux_unit.to_string()
+
+        # Convert back to mag, if needed
+        if flux_unit_name in (units.STMAG.to_string(),
+                              units.ABMAG.to_string()):
+            eff_stim = units.convert_flux(
+                1, u.Quantity(val, unit=tmp_unit), flux_unit)
+        elif flux_unit_name == units.VEGAMAG.to_string():
+            if isinstance(band, spectrum.SpectrumBatch):
+                vega_val = np.array(
+                    [zeropoints.vega_effstim(bp, vegaspec) for bp in band])
             else:
-                eff_stim = u.Quantity(val, unit=flux_unit)
+                vega_val = zeropoints.vega_effstim(band, vegaspec)
+            eff_stim = u.Quantity(
+                -2.5 * np.log10(val / vega_val), unit=flux_unit)
+        else:
+            eff_stim = u.Quantity(val, unit=flux_unit)
 
         return eff_stim
 
+    def _analytic_integral(self, flux_unit, wave_power, band=None):
+        """Integral of this observation from closed forms, with
+        wavelengths in Angstrom, as in
+        :func:`synphot.analytic.band_integral`.
+
+        Like the sampled calculation, only wavelengths covered by
+        this observation are included.
+
+        Parameters
+        ----------
+        flux_unit : `astropy.units.core.Unit`
+            Flux unit for integration.
+
+        wave_power : number
+            Power of wavelength in the integrand.
+
+        band : `~synphot.analytic.MixinAnalyticPassband` or `None`
+            If given, its throughput is integrated instead, over the
+            same wavelengths.
+
+        Returns
+        -------
+        val : float, array_like, or `None`
+            Integrated values, or `None` if the observation is not
+            analytic, its data have changed since creation, or there
+            is no closed form.
+
+        """
+        if self._analytic is None:
+            return None
+
+        spec, obs_band, fingerprint = self._analytic
+        if fingerprint != self.fingerprint:
+            return None
+
+        wave = self.wave.to(u.AA, equivalencies=u.spectral()).value
+        wave_range = (wave.min(), wave.max())
+
+        if band is None:
+            return analytic._band_integral(
+                spec, obs_band, flux_unit, wave_power, wave_range=wave_range)
+        else:
+            return analytic._band_integral(
+                None, band, units.THROUGHPUT, wave_power,
+                wave_range=wave_range)
+
+    def _analytic_effstim(self, band, flux_unit):
+        """Effective stimulus from closed forms for :func:`effstim`.
+
+        Parameters
+        ----------
+        band : `~synphot.analytic.MixinAnalyticPassband`
+            Passband for normalization.
+
+        flux_unit : `astropy.units.core.Unit`
+            Linear flux density unit for calculations.
+
+        Returns
+        -------
+        val : float, array_like, or `None`
+            Effective stimulus values, or `None` if there is no
+            closed form. See :func:`_analytic_integral`.
+
+        """
+        num = self._analytic_integral(flux_unit, 1)
+        if num is None:
+            return None
+
+        den = self._analytic_integral(units.THROUGHPUT, 1, band=band)
+        if den is None:
+            return None
+
+        den = np.abs(den)
+        utils.validate_totalflux(num)
+        utils.validate_totalflux(np.min(den))
+
+        return num / den
+
+    def integrate(self, wavelengths=None):
+        """Perform integration.
+
+        If this observation was created from analytic source spectrum
+        and passband, and no wavelengths are given, closed forms from
+        :func:`synphot.analytic.band_integral` are used where
+        available. Otherwise, this is the same as
+        :func:`synphot.spectrum.BaseSpectrum.integrate`.
+
+        Parameters
+        ----------
+        wavelengths : array_like, `astropy.units.quantity.Quantity`, or `None`
+            Wavelength values for integration. If not a Quantity,
+            assumed to be the unit of ``self.wave``. If `None`,
+            ``self.wave`` is used.
+
+        Returns
+        -------
+        result : `astropy.units.quantity.Quantity`
+            Integrated result in ``self.flux`` unit.
+
+        """
+        if wavelengths is None and self.wave.unit.physical_type == 'length':
+            val = self._analytic_integral(self.flux.unit, 0)
+            if val is not None:
+                return u.Quantity(val / self.wave.unit.to(u.AA),
+                                  unit=self.flux.unit)
+
+        return spectrum.SourceSpectrum.integrate(
+            self, wavelengths=wavelengths)
+
     def countrate(self, binned=True, wave_range=None, force=False):
         """Calculate :ref:`effective stimulus <synphot-formula-effstim>`
         in counts.
@@ -651,7 +1158,8 @@ class Observation(spectrum.SourceSpectrum):
         Returns
         -------
         eff_stim : `astropy.units.quantity.Quantity`
-            Effective stimulus in counts.
+            Effective stimulus in counts, one per wavelength range
+            for many ranges.
 
         """
         return self.effstim(binned=binned, flux_unit=u.count, band=None,
@@ -717,8 +1225,10 @@ class Observation(spectrum.SourceSpectrum):
         composite model(s). From there, one can convert it to
         Observation at the time of sampling.
 
-        Observation currently does not support analytic spectra with
-        multiple parameter sets.
+        If either the source spectrum or passband is analytic with
+        multiple parameter sets, it is sampled once for all sets as
+        a `~synphot.spectrum.SpectrumBatch`, and one Observation is
+        created for each set.
 
         Parameters
         ----------
@@ -745,8 +1255,9 @@ class Observation(spectrum.SourceSpectrum):
 
         Returns
         -------
-        obspec : obj
-            Observation spectrum.
+        obspec : obj or tuple
+            Observation spectrum, or one per parameter set of
+            an analytic input.
 
         Raises
         ------
@@ -763,26 +1274,35 @@ class Observation(spectrum.SourceSpectrum):
         """
         if isinstance(spec, (analytic.MixinAnalyticFlamSource,
                              analytic.MixinAnalyticSource)):
-            if spec.param_dim > 1:
-                raise exceptions.SynphotError(
-                    'Ambiguous analytic source spectrum with {0} parameter '
-                    'sets.'.format(spec.param_dim))
-        elif not isinstance(spec, spectrum.SourceSpectrum):
+            spec_dim = spec.param_dim
+        elif isinstance(spec, spectrum.SourceSpectrum):
+            spec_dim = 1
+        else:
             raise exceptions.SynphotError('Invalid source spectrum')
 
         if isinstance(band, analytic.MixinAnalyticPassband):
-            if band.param_dim > 1:
-                raise exceptions.SynphotError(
-                    'Ambiguous analytic passband with {0} parameter '
-                    'sets.'.format(band.param_dim))
-        elif not isinstance(band, spectrum.SpectralElement):
+            band_dim = band.param_dim
+        elif isinstance(band, spectrum.SpectralElement):
+            band_dim = 1
+        else:
             raise exceptions.SynphotError('Invalid passband')
 
+        analytic_parts = None
+
+        # Multiple parameter sets
+        if spec_dim > 1 and band_dim > 1:
+            raise exceptions.SynphotError(
+                'Analytic source spectrum and passband cannot both have '
+                'multiple parameter sets.')
+        elif spec_dim > 1 or band_dim > 1:
+            return cls._from_batch(spec, band, binwave=binwave, force=force)
+
         # Both spectra are analytic
         if (isinstance(spec, analytic.BaseMixinAnalytic) and
                 isinstance(band, analytic.BaseMixinAnalytic)):
             if binwave is None:
                 raise exceptions.SynphotError('No wavelengths for sampling.')
+            analytic_parts = (spec, band)
             spec = spec.to_spectrum(binwave)
             band = band.to_spectrum(binwave)
             warn = {}
@@ -831,7 +1351,7 @@ class Observation(spectrum.SourceSpectrum):
                         'You may use force=[extrap|taper] to force this '
                         'Observation anyway.')
                 elif force == 'taper':
-                    spec = deepcopy(spec)  # Avoid modifying input
+                    spec = copy(spec)  # Taper does not modify input
                     spec.taper()
                     msg = 'Source spectrum is tapered.'
                     log.warn(msg)
@@ -850,15 +1370,52 @@ class Observation(spectrum.SourceSpectrum):
                     'Overlap result of {0} is unexpected'.format(stat))
 
         mulspec = spec * band
-        header = {'expr': '{0} * {1}'.format(str(spec), str(band))}
+        header = {'expr': Provenance(
+            '{0} * {1}', spec.provenance, band.provenance)}
 
         # Inherit primary area and set warning
         obspec = cls(mulspec.wave, mulspec.flux, binwave=binwave,
-                     area=mulspec.primary_area, header=header)
+                     area=mulspec.primary_area, header=header,
+                     precision=mulspec.precision)
         obspec.warnings.update(warn)
 
+        # Keep analytic inputs for closed-form effective stimulus
+        if analytic_parts is not None:
+            obspec._analytic = analytic_parts + (obspec.fingerprint, )
+
         return obspec
 
+    @classmethod
+    def _from_batch(cls, spec, band, binwave=None, force='none'):
+        """Create Observations for analytic source spectrum or
+        passband with multiple parameter sets.
+        See :func:`from_spec_band`.
+
+        """
+        if isinstance(spec, analytic.BaseMixinAnalytic) and spec.param_dim > 1:
+            model, other = spec, band
+        else:
+            model, other = band, spec
+
+        # Sample all parameter sets at once
+        if isinstance(other, analytic.BaseMixinAnalytic):
+            if binwave is None:
+                raise exceptions.SynphotError('No wavelengths for sampling.')
+            wave = binwave
+        else:
+            wave = other.wave
+
+        batch = model.to_spectrum(wave, batch=True)
+
+        if model is spec:
+            obs = [cls.from_spec_band(sp, band, binwave=binwave, force=force)
+                   for sp in batch]
+        else:
+            obs = [cls.from_spec_band(spec, bp, binwave=binwave, force=force)
+                   for bp in batch]
+
+        return tuple(obs)
+
     def plot(self, **kwargs):  # pragma: no cover
         """Plot the observation.
 
@@ -878,3 +1435,533 @@ class Observation(spectrum.SourceSpectrum):
         spectrum.BaseSpectrum.plot(
             self, overplot_data=(self.binwave.value, self.binflux.value),
             data_labels=('Native dataset', 'Binned dataset'), **kwargs)
+
+
+class CompiledObservationMode(object):
+    """Class to handle an observation mode (passband, binned
+    wavelengths, and collecting area) compiled against a fixed set
+    of source wavelengths.
+
+    For a given observation mode and source wavelengths, binned flux
+    of ``Observation.from_spec_band(sp, band, binwave=binwave)``, and
+    its binned counts, are linear in source flux. That chain is
+    evaluated here once as a sparse ``(n_pixels, n_wave)`` matrix, the
+    same way as `Observation` does (i.e., source and passband are
+    resampled onto their merged wavelengths, the product is resampled
+    again onto the merged bin edges and centers, and averaged over
+    each bin). As a result, binned flux or counts of any flux sampled
+    at the given wavelengths is reduced to a sparse matrix-vector
+    product, or a sparse matrix-matrix product for a stack of spectra.
+
+    The matrix is stored in compressed sparse row (CSR) format.
+    Calculations are done in Angstrom. Binned wavelengths are always
+    in ascending order. Like `~synphot.spectrum.CompiledBand`, the
+    compiled mode only holds NumPy arrays, so it can be pickled and
+    reused by other processes.
+
+    Parameters
+    ----------
+    band : `~synphot.spectrum.SpectralElement`
+        Passband to compile.
+
+    binwave : array_like or `astropy.units.quantity.Quantity`
+        Center of binned wavelengths. If not a Quantity, assumed to
+        be in Angstrom.
+
+    wavelengths : array_like or `astropy.units.quantity.Quantity`
+        Wavelength values of the source spectra. If not a Quantity,
+        assumed to be in Angstrom.
+
+    flux_unit : str or `astropy.units.core.Unit`
+        Linear flux density unit of the source spectra. Source fluxes
+        that are Quantity are converted to this unit first.
+        Default is PHOTLAM.
+
+    area : float, `astropy.units.quantity.Quantity`, or `None`
+        Collecting area, as needed for counts. If not a Quantity,
+        assumed to be in cm^2.
+
+    force : bool
+        If `False` (default), passband must be fully within the source
+        wavelengths, as for ``force='none'`` in
+        :func:`Observation.from_spec_band`. Otherwise, source spectra
+        are extrapolated at constant value, as for ``force='extrap'``.
+
+    Attributes
+    ----------
+    wave : `astropy.units.quantity.Quantity`
+        Source wavelengths in Angstrom, in the given order.
+
+    binwave : `astropy.units.quantity.Quantity`
+        Center of binned wavelengths in Angstrom.
+
+    flux_unit : `astropy.units.core.Unit`
+        Flux unit of source and binned fluxes.
+
+    indptr, indices, data : array_like
+        Sparse matrix from source flux to binned flux in CSR format,
+        i.e., for pixel ``i``, the non-zero weights are
+        ``data[indptr[i]:indptr[i+1]]`` at source wavelength indices
+        ``indices[indptr[i]:indptr[i+1]]``.
+
+    count_scale : array_like or `None`
+        Conversion factors from binned flux to counts, or `None`
+        if area is not given.
+
+    expr : str
+        Descriptive string of the compiled passband.
+
+    Raises
+    ------
+    synphot.exceptions.DisjointError
+        Passband does not overlap with source wavelengths.
+
+    synphot.exceptions.PartialOverlap
+        Passband only partially overlaps with source wavelengths
+        and ``force`` is `False`.
+
+    synphot.exceptions.SynphotError
+        Invalid inputs.
+
+    """
+    def __init__(self, band, binwave, wavelengths, flux_unit=units.PHOTLAM,
+                 area=None, force=False):
+        if not isinstance(band, spectrum.SpectralElement):
+            raise exceptions.SynphotError(
+                'Observation mode must be created from a SpectralElement.')
+
+        self.flux_unit = units.validate_unit(flux_unit)
+        if (self.flux_unit.decompose() == u.mag or
+                self.flux_unit.to_string() == u.count.to_string()):
+            raise exceptions.SynphotError(
+                'Fluxes must be in linear flux density unit.')
+
+        if not isinstance(wavelengths, u.Quantity):
+            wavelengths = u.Quantity(wavelengths, unit=u.AA)
+        if not isinstance(binwave, u.Quantity):
+            binwave = u.Quantity(binwave, unit=u.AA)
+
+        utils.validate_wavelengths(wavelengths)
+        utils.validate_wavelengths(binwave)
+
+        wave = np.atleast_1d(
+            wavelengths.to(u.AA, equivalencies=u.spectral()).value)
+        bins = np.sort(np.atleast_1d(
+            binwave.to(u.AA, equivalencies=u.spectral()).value))
+        band_wave = band.wave.to(u.AA, equivalencies=u.spectral()).value
+        band_thru = band.thru.value
+
+        # Calculations need ascending order
+        order = np.arange(wave.size)
+        if wave[0] > wave[-1]:
+            order = order[::-1]
+        x = wave[order]
+        if band_wave[0] > band_wave[-1]:
+            band_wave = band_wave[::-1]
+            band_thru = band_thru[::-1]
+
+        # Same overlap check as from_spec_band()
+        stat = band.check_overlap(spectrum.SourceSpectrum(x, np.ones(x.size)))
+        if stat == 'none':
+            raise exceptions.DisjointError(
+                'Source wavelengths and passband are disjoint.')
+        elif 'partial' in stat and not force:
+            raise exceptions.PartialOverlap(
+                'Source wavelengths and passband do not fully overlap. '
+                'You may use force=True to extrapolate source spectra.')
+
+        # Source * passband on merged wavelengths
+        merged = utils.merge_wavelengths(x, band_wave)
+        thru = np.interp(merged, band_wave, band_thru)
+        i1_lo, i1_hi, w1_lo, w1_hi = utils.interpolation_weights(merged, x)
+
+        # Merge bin edges and centers in, as done by binspec()
+        edges = binning.calculate_bin_edges(bins, as_quantity=False)
+        spwave = utils.merge_wavelengths(
+            utils.merge_wavelengths(merged, edges), bins)
+        i2_lo, i2_hi, w2_lo, w2_hi = utils.interpolation_weights(
+            spwave, merged)
+        indices = np.searchsorted(spwave, edges)
+        i_beg = indices[:-1]
+        i_end = indices[1:]
+        deltaw = spwave[1:] - spwave[:-1]
+
+        # Averaging over each bin puts half of each interval
+        # on both its ends
+        iwave = np.arange(i_beg[0], i_end[-1])
+        rows = np.repeat(np.arange(bins.size), i_end - i_beg)
+        intwave = np.bincount(rows, deltaw[iwave], minlength=bins.size)
+        vals = 0.5 * deltaw[iwave] / intwave[rows]
+        rows = np.concatenate([rows, rows])
+        cols = np.concatenate([iwave, iwave + 1])
+        vals = np.concatenate([vals, vals])
+
+        # Through both interpolations back to source wavelengths
+        rows = np.concatenate([rows, rows])
+        cols, vals = (np.concatenate([i2_lo[cols], i2_hi[cols]]),
+                      np.concatenate([vals * w2_lo[cols], vals * w2_hi[cols]]))
+        vals *= thru[cols]
+        rows = np.concatenate([rows, rows])
+        cols, vals = (np.concatenate([i1_lo[cols], i1_hi[cols]]),
+                      np.concatenate([vals * w1_lo[cols], vals * w1_hi[cols]]))
+
+        # Sum duplicates and sort into CSR format
+        keys, inverse = np.unique(rows.astype(np.int64) * wave.size +
+                                  order[cols], return_inverse=True)
+        data = np.bincount(inverse.ravel(), vals)
+        mask = data != 0
+        keys = keys[mask]
+        self.data = data[mask]
+        self.indices = keys % wave.size
+        self.indptr = np.zeros(bins.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // wave.size, minlength=bins.size),
+                  out=self.indptr[1:])
+
+        self.wave = u.Quantity(wave, unit=u.AA)
+        self.binwave = u.Quantity(bins, unit=u.AA)
+
+        if area is None:
+            self.count_scale = None
+        else:
+            self.count_scale = units.convert_flux(
+                self.binwave, u.Quantity(np.ones(bins.size), self.flux_unit),
+                u.count, area=area).value
+
+        self.expr = str(band)
+
+    def __str__(self):
+        """Descriptive info of the object."""
+        return '{0} compiled on {1} wavelengths into {2} bins'.format(
+            self.expr, self.wave.size, self.binwave.size)
+
+    @property
+    def shape(self):
+        """Shape of the sparse matrix, ``(n_pixels, n_wave)``."""
+        return (self.binwave.size, self.wave.size)
+
+    def _get_values(self, fluxes):
+        """Extract flux values in ``self.flux_unit``, and check
+        their shape."""
+        if isinstance(fluxes, u.Quantity):
+            is_quantity = True
+            fluxes = units.convert_flux(self.wave, fluxes, self.flux_unit)
+            values = fluxes.value
+        else:
+            is_quantity = False
+            values = np.asarray(fluxes, dtype=np.float64)
+
+        if values.ndim < 1 or values.shape[-1] != self.wave.size:
+            raise exceptions.SynphotError(
+                'Fluxes expected to have {0} values in the last dimension '
+                'but has shape of {1}'.format(self.wave.size, values.shape))
+
+        return values, is_quantity
+
+    def _dot(self, values):
+        """Sparse matrix product with the last dimension of values."""
+        prod = values[..., self.indices] * self.data
+        result = np.zeros(values.shape[:-1] + (self.binwave.size, ),
+                          dtype=np.float64)
+
+        # Empty rows have no entries, so the segments between
+        # the other rows are contiguous
+        i_rows = np.flatnonzero(self.indptr[1:] > self.indptr[:-1])
+        if i_rows.size > 0:
+            result[..., i_rows] = np.add.reduceat(
+                prod, self.indptr[i_rows], axis=-1)
+
+        return result
+
+    def binflux(self, fluxes):
+        """Binned flux of source spectra, i.e., ``binflux`` of
+        their observations.
+
+        Parameters
+        ----------
+        fluxes : array_like or `astropy.units.quantity.Quantity`
+            Flux values at ``self.wave``. A 2D array is treated as
+            a stack of spectra, one per row. If not a Quantity,
+            assumed to be in ``self.flux_unit``.
+
+        Returns
+        -------
+        binflux : array_like or `astropy.units.quantity.Quantity`
+            Binned flux at ``self.binwave``, one row per spectrum.
+            If ``fluxes`` is a Quantity, result is in ``self.flux_unit``.
+
+        """
+        values, is_quantity = self._get_values(fluxes)
+        result = self._dot(values)
+
+        if is_quantity:
+            result = u.Quantity(result, unit=self.flux_unit)
+
+        return result
+
+    def counts(self, fluxes):
+        """Binned counts of source spectra, i.e., ``binflux`` of
+        their observations converted to counts.
+
+        Parameters
+        ----------
+        fluxes : array_like or `astropy.units.quantity.Quantity`
+            See :func:`binflux`.
+
+        Returns
+        -------
+        counts : array_like or `astropy.units.quantity.Quantity`
+            Counts at ``self.binwave``, one row per spectrum.
+            If ``fluxes`` is a Quantity, result is in counts.
+
+        Raises
+        ------
+        synphot.exceptions.SynphotError
+            Area was not given.
+
+        """
+        if self.count_scale is None:
+            raise exceptions.SynphotError('Area is needed for counts.')
+
+        values, is_quantity = self._get_values(fluxes)
+        result = self._dot(values)
+        result *= self.count_scale
+
+        if is_quantity:
+            result = u.Quantity(result, unit=u.count)
+
+        return result
+
+    def countrate(self, fluxes):
+        """Total counts of source spectra, as calculated by
+        :func:`Observation.countrate` with binned data.
+
+        Parameters
+        ----------
+        fluxes : array_like or `astropy.units.quantity.Quantity`
+            See :func:`binflux`.
+
+        Returns
+        -------
+        countrate : number, array_like, or `astropy.units.quantity.Quantity`
+            Total counts, one per spectrum. If ``fluxes`` is a Quantity,
+            result is in counts.
+
+        """
+        return self.counts(fluxes).sum(axis=-1)
+
+
+def _is_many_ranges(waverange):
+    """Whether ``waverange`` holds many wavelength ranges instead of one.
+
+    Not ``np.ndim(waverange)``, which fails on a list of Quantity.
+
+    """
+    if isinstance(waverange, u.Quantity):
+        return waverange.ndim > 1
+    return (not isinstance(waverange[0], u.Quantity) and
+            np.ndim(waverange[0]) > 0)
+
+
+def _snap_to_samples(x, values, threshold=1e-12):
+    """Replace values that differ from the nearest element of ``x``,
+    which is in ascending order, by no more than ``threshold`` with
+    that element."""
+    i = np.clip(np.searchsorted(x, values), 1, x.size - 1)
+    nearest = np.where(values - x[i - 1] < x[i] - values, x[i - 1], x[i])
+    return np.where(np.abs(nearest - values) <= threshold, nearest, values)
+
+
+class _RangeIndex(object):
+    """Prefix sums over native or binned data of an observation,
+    such that :func:`Observation.effstim` for many wavelength ranges
+    only needs a few lookups per range, instead of resampling and
+    integrating each range from scratch.
+
+    The sums are built for each flux unit on first use. The results
+    are the same as for one range at a time, except for round-off.
+
+    Parameters
+    ----------
+    wave, flux : `astropy.units.quantity.Quantity`
+        Wavelengths and fluxes to integrate.
+
+    bin_edges : `None` or `astropy.units.quantity.Quantity`
+        Bin edges if ``wave`` is binned. Then, ranges include whole
+        bins. Otherwise, flux is interpolated at the range limits.
+
+    area : `None` or `astropy.units.quantity.Quantity`
+        Area that flux covers, needed for counts.
+
+    Attributes
+    ----------
+    source : tuple
+        The given ``(wave, flux)``, to check if data have changed.
+
+    """
+    def __init__(self, wave, flux, bin_edges=None, area=None):
+        self.source = (wave, flux)
+
+        # Wavelengths in Angstrom, in ascending order, in double precision
+        wave = wave.to(u.AA, equivalencies=u.spectral())
+        if wave.value[0] > wave.value[-1]:
+            wave = wave[::-1]
+            flux = flux[::-1]
+        self._wave = wave.astype(np.float64)
+        self._flux = flux.astype(np.float64)
+
+        if bin_edges is None:
+            self._bin_edges = None
+        else:
+            self._bin_edges = np.sort(bin_edges.to(
+                u.AA, equivalencies=u.spectral()).value)
+
+        self._area = area
+        self._sums = {}
+
+    @staticmethod
+    def _cumsum(values):
+        """Prefix sums, starting from zero. They are kept in extended
+        precision, where available, because a range that is small
+        compared to the whole data is a difference of two large sums."""
+        sums = np.zeros(values.size + 1, dtype=np.longdouble)
+        np.cumsum(values, out=sums[1:])
+        return sums
+
+    def _convert_flux(self, wave, flux, flux_unit):
+        """Convert flux at given wavelengths in Angstrom to given unit,
+        or to PHOTLAM times area for count."""
+        if flux_unit != u.count:
+            return units.convert_flux(
+                wave, flux, flux_unit, area=self._area).value
+
+        if self._area is None:
+            raise exceptions.SynphotError(
+                'Area is compulsory for conversion involving count or OBMAG.')
+
+        return (units.convert_flux(wave, flux, units.PHOTLAM).value *
+                units.validate_quantity(self._area, units.AREA).value)
+
+    def _get_sums(self, flux_unit):
+        """Samples and prefix sums for the given flux unit.
+
+        For count, samples are PHOTLAM times area and the sums are of
+        counts of each sample, as if its neighbors were included.
+        Otherwise, samples are wavelength times flux and the sums are
+        of trapezoids between samples.
+
+        """
+        key = flux_unit.to_string()
+
+        if key not in self._sums:
+            x = self._wave.value
+            y = self._convert_flux(self._wave, self._flux, flux_unit)
+
+            if flux_unit == u.count:
+                values = np.zeros(x.size, dtype=np.float64)
+                values[1:-1] = y[1:-1] * (x[2:] - x[:-2]) * 0.5
+            else:
+                y = y * x
+                values = 0.5 * (y[1:] + y[:-1]) * (x[1:] - x[:-1])
+
+            self._sums[key] = (y, self._cumsum(values))
+
+        return self._sums[key]
+
+    def integrate(self, wave1, wave2, flux_unit):
+        """Integrals for :func:`Observation.effstim`.
+
+        Parameters
+        ----------
+        wave1, wave2 : array_like
+            Lower and upper limits of wavelength ranges, in Angstrom.
+            They must be within the data.
+
+        flux_unit : `astropy.units.core.Unit`
+            Linear flux density unit, or count.
+
+        Returns
+        -------
+        result : array_like
+            For count, total counts in each range. Otherwise, integral
+            of wavelength times flux over each range.
+
+        Raises
+        ------
+        synphot.exceptions.SynphotError
+            Counts for a range with less than two samples.
+
+        """
+        if self._bin_edges is None:
+            result = self._integrate_native(wave1, wave2, flux_unit)
+        else:
+            result = self._integrate_binned(wave1, wave2, flux_unit)
+
+        return result.astype(np.float64)
+
+    def _integrate_binned(self, wave1, wave2, flux_unit):
+        """Integrals over bins that overlap the ranges."""
+        x = self._wave.value
+        y, sums = self._get_sums(flux_unit)
+
+        i1 = np.searchsorted(self._bin_edges, wave1) - 1
+        i2 = np.searchsorted(self._bin_edges, wave2)
+
+        if flux_unit != u.count:
+            return sums[i2 - 1] - sums[i1]
+
+        if np.any(i2 - i1 < 2):
+            raise exceptions.SynphotError(
+                'Counts need at least two bins in each range.')
+
+        # Bins at the ends have only one neighbor in the range
+        return (y[i1] * (x[i1 + 1] - x[i1]) + (sums[i2 - 1] - sums[i1 + 1]) +
+                y[i2 - 1] * (x[i2 - 1] - x[i2 - 2]))
+
+    def _integrate_native(self, wave1, wave2, flux_unit):
+        """Integrals over samples within the ranges, plus the range
+        limits, where flux is interpolated."""
+        x = self._wave.value
+        y, sums = self._get_sums(flux_unit)
+
+        # Flux at range limits
+        y1 = self._convert_flux(
+            u.Quantity(wave1, u.AA),
+            u.Quantity(np.interp(wave1, x, self._flux.value),
+                       self._flux.unit), flux_unit)
+        y2 = self._convert_flux(
+            u.Quantity(wave2, u.AA),
+            u.Quantity(np.interp(wave2, x, self._flux.value),
+                       self._flux.unit), flux_unit)
+
+        # Samples strictly within the ranges are i1 to i2-1
+        i1 = np.searchsorted(x, wave1, side='right')
+        i2 = np.searchsorted(x, wave2, side='left')
+        nsamp = i2 - i1
+        i_first = np.minimum(i1, x.size - 1)
+        i_last = np.maximum(i2 - 1, 0)
+
+        if flux_unit != u.count:
+            y1 = y1 * wave1
+            y2 = y2 * wave2
+            return np.where(
+                nsamp > 0,
+                (0.5 * (y1 + y[i_first]) * (x[i_first] - wave1) +
+                 (sums[i_last] - sums[i_first]) +
+                 0.5 * (y[i_last] + y2) * (wave2 - x[i_last])),
+                0.5 * (y1 + y2) * (wave2 - wave1))
+
+        # Counts of samples next to the range limits use the limits
+        # as neighbors.
+        i_second = np.minimum(i1 + 1, x.size - 1)
+        i_penult = np.maximum(i2 - 2, 0)
+        return np.select(
+            [nsamp > 1, nsamp == 1],
+            [(y1 * (x[i_first] - wave1) +
+              0.5 * y[i_first] * (x[i_second] - wave1) +
+              (sums[i_last] - sums[i_second]) +
+              0.5 * y[i_last] * (wave2 - x[i_penult]) +
+              y2 * (wave2 - x[i_last])),
+             (y1 * (x[i_first] - wave1) +
+              0.5 * y[i_first] * (wave2 - wave1) +
+              y2 * (wave2 - x[i_first]))],
+            (y1 + y2) * (wave2 - wave1))
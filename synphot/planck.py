@@ -5,6 +5,10 @@
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+# STDLIB
+from fractions import Fraction
+from math import factorial
+
 # THIRD-PARTY
 import numpy as np
 
@@ -13,10 +17,79 @@ from astropy import constants as const
 from astropy import units as u
 
 # LOCAL
-from . import units
+from . import exceptions, units
+
+
+__all__ = ['bbfunc', 'bb_photlam_arcsec', 'bb_photlam', 'bb_photlam_integral']
+
+# Constants in plain floats, so that no Quantity is involved in
+# the calculations. Wavelengths are in Angstrom and temperatures
+# in Kelvin.
+_C = const.c.cgs.value  # cm/s
+_HCK = const.h.cgs.value * _C * 1e8 / const.k_B.cgs.value  # AA * K
+_BB_FACTOR = 2e24 * _C  # 2 * c^3 in AA^3/s over c^2 in cm^2/s^2
+
+# Steradian to square arcsec
+_SR_TO_ARCSEC2 = u.rad.to(u.arcsec) ** 2
+
+# Solid angle of the Sun at 1 kpc in steradian
+_DEFAULT_SOLID_ANGLE = np.pi * (const.R_sun.to(u.m).value /
+                                const.kpc.to(u.m).value) ** 2
+
+# Switch between the series used for band integrals, see _bose_integral()
+_SERIES_SWITCH = 2.0
+
+
+def _bb_values(wavelengths, temperature, outer=True):
+    """Planck law in PHOTLAM per steradian, in plain floats.
+
+    Parameters
+    ----------
+    wavelengths : array_like
+        Wavelength values in Angstrom.
+
+    temperature : float or array_like
+        Blackbody temperature(s) in Kelvin.
+
+    outer : bool
+        If `True`, the result is evaluated at all wavelengths for each
+        temperature, with shape of
+        ``temperature.shape + wavelengths.shape``. Otherwise, inputs
+        are broadcast against each other.
+
+    Returns
+    -------
+    fluxes : array_like
+        Blackbody radiation.
+
+    """
+    wave = np.asarray(wavelengths, dtype=np.float64)
+    temperature = np.asarray(temperature, dtype=np.float64)
+
+    if outer and temperature.ndim > 0:
+        temperature = temperature.reshape(temperature.shape + (1, ) * wave.ndim)
+
+    # 1 / (exp(x) - 1) without overflow at large x (Wien limit) and
+    # with full precision at small x (Rayleigh-Jeans limit)
+    with np.errstate(divide='ignore'):
+        x = _HCK / (wave * temperature)
+        inv_factor = np.exp(-x) / -np.expm1(-x)
+
+    return np.asarray(_BB_FACTOR * inv_factor / wave ** 4)
+
+
+def _to_values(wavelengths, temperature):
+    """Extract values of wavelengths in Angstrom and temperature
+    in Kelvin.
+
+    """
+    if isinstance(wavelengths, u.Quantity):
+        wavelengths = wavelengths.to(u.AA, equivalencies=u.spectral()).value
 
+    if isinstance(temperature, u.Quantity):
+        temperature = units.validate_quantity(temperature, u.K).value
 
-__all__ = ['bbfunc', 'bb_photlam_arcsec', 'bb_photlam']
+    return wavelengths, temperature
 
 
 def bbfunc(wavelengths, temperature):
@@ -27,31 +100,20 @@ def bbfunc(wavelengths, temperature):
     wavelengths : array_like or `astropy.units.quantity.Quantity`
         Wavelength values. If not a Quantity, assumed to be in Angstrom.
 
-    temperature : float or `astropy.units.quantity.Quantity`
-        Blackbody temperature. If not a Quantity, assumed to be in Kelvin.
+    temperature : float, array_like, or `astropy.units.quantity.Quantity`
+        Blackbody temperature(s). If not a Quantity, assumed to be in
+        Kelvin. For multiple temperatures, the result has one row
+        per temperature.
 
     Returns
     -------
     fluxes : `astropy.units.quantity.Quantity`
-        Blackbody radiation in PHOTLAM per steradian.
+        Blackbody radiation in PHOTLAM per steradian, with shape of
+        ``temperature.shape + wavelengths.shape``.
 
     """
-    if not isinstance(wavelengths, u.Quantity):
-        wavelengths = u.Quantity(wavelengths, unit=u.AA)
-
-    # Calculations must use Hz
-    freq = wavelengths.to(u.Hz, equivalencies=u.spectral())
-
-    # Calculations must use Kelvin
-    temperature = units.validate_quantity(temperature, u.K)
-
-    # Calculate blackbody radiation in FNU, then convert to PHOTLAM
-    factor = np.expm1(const.h * freq / (const.k_B * temperature))
-    bb_nu = 2 * const.h * freq * freq * freq / (const.c ** 2 * factor)
-    bb_lam = units.FNU.to(units.PHOTLAM, bb_nu.cgs.value,
-                          equivalencies=u.spectral_density(wavelengths))
-
-    return u.Quantity(bb_lam, unit=units.PHOTLAM/u.sr)
+    bb_lam = _bb_values(*_to_values(wavelengths, temperature))
+    return u.Quantity(bb_lam, unit=units.PHOTLAM/u.sr, copy=False)
 
 
 def bb_photlam_arcsec(wavelengths, temperature):
@@ -62,8 +124,8 @@ def bb_photlam_arcsec(wavelengths, temperature):
     wavelengths : array_like or `astropy.units.quantity.Quantity`
         Wavelength values. If not a Quantity, assumed to be in Angstrom.
 
-    temperature : float or `astropy.units.quantity.Quantity`
-        Blackbody temperature. If not a Quantity, assumed to be in Kelvin.
+    temperature : float, array_like, or `astropy.units.quantity.Quantity`
+        Blackbody temperature(s). See :func:`bbfunc`.
 
     Returns
     -------
@@ -71,9 +133,9 @@ def bb_photlam_arcsec(wavelengths, temperature):
         Blackbody radiation in PHOTLAM per square arcsec.
 
     """
-    fac = u.Quantity(u.rad.to(u.arcsec) ** 2, u.arcsec**2/u.sr)
-    bb_photlam = bbfunc(wavelengths, temperature)
-    return bb_photlam / fac
+    bb_lam = _bb_values(*_to_values(wavelengths, temperature))
+    bb_lam /= _SR_TO_ARCSEC2
+    return u.Quantity(bb_lam, unit=units.PHOTLAM/u.arcsec**2, copy=False)
 
 
 def bb_photlam(wavelengths, temperature, r=const.R_sun, d=const.kpc):
@@ -93,8 +155,8 @@ def bb_photlam(wavelengths, temperature, r=const.R_sun, d=const.kpc):
     wavelengths : array_like or `astropy.units.quantity.Quantity`
         Wavelength values. If not a Quantity, assumed to be in Angstrom.
 
-    temperature : float or `astropy.units.quantity.Quantity`
-        Blackbody temperature. If not a Quantity, assumed to be in Kelvin.
+    temperature : float, array_like, or `astropy.units.quantity.Quantity`
+        Blackbody temperature(s). See :func:`bbfunc`.
 
     r : float or `astropy.units.quantity.Quantity`
         Radius of the star. If not a Quantity, assumed to be in meter.
@@ -110,11 +172,207 @@ def bb_photlam(wavelengths, temperature, r=const.R_sun, d=const.kpc):
         Normalized blackbody radiation in PHOTLAM.
 
     """
+    bb_lam = _bb_values(*_to_values(wavelengths, temperature))
+    bb_lam *= _solid_angle(r, d)
+    return u.Quantity(bb_lam, unit=units.PHOTLAM, copy=False)
+
+
+def _bb_photlam_values(wavelengths, temperature):
+    """Same as :func:`bb_photlam` with default radius and distance,
+    but for plain floats that are broadcast against each other.
+
+    """
+    return _bb_values(wavelengths, temperature, outer=False) * \
+        _DEFAULT_SOLID_ANGLE
+
+
+def _solid_angle(r, d):
+    """Solid angle in steradian for :func:`bb_photlam`."""
+    if r is const.R_sun and d is const.kpc:
+        return _DEFAULT_SOLID_ANGLE
+
     if not isinstance(r, u.Quantity):
         r = u.Quantity(r, u.m)
 
     d = units.validate_quantity(d, r.unit)
-    fac = u.Quantity(np.pi * (r.value / d.value) ** 2, unit=u.sr)
-    bb_photlam = bbfunc(wavelengths, temperature)
 
-    return bb_photlam * fac
+    return np.pi * (r.value / d.value) ** 2
+
+
+def _bernoulli_coeffs(n):
+    """Coefficients of :math:`t / (e^{t} - 1) = \\sum_{k} c_{k} t^{k}`,
+    i.e., :math:`c_{k} = B_{k} / k!`, for ``k`` up to ``n``.
+
+    Bernoulli numbers are computed exactly with the
+    Akiyama-Tanigawa algorithm, using :math:`B_{1} = -1/2`.
+
+    """
+    a = [0] * (n + 1)
+    coeffs = []
+
+    for m in xrange(n + 1):
+        a[m] = Fraction(1, m + 1)
+        for j in xrange(m, 0, -1):
+            a[j - 1] = j * (a[j - 1] - a[j])
+        coeffs.append(float(a[0] / factorial(m)))
+
+    coeffs[1] = -0.5
+
+    return np.array(coeffs)
+
+
+# Enough terms for double precision below _SERIES_SWITCH, as the
+# series converges like (t / 2 pi)^k
+_BERNOULLI_COEFFS = _bernoulli_coeffs(40)
+
+# Enough terms for double precision above _SERIES_SWITCH, as the
+# series converges like exp(-n t)
+_N_EXP_TERMS = 25
+
+
+def _bose_integral(t1, t2, m):
+    """Integral of :math:`t^{m} / (e^{t} - 1)` from ``t1`` to ``t2``.
+
+    Below ``_SERIES_SWITCH``, the integrand is expanded in Bernoulli
+    numbers and integrated from zero. Above it, the integrand is
+    expanded as :math:`\\sum_{n} t^{m} e^{-nt}` and integrated to
+    infinity. The range is split at the switch, so neither series is
+    used outside of its domain of fast convergence.
+
+    Parameters
+    ----------
+    t1, t2 : array_like
+        Integration limits, where ``0 < t1 <= t2``.
+
+    m : int
+        Non-negative power of ``t``.
+
+    Returns
+    -------
+    result : array_like
+
+    """
+    t1 = np.asarray(t1, dtype=np.float64)
+    t2 = np.asarray(t2, dtype=np.float64)
+
+    # Antiderivative is log(1 - exp(-t))
+    if m == 0:
+        def _prim(t):
+            return np.where(t > 1, np.log1p(-np.exp(-np.maximum(t, 1))),
+                            np.log(-np.expm1(-np.minimum(t, 1))))
+
+        return _prim(t2) - _prim(t1)
+
+    # Integral from 0 to t (t <= _SERIES_SWITCH)
+    k = np.arange(_BERNOULLI_COEFFS.size)
+
+    def _lower(t):
+        t = t[..., np.newaxis]
+        return np.sum(_BERNOULLI_COEFFS * t ** (k + m) / (k + m), axis=-1)
+
+    # Integral from t to infinity (t >= _SERIES_SWITCH)
+    n = np.arange(1, _N_EXP_TERMS + 1, dtype=np.float64)
+    poly_coeffs = [factorial(m) / factorial(j) for j in xrange(m + 1)]
+
+    def _upper(t):
+        t = t[..., np.newaxis]
+        poly = sum([c * t ** j / n ** (m - j + 1)
+                    for j, c in enumerate(poly_coeffs)])
+        return np.sum(np.exp(-n * t) * poly, axis=-1)
+
+    lo1 = np.minimum(t1, _SERIES_SWITCH)
+    lo2 = np.minimum(t2, _SERIES_SWITCH)
+    hi1 = np.maximum(t1, _SERIES_SWITCH)
+    hi2 = np.maximum(t2, _SERIES_SWITCH)
+
+    return (_lower(lo2) - _lower(lo1)) + (_upper(hi1) - _upper(hi2))
+
+
+def _bb_integral_values(wave1, wave2, temperature, power=0):
+    """Integral of :math:`\\lambda^{p} B_{\\lambda}(T)` from ``wave1``
+    to ``wave2``, where :math:`B_{\\lambda}(T)` is given by
+    :func:`_bb_values`, without sampling.
+
+    Parameters
+    ----------
+    wave1, wave2 : array_like
+        Wavelength limits in Angstrom, where ``wave1 <= wave2``.
+
+    temperature : float or array_like
+        Blackbody temperature(s) in Kelvin. Inputs are broadcast
+        against each other.
+
+    power : int
+        Power of wavelength, up to 2.
+
+    Returns
+    -------
+    result : array_like
+        Integral in PHOTLAM per steradian times Angstrom to the
+        power of ``power + 1``.
+
+    Raises
+    ------
+    synphot.exceptions.SynphotError
+        Unsupported power.
+
+    """
+    m = 2 - power
+
+    if m < 0 or m != int(m):
+        raise exceptions.SynphotError(
+            'Band integral of blackbody is not available for wavelength '
+            'power of {0}.'.format(power))
+
+    # Substitute t = hc / (lambda k T)
+    c = _HCK / np.asarray(temperature, dtype=np.float64)
+    result = _bose_integral(c / np.asarray(wave2, dtype=np.float64),
+                            c / np.asarray(wave1, dtype=np.float64), int(m))
+
+    return np.asarray(_BB_FACTOR * c ** (power - 3) * result)
+
+
+def bb_photlam_integral(wave1, wave2, temperature, r=const.R_sun, d=const.kpc):
+    """Integrated blackbody radiation in PHOTLAM between two
+    wavelengths, normalized like :func:`bb_photlam`.
+
+    The integral is computed from series expansions of the Planck
+    law, which are accurate to double precision, instead of sampling
+    the spectrum.
+
+    Parameters
+    ----------
+    wave1, wave2 : float, array_like, or `astropy.units.quantity.Quantity`
+        Lower and upper wavelength limits. If not a Quantity,
+        assumed to be in Angstrom.
+
+    temperature : float, array_like, or `astropy.units.quantity.Quantity`
+        Blackbody temperature(s). If not a Quantity, assumed to be in
+        Kelvin. Inputs are broadcast against each other.
+
+    r, d
+        See :func:`bb_photlam`.
+
+    Returns
+    -------
+    result : `astropy.units.quantity.Quantity`
+        Integrated radiation in PHOTLAM times Angstrom.
+
+    Raises
+    ------
+    synphot.exceptions.SynphotError
+        Invalid wavelength limits.
+
+    """
+    wave1, temperature = _to_values(wave1, temperature)
+    wave2, temperature = _to_values(wave2, temperature)
+    wave1 = np.asarray(wave1, dtype=np.float64)
+    wave2 = np.asarray(wave2, dtype=np.float64)
+
+    if np.any(wave1 <= 0) or np.any(wave1 > wave2):
+        raise exceptions.SynphotError('Invalid wavelength limits.')
+
+    result = _bb_integral_values(wave1, wave2, temperature)
+    result *= _solid_angle(r, d)
+
+    return u.Quantity(result, unit=units.PHOTLAM * u.AA, copy=False)
@@ -7,6 +7,7 @@ from astropy import units as u
 
 # LOCAL
 from . import spectrum, config, exceptions, specio, units
+from .metadata import Provenance
 
 
 __all__ = ['ReddeningLaw', 'ExtinctionCurve']
@@ -44,7 +45,7 @@ class ReddeningLaw(spectrum.BaseUnitlessSpectrum):
     primary_area : `astropy.units.quantity.Quantity` or `None`
         Area that flux covers in cm^2.
 
-    metadata : dict
+    metadata : `~synphot.metadata.Metadata`
         Metadata. ``self.metadata['expr']`` must contain a descriptive string of the object.
 
     warnings : dict
@@ -256,7 +257,7 @@ class ExtinctionCurve(spectrum.BaseUnitlessSpectrum):
     primary_area : `astropy.units.quantity.Quantity` or `None`
         Area that flux covers in cm^2.
 
-    metadata : dict
+    metadata : `~synphot.metadata.Metadata`
         Metadata. ``self.metadata['expr']`` must contain a descriptive string of the object.
 
     warnings : dict
@@ -319,8 +320,8 @@ class ExtinctionCurve(spectrum.BaseUnitlessSpectrum):
                 'E(B-V)={0} is invalid.'.format(ebv))
 
         thru = 10**(-0.4 * redlaw.thru.value * ebv)
-        hdr = {'expr': '{0} from {1} with E(B-V)={2}'.format(
-                cls.__name__, str(redlaw), ebv)}
+        hdr = {'expr': Provenance('{0} from {1} with E(B-V)={2}',
+                                  cls.__name__, redlaw.provenance, ebv)}
 
         return cls(redlaw.wave, thru, area=redlaw.primary_area, header=hdr)
 
@@ -11,9 +11,11 @@ Here are the two main classes:
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 # STDLIB
+import hashlib
 import os
-from collections import Iterable
-from copy import deepcopy
+from collections import Iterable, OrderedDict
+from copy import copy, deepcopy
+from multiprocessing.pool import ThreadPool
 
 # THIRD-PARTY
 import numpy as np
@@ -21,13 +23,23 @@ import numpy as np
 # ASTROPY
 from astropy import log
 from astropy import units as u
+from astropy.table import Table
 
 # LOCAL
-from . import binning, planck, exceptions, config, specio, utils, units
+from . import (binning, planck, exceptions, config, specio, utils, units,
+               zeropoints)
+from .metadata import Metadata, Provenance
 
 
 __all__ = ['BaseSpectrum', 'BaseUnitlessSpectrum', 'SourceSpectrum',
-           'SpectralElement']
+           'SpectralElement', 'RedshiftedSpectra', 'SpectrumBatch',
+           'LazySpectrum', 'CompiledBand', 'Renormalizer', 'band_properties',
+           'clear_standard_fluxes']
+
+# Standard fluxes for renormalization, see _standard_flux().
+# Least recently used entries are dropped beyond _STDFLUX_CACHE_SIZE.
+_STDFLUX_CACHE = OrderedDict()
+_STDFLUX_CACHE_SIZE = 256
 
 
 class BaseSpectrum(object):
@@ -58,7 +70,13 @@ class BaseSpectrum(object):
         If not a Quantity, assumed to be in cm^2.
 
     header : dict, optional
-        Metadata.
+        Metadata. It is referenced, not copied, and never modified.
+
+    precision : {`None`, 'single', 'double'}, optional
+        Storage precision of fluxes. If 'single', fluxes are stored and
+        operated on as ``float32``, while wavelengths and integrations
+        stay in ``float64``. If `None`, use
+        :data:`synphot.config.FLUX_PRECISION`.
 
     Attributes
     ----------
@@ -68,7 +86,10 @@ class BaseSpectrum(object):
     primary_area : `astropy.units.quantity.Quantity` or `None`
         Area that flux covers in cm^2.
 
-    metadata : dict
+    precision : {'single', 'double'}
+        Storage precision of fluxes.
+
+    metadata : `~synphot.metadata.Metadata`
         Metadata. ``self.metadata['expr']`` must contain a descriptive string of the object.
 
     warnings : dict
@@ -90,13 +111,14 @@ class BaseSpectrum(object):
 
     """
     def __init__(self, wavelengths, fluxes, flux_unit=units.FLAM, area=None,
-                 header={}):
+                 header=None, precision=None):
         self.warnings = {}
+        self.precision = utils.validate_precision(precision)
 
         if not isinstance(fluxes, u.Quantity):
-            self.flux = u.Quantity(fluxes, unit=flux_unit)
+            self.flux = self._cast_flux(u.Quantity(fluxes, unit=flux_unit))
         else:
-            self.flux = fluxes.copy()
+            self.flux = self._cast_flux(fluxes.copy())
 
         self._validate_flux_unit(self.flux.unit)
         self._validate_flux_value()
@@ -106,6 +128,10 @@ class BaseSpectrum(object):
         else:
             self.wave = wavelengths.copy()
 
+        # Keep wavelengths in double precision
+        if self.precision == 'single' and self.wave.dtype != np.float64:
+            self.wave = u.Quantity(self.wave, dtype=np.float64)
+
         utils.validate_wavelengths(self.wave)
 
         if self.wave.value.shape != self.flux.value.shape:
@@ -118,10 +144,25 @@ class BaseSpectrum(object):
         else:
             self.primary_area = units.validate_quantity(area, units.AREA)
 
-        self.metadata = header
+        if isinstance(header, Metadata):
+            self.metadata = header
+        elif header is None:
+            self.metadata = Metadata()
+        else:
+            self.metadata = Metadata(parents=(header, ))
+
         if 'expr' not in self.metadata:
             self.metadata['expr'] = self.__class__.__name__
 
+    def _cast_flux(self, flux):
+        """Cast flux or throughput to ``self.precision``.
+        No copy is done for double precision.
+
+        """
+        if self.precision == 'single' and flux.dtype != np.float32:
+            flux = u.Quantity(flux, dtype=np.float32)
+        return flux
+
     @staticmethod
     def _validate_flux_unit(new_unit):
         """Check flux unit before conversion."""
@@ -142,6 +183,26 @@ class BaseSpectrum(object):
         """Descriptive info of the object."""
         return self.metadata['expr']
 
+    @property
+    def fingerprint(self):
+        """Hash of wavelengths and fluxes, including their units.
+        Spectra with the same fingerprint have the same data.
+
+        """
+        sha = hashlib.sha1()
+        for q in (self.wave, self.flux):
+            sha.update(q.unit.to_string().encode('utf-8'))
+            sha.update(np.ascontiguousarray(q.value, dtype=np.float64))
+        return sha.hexdigest()
+
+    @property
+    def provenance(self):
+        """Unrendered ``self.metadata['expr']``, to be shared by
+        :class:`~synphot.metadata.Provenance` of derived objects.
+
+        """
+        return self.metadata.get_raw('expr')
+
     def merge_wave(self, other, **kwargs):
         """Return the union of the two sets of wavelengths.
 
@@ -238,7 +299,74 @@ class BaseSpectrum(object):
         if newasc != oldasc:
             resampled_result = resampled_result[::-1]
 
-        return u.Quantity(resampled_result, unit=self.flux.unit)
+        return self._cast_flux(
+            u.Quantity(resampled_result, unit=self.flux.unit))
+
+    def _validate_operand(self, other, op_type):
+        """Check that given operation is allowed between self and
+        other spectrum/scalar value.
+
+        Parameters
+        ----------
+        other : obj or number
+            The other spectrum or scalar value to operate on.
+
+        op_type : {'+', '-', '*', '/'}
+            Operation type.
+
+        Returns
+        -------
+        is_scalar_op : bool
+            `True` if ``other`` is a scalar value.
+
+        Raises
+        ------
+        synphot.exceptions.IncompatibleSources
+            If self and other are not compatible.
+
+        """
+        if isinstance(other, (int, long, float)):
+            return True
+
+        if not isinstance(other, BaseSpectrum):
+            raise exceptions.IncompatibleSources(
+                'other is not a number or a spectrum object')
+
+        if self.primary_area != other.primary_area:
+            raise exceptions.IncompatibleSources(
+                'Areas covered by flux are not the same: {0}, {1}'.format(
+                    self.primary_area, other.primary_area))
+
+        # Spectrum can only divided by dimensionless value
+        if op_type == '/' and other.flux.unit != u.dimensionless_unscaled:
+            raise exceptions.IncompatibleSources(
+                'The other spectrum must be dimensionless in / op')
+
+        # Multiplication can only be between spectrum and dimensionless
+        if (op_type == '*' and
+              self.flux.unit != u.dimensionless_unscaled and
+              other.flux.unit != u.dimensionless_unscaled):
+            raise exceptions.IncompatibleSources(
+                'One of the spectra must be dimensionless in * op')
+
+        # Addition and subtraction cannot mix SourceSpectrum and
+        # SpectralElement
+        if op_type in ('+', '-') and not isinstance(other, self.__class__):
+            raise exceptions.IncompatibleSources(
+                'Cannot perform {0} between {1} and {2}'.format(
+                    op_type, self.__class__.__name__,
+                    other.__class__.__name__))
+
+        # Operation between mag and linear flux is not allowed
+        if ((self.flux.unit.decompose() == u.mag and
+               other.flux.unit.decompose() not in
+               (u.dimensionless_unscaled, u.mag)) or
+              (self.flux.unit.decompose() != u.mag and
+               other.flux.unit.decompose() == u.mag)):  # pragma: no cover
+            raise exceptions.IncompatibleSources(
+                'Operation between mag and linear flux is not allowed')
+
+        return False
 
     def _operate_on(self, other, op_type):
         """Perform given operation between self and other
@@ -283,9 +411,14 @@ class BaseSpectrum(object):
             If self and other are not compatible.
 
         """
+        # Lazy operation, result is also lazy
+        if isinstance(other, LazySpectrum):
+            return self.lazy()._operate_on(other, op_type)
+
+        is_scalar_op = self._validate_operand(other, op_type)
+
         # Scalar operation
-        if isinstance(other, (int, long, float)):
-            is_scalar_op = True
+        if is_scalar_op:
             new_wave = self.wave
             resamp_flux_1 = self.flux
 
@@ -296,43 +429,7 @@ class BaseSpectrum(object):
                 resamp_flux_2 = other
 
         # Spectra operation
-        elif isinstance(other, BaseSpectrum):
-            is_scalar_op = False
-
-            if self.primary_area != other.primary_area:
-                raise exceptions.IncompatibleSources(
-                    'Areas covered by flux are not the same: {0}, {1}'.format(
-                        self.primary_area, other.primary_area))
-
-            # Spectrum can only divided by dimensionless value
-            if op_type == '/' and other.flux.unit != u.dimensionless_unscaled:
-                raise exceptions.IncompatibleSources(
-                    'The other spectrum must be dimensionless in / op')
-
-            # Multiplication can only be between spectrum and dimensionless
-            if (op_type == '*' and
-                  self.flux.unit != u.dimensionless_unscaled and
-                  other.flux.unit != u.dimensionless_unscaled):
-                raise exceptions.IncompatibleSources(
-                    'One of the spectra must be dimensionless in * op')
-
-            # Addition and subtraction cannot mix SourceSpectrum and
-            # SpectralElement
-            if op_type in ('+', '-') and not isinstance(other, self.__class__):
-                raise exceptions.IncompatibleSources(
-                    'Cannot perform {0} between {1} and {2}'.format(
-                        op_type, self.__class__.__name__,
-                        other.__class__.__name__))
-
-            # Operation between mag and linear flux is not allowed
-            if ((self.flux.unit.decompose() == u.mag and
-                   other.flux.unit.decompose() not in
-                   (u.dimensionless_unscaled, u.mag)) or
-                  (self.flux.unit.decompose() != u.mag and
-                   other.flux.unit.decompose() == u.mag)):  # pragma: no cover
-                raise exceptions.IncompatibleSources(
-                    'Operation between mag and linear flux is not allowed')
-
+        else:
             # Merged wavelengths in self.wave.unit
             new_wave = self.merge_wave(other)
 
@@ -341,17 +438,13 @@ class BaseSpectrum(object):
 
             if op_type in ('+', '-'):
                 # Convert to self.flux.unit
-                other2 = deepcopy(other)
+                other2 = copy(other)  # Conversion does not modify flux
                 other2.convert_flux(self.flux.unit)
                 resamp_flux_2 = other2.resample(new_wave)
             else:
                 # Retain other.flux.unit
                 resamp_flux_2 = other.resample(new_wave)
 
-        else:
-            raise exceptions.IncompatibleSources(
-                'other is not a number or a spectrum object')
-
         # Perform operation on the flux quantities
         if op_type == '+':
             result = resamp_flux_1 + resamp_flux_2
@@ -367,15 +460,14 @@ class BaseSpectrum(object):
 
         # Merge metadata (self overwrites other if duplicate exists)
         if is_scalar_op:
-            new_metadata = {}
+            new_metadata = Metadata(parents=(self.metadata, ))
         else:
-            new_metadata = deepcopy(other.metadata)
+            new_metadata = Metadata(parents=(self.metadata, other.metadata))
 
-        new_metadata.update(self.metadata)
         del new_metadata['expr']  # Let init re-assign this
 
         return self.__class__(new_wave, result, area=self.primary_area,
-                              header=new_metadata)
+                              header=new_metadata, precision=self.precision)
 
     def __add__(self, other):
         """Add self with other."""
@@ -397,6 +489,124 @@ class BaseSpectrum(object):
         """Divide self by other."""
         return self._operate_on(other, '/')
 
+    def _operate_in_place(self, other, op_type):
+        """Perform given operation between self and other
+        spectrum/scalar value, updating ``self.flux`` in-place.
+
+        This is only possible if ``other`` is a scalar or a spectrum
+        with the same wavelengths as ``self``, and the result would
+        be of the same class as ``self``. Otherwise, a new spectrum
+        is created by the corresponding math operator.
+
+        As with :func:`_operate_on`, the updated spectrum inherits
+        metadata from both and old warnings are thrown away.
+
+        Parameters
+        ----------
+        other : obj or number
+            The other spectrum or scalar value to operate on.
+
+        op_type : {'+', '-', '*', '/'}
+            Operation type.
+
+        Returns
+        -------
+        newspec : obj
+            ``self`` if updated in-place, else a new spectrum.
+
+        Raises
+        ------
+        synphot.exceptions.IncompatibleSources
+            If self and other are not compatible.
+
+        """
+        # Operators that might have special handling in child classes
+        new_object_op = {'+': self.__add__, '-': self.__sub__,
+                         '*': self.__mul__, '/': self.__truediv__}
+
+        if isinstance(other, LazySpectrum):
+            return new_object_op[op_type](other)
+
+        if self._validate_operand(other, op_type):
+            other_value = other
+            parents = (self.metadata, )
+
+        # Only same wavelengths and same result class can be in-place
+        elif (other.wave.unit == self.wave.unit and
+                np.array_equal(other.wave.value, self.wave.value) and
+                (op_type != '*' or not isinstance(other, SourceSpectrum) or
+                 isinstance(self, SourceSpectrum))):
+            if op_type in ('+', '-') and other.flux.unit != self.flux.unit:
+                other_value = units.convert_flux(
+                    other.wave, other.flux, self.flux.unit,
+                    area=other.primary_area).value
+            else:
+                other_value = other.flux.value
+            parents = (self.metadata, other.metadata)
+
+        else:
+            return new_object_op[op_type](other)
+
+        flux_value = self.flux.value
+
+        if op_type == '+':
+            np.add(flux_value, other_value, out=flux_value)
+        elif op_type == '-':
+            np.subtract(flux_value, other_value, out=flux_value)
+        elif op_type == '*':
+            np.multiply(flux_value, other_value, out=flux_value)
+        elif op_type == '/':
+            np.true_divide(flux_value, other_value, out=flux_value)
+        else:  # pragma: no cover
+            raise exceptions.SynphotError(
+                'Operation type {0} not supported'.format(op_type))
+
+        self.warnings = {}
+        self._validate_flux_value()
+        self._clear_caches()
+
+        self.metadata = Metadata(
+            {'expr': self.__class__.__name__}, parents=parents)
+
+        return self
+
+    def _clear_caches(self):
+        """Forget values calculated from the data, which was modified
+        in-place. To be extended by child classes that keep them."""
+        pass
+
+    def __iadd__(self, other):
+        """Add other to self in-place, if possible."""
+        return self._operate_in_place(other, '+')
+
+    def __isub__(self, other):
+        """Subtract other from self in-place, if possible."""
+        return self._operate_in_place(other, '-')
+
+    def __imul__(self, other):
+        """Multiply self by other in-place, if possible."""
+        return self._operate_in_place(other, '*')
+
+    def __itruediv__(self, other):
+        """Divide self by other in-place, if possible."""
+        return self._operate_in_place(other, '/')
+
+    def lazy(self):
+        """Return a lazy expression of this spectrum.
+
+        Math operators on the result build a :class:`LazySpectrum`
+        expression instead of evaluating each operation right away.
+        Use :func:`LazySpectrum.evaluate` to get the resultant
+        spectrum.
+
+        Returns
+        -------
+        lazyspec : `LazySpectrum`
+            Lazy expression that only contains ``self``.
+
+        """
+        return LazySpectrum(self)
+
     def convert_wave(self, out_wave_unit):
         """Convert ``self.wave`` to a different unit.
         The attribute is updated in-place.
@@ -535,7 +745,8 @@ class BaseSpectrum(object):
         new_flux = self.flux[mask]
 
         return self.__class__(new_wave, new_flux, area=self.primary_area,
-                              header=deepcopy(self.metadata))
+                              header=Metadata(parents=(self.metadata, )),
+                              precision=self.precision)
 
     def taper(self):
         """Taper the spectrum by adding zero flux or throughput
@@ -738,7 +949,7 @@ class BaseUnitlessSpectrum(BaseSpectrum):
     primary_area : `astropy.units.quantity.Quantity` or `None`
         Area that flux covers in cm^2.
 
-    metadata : dict
+    metadata : `~synphot.metadata.Metadata`
         Metadata. ``self.metadata['expr']`` must contain a descriptive string of the object.
 
     warnings : dict
@@ -832,7 +1043,7 @@ class SourceSpectrum(BaseSpectrum):
     primary_area : `astropy.units.quantity.Quantity` or `None`
         Area that flux covers in cm^2.
 
-    metadata : dict
+    metadata : `~synphot.metadata.Metadata`
         Metadata. ``self.metadata['expr']`` must contain a descriptive string of the object.
 
     warnings : dict
@@ -932,8 +1143,9 @@ class SourceSpectrum(BaseSpectrum):
 
         """
         self._validate_flux_unit(out_flux_unit)
-        self.flux = units.convert_flux(self.wave, self.flux, out_flux_unit,
-                                       area=self.primary_area, vegaspec=None)
+        self.flux = self._cast_flux(units.convert_flux(
+            self.wave, self.flux, out_flux_unit, area=self.primary_area,
+            vegaspec=None))
 
     def apply_redshift(self, z):
         """Return a new spectrum with redshifted wavelengths.
@@ -950,14 +1162,16 @@ class SourceSpectrum(BaseSpectrum):
 
         Parameters
         ----------
-        z : float
-            Redshift to apply.
+        z : float or array_like
+            Redshift to apply. If an array is given, the spectrum is
+            not copied; see `RedshiftedSpectra`.
 
         Returns
         -------
         newspec : obj
             Spectrum with redshifted wavelengths, same class and
-            units as ``self``.
+            units as ``self``. If ``z`` is an array, a
+            `RedshiftedSpectra` is returned instead.
 
         Raises
         ------
@@ -965,7 +1179,9 @@ class SourceSpectrum(BaseSpectrum):
             Invalid redshift value.
 
         """
-        if not isinstance(z, (int, long, float)):
+        if isinstance(z, (Iterable, np.ndarray)) and np.ndim(z) == 1:
+            return RedshiftedSpectra(self, z)
+        elif not isinstance(z, (int, long, float)):
             raise exceptions.SynphotError('Redshift must be a number.')
 
         wave_type = self.wave.unit.physical_type
@@ -976,14 +1192,15 @@ class SourceSpectrum(BaseSpectrum):
         else:  # frequency or wavenumber
             new_wave = self.wave / fac
 
-        new_metadata = deepcopy(self.metadata)
-        new_metadata['expr'] = '{0} at z={1}'.format(str(self), z)
+        new_metadata = Metadata(
+            {'expr': Provenance('{0} at z={1}', self.provenance, z)},
+            parents=(self.metadata, ))
 
         return self.__class__(new_wave, self.flux, area=self.primary_area,
-                              header=new_metadata)
+                              header=new_metadata, precision=self.precision)
 
     @classmethod
-    def from_file(cls, filename, area=None, **kwargs):
+    def from_file(cls, filename, area=None, precision=None, **kwargs):
         """Creates a spectrum object from file.
 
         If filename has 'fits' or 'fit' suffix, it is read as FITS.
@@ -999,6 +1216,9 @@ class SourceSpectrum(BaseSpectrum):
             the primary mirror of the observatory of interest.
             If not a Quantity, assumed to be in cm^2.
 
+        precision : {`None`, 'single', 'double'}, optional
+            Storage precision of values. See `BaseSpectrum`.
+
         kwargs : dict
             Keywords acceptable by
             :func:`synphot.specio.read_fits_spec` (if FITS) or
@@ -1011,7 +1231,8 @@ class SourceSpectrum(BaseSpectrum):
 
         """
         header, wavelengths, fluxes = specio.read_spec(filename, **kwargs)
-        return cls(wavelengths, fluxes, area=area, header=header)
+        return cls(wavelengths, fluxes, area=area, header=header,
+                   precision=precision)
 
     def to_fits(self, filename, **kwargs):
         """Write the spectrum to a FITS file.
@@ -1106,12 +1327,111 @@ class SourceSpectrum(BaseSpectrum):
         synphot.exceptions.SynphotError
             Invalid inputs or calculation failed.
 
+        """
+        consts, is_mag, warnings = self._renorm_consts(
+            renorm_val, band, force, vegaspec)
+
+        if is_mag:
+            newsp = self.add_mag(consts)
+        else:
+            newsp = self.__mul__(consts)
+
+        newsp.warnings.update(warnings)
+        return newsp
+
+    def _renorm_consts(self, renorm_val, band, force, vegaspec):
+        """Calculate renormalization constants for :func:`renorm`.
+
+        Parameters
+        ----------
+        renorm_val : number, array_like, or `astropy.units.quantity.Quantity`
+            Value(s) to renormalize the spectrum to.
+
+        band, force, vegaspec
+            See :func:`renorm`.
+
+        Returns
+        -------
+        consts : number or array_like
+            Magnitude(s) to add if ``is_mag=True``, otherwise
+            factor(s) to multiply by.
+
+        is_mag : bool
+            Renormalization is done in magnitudes.
+
+        warnings : dict
+            Warnings to be added to renormalized spectrum.
+
         """
         if not isinstance(band, SpectralElement):
             raise exceptions.SynphotError(
                 'Renormalization passband must be a SpectralElement.')
 
-        # Validate the overlap.
+        warnings = self._check_renorm_overlap(band, force)
+
+        if not isinstance(renorm_val, u.Quantity):
+            renorm_val = u.Quantity(renorm_val, unit=self.flux.unit)
+
+        renorm_unit_name = renorm_val.unit.to_string()
+
+        # Compute the flux of the spectrum through the passband
+        sp = self.__mul__(band)
+
+        # Special handling for non-density units
+        if renorm_unit_name in (u.count.to_string(), units.OBMAG.to_string()):
+            flux_tmp = units.convert_flux(
+                sp.wave, sp.flux, u.count, area=sp.primary_area)
+            totalflux = flux_tmp.sum(dtype=np.float64)
+
+        # Flux density units and VEGAMAG
+        else:
+            totalflux = sp.integrate()
+
+        utils.validate_totalflux(totalflux.value)
+
+        stdflux = _standard_flux(band, renorm_val.unit, totalflux.unit,
+                                 sp.wave.unit, area=self.primary_area,
+                                 vegaspec=vegaspec)
+
+        # Renormalize in magnitudes
+        if renorm_val.unit.decompose() == u.mag:
+            is_mag = True
+            consts = renorm_val.value + 2.5 * np.log10(
+                totalflux.value / stdflux)
+
+        # Renormalize in linear flux units
+        else:
+            is_mag = False
+            consts = renorm_val.value * (stdflux / totalflux.value)
+
+        return consts, is_mag, warnings
+
+    def _check_renorm_overlap(self, band, force):
+        """Validate overlap with renormalization passband.
+
+        Parameters
+        ----------
+        band : `SpectralElement`
+            Renormalization passband.
+
+        force : bool
+            See :func:`renorm`.
+
+        Returns
+        -------
+        warnings : dict
+            Warnings to be added to renormalized spectrum.
+
+        Raises
+        ------
+        synphot.exceptions.DisjointError
+            Renormalization band does not overlap with ``self``.
+
+        synphot.exceptions.PartialOverlap
+            Renormalization band only partially overlaps with ``self``
+            and significant amount of flux falls outside the overlap.
+
+        """
         stat = band.check_overlap(self)
         warnings = {}
 
@@ -1145,56 +1465,95 @@ class SourceSpectrum(BaseSpectrum):
             raise exceptions.SynphotError(
                 'Overlap result of {0} is unexpected'.format(stat))
 
-        if not isinstance(renorm_val, u.Quantity):
-            renorm_val = u.Quantity(renorm_val, unit=self.flux.unit)
+        return warnings
 
-        renorm_unit_name = renorm_val.unit.to_string()
 
-        # Compute the flux of the spectrum through the passband
-        sp = self.__mul__(band)
+def _standard_flux(band, renorm_unit, flux_unit, wave_unit, area=None,
+                   vegaspec=None):
+    """Integrated flux of the standard spectrum through the passband,
+    used by :func:`SourceSpectrum.renorm`.
 
-        # Special handling for non-density units
-        if renorm_unit_name in (u.count.to_string(), units.OBMAG.to_string()):
-            stdflux = 1.0
-            flux_tmp = units.convert_flux(
-                sp.wave, sp.flux, u.count, area=sp.primary_area)
-            totalflux = flux_tmp.sum()
+    The standard spectrum is a flat spectrum in the renormalization
+    unit, or Vega for VEGAMAG. The result only depends on the inputs,
+    so it is cached by their values, using
+    :attr:`BaseSpectrum.fingerprint` for the passband, for the most
+    recently used ``_STDFLUX_CACHE_SIZE`` combinations (see also
+    :func:`clear_standard_fluxes`). Vega integrals
+    are served by :func:`synphot.zeropoints.vega_integral`.
 
-        # Flux density units and VEGAMAG
-        else:
-            totalflux = sp.integrate()
+    Parameters
+    ----------
+    band : `SpectralElement`
+        Renormalization passband.
 
-            # Get the standard unit spectrum in the renormalization units.
-            if renorm_unit_name == units.VEGAMAG.to_string():
-                if not isinstance(vegaspec, SourceSpectrum):
-                    raise exceptions.SynphotError(
-                        'Vega spectrum is missing.')
-                stdspec = vegaspec
-            else:
-                from . import analytic  # Avoid circular import error
-                flat = analytic.flat_spectrum(
-                    renorm_val.unit, wave_unit=band.wave.unit,
-                    area=self.primary_area)
-                stdspec = flat.to_spectrum(band.wave)
+    renorm_unit : `astropy.units.core.Unit`
+        Renormalization unit.
 
-            up = stdspec * band
-            up.convert_flux(totalflux.unit)
-            stdflux = up.integrate().value
+    flux_unit, wave_unit : `astropy.units.core.Unit`
+        Units of the integrated source spectrum to compare with.
 
-        utils.validate_totalflux(totalflux.value)
+    area : float, `astropy.units.quantity.Quantity`, or `None`
+        Area that fluxes cover, as needed by flux unit conversion.
 
-        # Renormalize in magnitudes
-        if renorm_val.unit.decompose() == u.mag:
-            const = renorm_val.value + 2.5 * np.log10(totalflux.value / stdflux)
-            newsp = self.add_mag(const)
+    vegaspec : `SourceSpectrum`
+        Vega spectrum. This is *only* used for VEGAMAG.
 
-        # Renormalize in linear flux units
-        else:
-            const = renorm_val.value * (stdflux / totalflux.value)
-            newsp = self.__mul__(const)
+    Returns
+    -------
+    stdflux : float
+        Integrated standard flux in ``flux_unit`` times ``wave_unit``.
+        For count and OBMAG, this is always 1.
 
-        newsp.warnings.update(warnings)
-        return newsp
+    Raises
+    ------
+    synphot.exceptions.SynphotError
+        Vega spectrum is missing.
+
+    """
+    renorm_unit_name = renorm_unit.to_string()
+
+    # Special handling for non-density units
+    if renorm_unit_name in (u.count.to_string(), units.OBMAG.to_string()):
+        return 1.0
+
+    # Vega zero points are handled separately
+    if renorm_unit_name == units.VEGAMAG.to_string():
+        return zeropoints.vega_integral(
+            band, vegaspec, flux_unit=flux_unit, wave_unit=wave_unit)
+
+    key = (band.fingerprint, str(area), renorm_unit_name,
+           flux_unit.to_string(), wave_unit.to_string())
+
+    # Move to the most recently used end
+    stdflux = _STDFLUX_CACHE.pop(key, None)
+
+    if stdflux is None:
+        # Get the standard unit spectrum in the renormalization units.
+        from . import analytic  # Avoid circular import error
+        flat = analytic.flat_spectrum(
+            renorm_unit, wave_unit=band.wave.unit, area=area)
+        stdspec = flat.to_spectrum(band.wave)
+
+        up = stdspec * band
+        up.convert_flux(flux_unit)
+        up.convert_wave(wave_unit)
+        stdflux = up.integrate().value
+
+        while len(_STDFLUX_CACHE) >= _STDFLUX_CACHE_SIZE:
+            _STDFLUX_CACHE.popitem(last=False)
+
+    _STDFLUX_CACHE[key] = stdflux
+
+    return stdflux
+
+
+def clear_standard_fluxes():
+    """Clear standard fluxes for renormalization kept in memory.
+
+    See :func:`synphot.zeropoints.clear_zeropoints` for Vega.
+
+    """
+    _STDFLUX_CACHE.clear()
 
 
 class SpectralElement(BaseUnitlessSpectrum):
@@ -1229,7 +1588,7 @@ class SpectralElement(BaseUnitlessSpectrum):
     primary_area : `astropy.units.quantity.Quantity` or `None`
         Area that flux covers in cm^2.
 
-    metadata : dict
+    metadata : `~synphot.metadata.Metadata`
         Metadata. ``self.metadata['expr']`` must contain a descriptive string of the object.
 
     warnings : dict
@@ -1251,6 +1610,117 @@ class SpectralElement(BaseUnitlessSpectrum):
         If negative or zero wavelength occurs in wavelength array.
 
     """
+    def __init__(self, wavelengths, throughput, **kwargs):
+        BaseUnitlessSpectrum.__init__(self, wavelengths, throughput, **kwargs)
+
+        # Integrals for passband properties, calculated as needed.
+        # See _get_moment().
+        self._moments = {}
+
+    def _get_moment(self, name, threshold=None):
+        """Integral for passband properties, calculated on first use
+        and reused until ``self.wave`` or ``self.thru`` is reassigned
+        or modified in-place.
+
+        Each integral is calculated exactly as the property that
+        needs it did on its own, in the precision of the data, so
+        the properties do not depend on the memoization.
+
+        Parameters
+        ----------
+        name : str
+            One of these, with :math:`\\lambda` from
+            :func:`synphot.utils.to_length`:
+
+                * 'equvw' - :math:`\\int T d\\lambda`
+                * 'wave' - :math:`\\int T \\lambda d\\lambda`
+                * 'thru_per_wave' - :math:`\\int T / \\lambda d\\lambda`
+                * 'uresp' - :math:`\\int T \\lambda d\\lambda` in Angstrom
+                * 'avgwave' - from :func:`synphot.utils.avg_wavelength`
+                * 'barlam' - from :func:`synphot.utils.barlam`
+                * 'rms_num', 'rms_den' - for :func:`rmswidth`
+                * 'bw_num' - for :func:`photbw`
+
+        threshold : float, optional
+            Data points with throughput below this value are not
+            included in the integral. By default, all data points
+            are included. 'avgwave' and 'barlam' within 'rms_num'
+            and 'bw_num' always include all data points.
+
+        Returns
+        -------
+        value : float
+            Integral.
+
+        wave_unit : `astropy.units.core.Unit`
+            Wavelength unit of the integral.
+
+        Raises
+        ------
+        synphot.exceptions.SynphotError
+            Threshold is invalid.
+
+        """
+        if threshold is not None and not isinstance(
+                threshold, (int, long, float)):
+            raise exceptions.SynphotError(
+                '{0} is not a valid threshold'.format(threshold))
+
+        cached = self._moments.get(threshold)
+        if (cached is None or cached[0][0] is not self.wave or
+                cached[0][1] is not self.thru):
+            wave = utils.to_length(self.wave)
+            thru = self.thru
+            if threshold is not None:
+                mask = thru.value >= threshold
+                wave = wave[mask]
+                thru = thru[mask]
+            cached = ((self.wave, self.thru), {}, wave, thru)
+            self._moments[threshold] = cached
+
+        moments, wave, thru = cached[1:]
+
+        if name not in moments:
+            w = wave.value
+            t = thru.value
+
+            if name == 'equvw':
+                val = utils.trapezoid_integration(w, t)
+            elif name == 'wave':
+                val = utils.trapezoid_integration(w, t * w)
+            elif name == 'thru_per_wave':
+                val = utils.trapezoid_integration(w, t / w)
+            elif name == 'uresp':
+                wave_aa = self.wave.to(u.AA, equivalencies=u.spectral())
+                val = utils.trapezoid_integration(
+                    wave_aa.value, (self.thru * wave_aa).value)
+            elif name == 'avgwave':
+                val = utils.avg_wavelength(w, t)
+            elif name == 'barlam':
+                val = utils.barlam(w, t)
+            elif name == 'rms_num':
+                avg_wave = u.Quantity(
+                    self._get_moment('avgwave')[0], unit=wave.unit)
+                val = utils.trapezoid_integration(
+                    w, ((wave - avg_wave)**2 * thru).value)
+            elif name == 'rms_den':
+                val = self.integrate(wavelengths=wave).value
+            elif name == 'bw_num':
+                avg_wave = self._get_moment('barlam')[0]
+                val = utils.trapezoid_integration(
+                    w, t * np.log(w / avg_wave) ** 2 / w)
+            else:  # pragma: no cover
+                raise exceptions.SynphotError(
+                    'Unknown moment {0}'.format(name))
+
+            moments[name] = val
+
+        return moments[name], wave.unit
+
+    def _clear_caches(self):
+        """Forget passband moments after in-place operation."""
+        self._moments.clear()
+
     def unit_response(self):
         """Calculate :ref:`unit response <synphot-formula-uresp>`
         of this passband.
@@ -1272,10 +1742,7 @@ class SpectralElement(BaseUnitlessSpectrum):
             raise exceptions.SynphotError('Area is undefined.')
 
         # Only correct if wavelengths are in Angstrom.
-        wave = self.wave.to(u.AA, equivalencies=u.spectral())
-
-        int_val = utils.trapezoid_integration(
-            wave.value, (self.thru * wave).value)
+        int_val = self._get_moment('uresp')[0]
         uresp = units.HC / (self.primary_area.cgs * int_val)
 
         return u.Quantity(uresp.value, unit=units.FLAM)
@@ -1289,11 +1756,8 @@ class SpectralElement(BaseUnitlessSpectrum):
             Passband pivot wavelength.
 
         """
-        wave = utils.to_length(self.wave)
-        num = utils.trapezoid_integration(
-            wave.value, self.thru.value * wave.value)
-        den = utils.trapezoid_integration(
-            wave.value, self.thru.value / wave.value)
+        num, wave_unit = self._get_moment('wave')
+        den = self._get_moment('thru_per_wave')[0]
 
         if den == 0:  # pragma: no cover
             pivwv = 0.0
@@ -1304,7 +1768,7 @@ class SpectralElement(BaseUnitlessSpectrum):
             else:
                 pivwv = np.sqrt(val)
 
-        return u.Quantity(pivwv, unit=wave.unit)
+        return u.Quantity(pivwv, unit=wave_unit)
 
     def rmswidth(self, threshold=None):
         """Calculate the passband RMS width as in
@@ -1330,22 +1794,8 @@ class SpectralElement(BaseUnitlessSpectrum):
             Threshold is invalid.
 
         """
-        wave = utils.to_length(self.wave)
-
-        if threshold is None:
-            wave = wave
-            thru = self.thru
-        elif isinstance(threshold, (int, long, float)):
-            mask = self.thru.value >= threshold
-            wave = wave[mask]
-            thru = self.thru[mask]
-        else:
-            raise exceptions.SynphotError(
-                '{0} is not a valid threshold'.format(threshold))
-
-        num = utils.trapezoid_integration(
-            wave.value, ((wave - self.avgwave())**2 * thru).value)
-        den = self.integrate(wavelengths=wave).value
+        num, wave_unit = self._get_moment('rms_num', threshold=threshold)
+        den = self._get_moment('rms_den', threshold=threshold)[0]
 
         if den == 0:  # pragma: no cover
             rms_width = 0.0
@@ -1356,7 +1806,7 @@ class SpectralElement(BaseUnitlessSpectrum):
             else:
                 rms_width = np.sqrt(val)
 
-        return u.Quantity(rms_width, unit=wave.unit)
+        return u.Quantity(rms_width, unit=wave_unit)
 
     def photbw(self, threshold=None):
         """Calculate the
@@ -1383,24 +1833,10 @@ class SpectralElement(BaseUnitlessSpectrum):
             Threshold is invalid.
 
         """
-        wv = utils.to_length(self.wave)
-        avg_wave = utils.barlam(wv.value, self.thru.value)
-
-        if threshold is None:
-            wave = wv.value
-            thru = self.thru.value
-        elif isinstance(threshold, (int, long, float)):
-            mask = self.thru.value >= threshold
-            wave = wv[mask].value
-            thru = self.thru[mask].value
-        else:
-            raise exceptions.SynphotError(
-                '{0} is not a valid threshold'.format(threshold))
-
         # calculate the rms width
-        num = utils.trapezoid_integration(
-            wave, thru * np.log(wave / avg_wave) ** 2 / wave)
-        den = utils.trapezoid_integration(wave, thru / wave)
+        num, wave_unit = self._get_moment('bw_num', threshold=threshold)
+        den = self._get_moment('thru_per_wave', threshold=threshold)[0]
+        avg_wave = self._get_moment('barlam')[0]
 
         if den == 0:  # pragma: no cover
             bandw = 0.0
@@ -1411,7 +1847,7 @@ class SpectralElement(BaseUnitlessSpectrum):
             else:
                 bandw = avg_wave * np.sqrt(val)
 
-        return u.Quantity(bandw, unit=wv.unit)
+        return u.Quantity(bandw, unit=wave_unit)
 
     def fwhm(self, threshold=None):
         """Calculate :ref:`synphot-formula-fwhm` of equivalent gaussian.
@@ -1432,8 +1868,8 @@ class SpectralElement(BaseUnitlessSpectrum):
         return np.sqrt(8 * np.log(2)) * self.photbw(threshold=threshold)
 
     def avgwave(self):
-        """Calculate the passband average wavelength using
-        :func:`synphot.utils.avg_wavelength`.
+        """Calculate the passband
+        :ref:`average wavelength <synphot-formula-avgwv>`.
 
         Returns
         -------
@@ -1441,9 +1877,8 @@ class SpectralElement(BaseUnitlessSpectrum):
             Passband average wavelength.
 
         """
-        wave = utils.to_length(self.wave)
-        avg_wave = utils.avg_wavelength(wave.value, self.thru.value)
-        return u.Quantity(avg_wave, unit=wave.unit)
+        avg_wave, wave_unit = self._get_moment('avgwave')
+        return u.Quantity(avg_wave, unit=wave_unit)
 
     def tlambda(self):
         """Calculate throughput at
@@ -1493,9 +1928,8 @@ class SpectralElement(BaseUnitlessSpectrum):
             Passband equivalent width.
 
         """
-        wave = utils.to_length(self.wave)
-        equvw = utils.trapezoid_integration(wave.value, self.thru.value)
-        return u.Quantity(equvw, unit=wave.unit)
+        equvw, wave_unit = self._get_moment('equvw')
+        return u.Quantity(equvw, unit=wave_unit)
 
     def rectwidth(self):
         """Calculate :ref:`passband rectangular width <synphot-formula-rectw>`.
@@ -1525,9 +1959,7 @@ class SpectralElement(BaseUnitlessSpectrum):
             Dimensionless efficiency.
 
         """
-        wave = utils.to_length(self.wave)
-        qtlam = utils.trapezoid_integration(
-            wave.value, self.thru.value / wave.value)
+        qtlam = self._get_moment('thru_per_wave')[0]
         return u.Quantity(qtlam, unit=u.dimensionless_unscaled)
 
     def emflx(self):
@@ -1550,8 +1982,27 @@ class SpectralElement(BaseUnitlessSpectrum):
 
         return em_flux
 
+    def compile(self, wavelengths):
+        """Compile this passband against the given wavelengths.
+
+        See `CompiledBand`.
+
+        Parameters
+        ----------
+        wavelengths : array_like or `astropy.units.quantity.Quantity`
+            Wavelength values of the source spectra to be integrated.
+            If not a Quantity, assumed to be in Angstrom.
+
+        Returns
+        -------
+        compiled_band : `CompiledBand`
+            Compiled passband.
+
+        """
+        return CompiledBand(self, wavelengths)
+
     @classmethod
-    def from_file(cls, filename, area=None, **kwargs):
+    def from_file(cls, filename, area=None, precision=None, **kwargs):
         """Creates a throughput object from file.
 
         If filename has 'fits' or 'fit' suffix, it is read as FITS.
@@ -1567,6 +2018,9 @@ class SpectralElement(BaseUnitlessSpectrum):
             the primary mirror of the observatory of interest.
             If not a Quantity, assumed to be in cm^2.
 
+        precision : {`None`, 'single', 'double'}, optional
+            Storage precision of values. See `BaseSpectrum`.
+
         kwargs : dict
             Keywords acceptable by
             :func:`synphot.specio.read_fits_spec` (if FITS) or
@@ -1586,7 +2040,8 @@ class SpectralElement(BaseUnitlessSpectrum):
             kwargs['flux_col'] = 'THROUGHPUT'
 
         header, wavelengths, throughput = specio.read_spec(filename, **kwargs)
-        return cls(wavelengths, throughput, area=area, header=header)
+        return cls(wavelengths, throughput, area=area, header=header,
+                   precision=precision)
 
     def to_fits(self, filename, **kwargs):
         """Write the spectrum to a FITS file.
@@ -1693,3 +2148,1319 @@ class SpectralElement(BaseUnitlessSpectrum):
         header['descrip'] = cfgitem.description
 
         return cls(wavelengths, throughput, area=area, header=header)
+
+
+class RedshiftedSpectra(object):
+    """Class to handle a source spectrum at many redshifts.
+
+    Redshifted spectra are not created until requested by indexing
+    or iteration. All of them share the flux of the rest-frame
+    spectrum, which should not be modified while this object is
+    in use.
+
+    Parameters
+    ----------
+    spec : `SourceSpectrum`
+        Rest-frame spectrum.
+
+    z : array_like
+        Redshift values.
+
+    Attributes
+    ----------
+    spec : `SourceSpectrum`
+        Rest-frame spectrum.
+
+    z : array_like
+        Redshift values.
+
+    Raises
+    ------
+    synphot.exceptions.SynphotError
+        Invalid inputs.
+
+    """
+    # Number of redshifts integrated together in effstim(), which
+    # bounds the memory of their shared wavelengths.
+    _block_size = 32
+
+    def __init__(self, spec, z):
+        if not isinstance(spec, SourceSpectrum):
+            raise exceptions.SynphotError(
+                '{0} is not a SourceSpectrum'.format(spec))
+
+        z = np.asarray(z)
+        if (z.ndim != 1 or z.dtype.kind not in ('i', 'u', 'f') or
+                not np.all(np.isfinite(z)) or np.any(z <= -1)):
+            raise exceptions.SynphotError(
+                'Redshifts must be a 1D array of numbers greater than -1.')
+
+        self.spec = spec
+        self.z = z.astype(np.float64)
+
+    def __len__(self):
+        return self.z.size
+
+    def __getitem__(self, key):
+        """Redshifted spectrum, or a subset if ``key`` is not
+        an integer.
+
+        """
+        if isinstance(key, (int, long, np.integer)):
+            return self.spec.apply_redshift(float(self.z[key]))
+        return self.__class__(self.spec, self.z[key])
+
+    def __iter__(self):
+        for i in xrange(self.z.size):
+            yield self[i]
+
+    def __str__(self):
+        """Descriptive info of the object."""
+        return '{0} at {1} redshifts'.format(str(self.spec), self.z.size)
+
+    def effstim(self, band, flux_unit=None, force='none'):
+        """Calculate :ref:`effective stimulus <synphot-formula-effstim>`
+        through the passband at all redshifts.
+
+        The result at each redshift is the same as::
+
+            obs = Observation.from_spec_band(self[i], band, force=force)
+            obs.effstim(flux_unit=flux_unit, band=band)
+
+        but without creating any spectrum object. Redshifts are
+        integrated in blocks (see ``_block_size``), on the union of
+        the passband and redshifted source wavelengths in the block,
+        so the result may differ from the above by the sampling
+        error of the trapezoid rule. Resultant fluxes are not
+        validated.
+
+        Parameters
+        ----------
+        band : `SpectralElement`
+            Passband.
+
+        flux_unit : `None`, str, or `astropy.units.core.Unit`
+            Linear flux density unit, STMAG, or ABMAG.
+            If `None`, uses the flux unit of ``self.spec``.
+
+        force : {'none', 'extrap'}
+            If 'none' (default), source spectrum must encompass the
+            passband at all redshifts. Otherwise, source spectrum is
+            extrapolated at constant value.
+
+        Returns
+        -------
+        eff_stim : `astropy.units.quantity.Quantity`
+            Effective stimulus at each redshift.
+
+        Raises
+        ------
+        synphot.exceptions.DisjointError
+            Passband does not overlap with source spectrum at some
+            redshifts.
+
+        synphot.exceptions.PartialOverlap
+            Passband only partially overlaps with source spectrum
+            at some redshifts when they must fully overlap.
+
+        synphot.exceptions.IncompatibleSources
+            Source spectrum and passband are not compatible.
+
+        synphot.exceptions.SynphotError
+            Invalid inputs.
+
+        """
+        if not isinstance(band, SpectralElement):
+            raise exceptions.SynphotError('Invalid passband')
+
+        if self.spec.primary_area != band.primary_area:
+            raise exceptions.IncompatibleSources(
+                'Areas covered by flux are not the same: {0}, {1}'.format(
+                    self.spec.primary_area, band.primary_area))
+
+        force = force.lower()
+        if force not in ('none', 'extrap'):
+            raise exceptions.SynphotError(
+                'force={0} is invalid, must be "none" or "extrap"'.format(
+                    force))
+
+        if flux_unit is None:
+            flux_unit = self.spec.flux.unit
+        else:
+            flux_unit = units.validate_unit(flux_unit)
+
+        # For mag, convert to corresponding linear flux unit
+        flux_unit_name = flux_unit.to_string()
+        if flux_unit_name == units.STMAG.to_string():
+            tmp_unit = units.FLAM
+            mag_zero = units.STZERO.value
+        elif flux_unit_name == units.ABMAG.to_string():
+            tmp_unit = units.FNU
+            mag_zero = units.ABZERO.value
+        elif flux_unit.decompose() != u.mag:
+            tmp_unit = flux_unit
+            SourceSpectrum._validate_flux_unit(tmp_unit)
+        else:
+            raise exceptions.SynphotError(
+                'Flux unit {0} is invalid'.format(flux_unit))
+
+        # Rest-frame spectrum and passband in ascending Angstrom
+        rest_wave = self.spec.wave.to(u.AA, equivalencies=u.spectral()).value
+        rest_flux = self.spec.flux.value
+        if rest_wave[0] > rest_wave[-1]:
+            rest_wave = rest_wave[::-1]
+            rest_flux = rest_flux[::-1]
+        band_wave = band.wave.to(u.AA, equivalencies=u.spectral()).value
+        band_thru = band.thru.value
+        if band_wave[0] > band_wave[-1]:
+            band_wave = band_wave[::-1]
+            band_thru = band_thru[::-1]
+
+        fac = 1.0 + self.z
+
+        den = utils.trapezoid_integration(band_wave, band_wave * band_thru)
+        utils.validate_totalflux(den)
+
+        # Validate overlap at all redshifts, as in Observation.from_spec_band
+        band_ends = band_wave[band_thru != 0]
+        band_ends = band_ends[[0, -1]]
+        spec_ends = rest_wave[rest_flux != 0]
+        spec_ends = spec_ends[[0, -1]]
+        stats = set(utils.overlap_status(band_ends, spec_ends * f)
+                    for f in fac)
+        if 'none' in stats:
+            raise exceptions.DisjointError(
+                'Source spectrum and passband are disjoint at some '
+                'redshifts.')
+        if force == 'none' and 'partial' in stats:
+            raise exceptions.PartialOverlap(
+                'Source spectrum and passband do not fully overlap at some '
+                'redshifts. You may use force="extrap" to force this '
+                'calculation anyway.')
+
+        # Outside the passband wavelengths, its throughput is extrapolated
+        # at the edge values. Where that is zero, redshifted source
+        # wavelengths do not contribute.
+        min_wave = band_wave[0] if band_thru[0] == 0 else -np.inf
+        max_wave = band_wave[-1] if band_thru[-1] == 0 else np.inf
+
+        num = np.empty(self.z.size, dtype=np.float64)
+
+        # Redshifts in each block are integrated together on the union
+        # of their wavelengths, with shared trapezoid weights.
+        for i in xrange(0, self.z.size, self._block_size):
+            blk = slice(i, i + self._block_size)
+            obs_wave = rest_wave * fac[blk, np.newaxis]
+            obs_wave = obs_wave[(obs_wave > min_wave) & (obs_wave < max_wave)]
+            wave = np.union1d(band_wave, obs_wave)
+
+            flux = np.interp(
+                (wave / fac[blk, np.newaxis]).ravel(), rest_wave,
+                rest_flux).reshape(-1, wave.size)
+            flux *= np.interp(wave, band_wave, band_thru)
+            flux = units.convert_flux(
+                wave, u.Quantity(flux, unit=self.spec.flux.unit), tmp_unit,
+                area=self.spec.primary_area).value
+            flux *= wave
+
+            num[blk] = np.dot(flux, utils.trapezoid_weights(wave))
+
+        val = num / den
+
+        # Convert back to mag, if needed
+        if tmp_unit != flux_unit:
+            val = -2.5 * np.log10(val) + mag_zero
+
+        return u.Quantity(val, unit=flux_unit)
+
+
+class SpectrumBatch(object):
+    """Class to handle spectra sampled at the same wavelengths,
+    with fluxes stored as a 2D array (one row per spectrum).
+
+    Wavelengths are validated once for the whole batch. Individual
+    spectrum objects are not created until requested by indexing or
+    iteration, and their descriptive strings are not formatted until
+    needed.
+
+    Parameters
+    ----------
+    spec_cls : class
+        `SourceSpectrum` or `SpectralElement`, to create individual
+        spectrum objects.
+
+    wavelengths : array_like or `astropy.units.quantity.Quantity`
+        Wavelength values. If not a Quantity, assumed to be in
+        Angstrom.
+
+    fluxes : array_like or `astropy.units.quantity.Quantity`
+        Flux or throughput values, one spectrum per row.
+        If not a Quantity, assumed to be in ``flux_unit``.
+
+    flux_unit : str, `astropy.units.core.Unit`, or `None`
+        Flux unit, which defaults to FLAM for source spectra and
+        THROUGHPUT for passbands. This is *only* used if ``fluxes``
+        is not Quantity.
+
+    area : float or `astropy.units.quantity.Quantity`, optional
+        Area that fluxes cover.
+
+    exprs : list of str or `~synphot.metadata.Provenance`, optional
+        Descriptive string of each spectrum.
+
+    Attributes
+    ----------
+    wave, flux : `astropy.units.quantity.Quantity`
+        Shared wavelengths and 2D fluxes of the batch.
+
+    primary_area : float, `astropy.units.quantity.Quantity`, or `None`
+        Area that fluxes cover.
+
+    Raises
+    ------
+    synphot.exceptions.SynphotError
+        Invalid inputs.
+
+    """
+    def __init__(self, spec_cls, wavelengths, fluxes, flux_unit=None,
+                 area=None, exprs=None):
+        if spec_cls not in (SourceSpectrum, SpectralElement):
+            raise exceptions.SynphotError(
+                '{0} is not supported in a batch.'.format(spec_cls))
+
+        if not isinstance(wavelengths, u.Quantity):
+            wavelengths = u.Quantity(wavelengths, unit=u.AA)
+
+        if not isinstance(fluxes, u.Quantity):
+            if flux_unit is None:
+                if spec_cls is SpectralElement:
+                    flux_unit = units.THROUGHPUT
+                else:
+                    flux_unit = units.FLAM
+            fluxes = u.Quantity(fluxes, unit=flux_unit)
+
+        spec_cls._validate_flux_unit(fluxes.unit)
+        utils.validate_wavelengths(wavelengths)
+        wavelengths = np.atleast_1d(wavelengths)
+
+        if fluxes.ndim != 2 or fluxes.shape[1] != wavelengths.size:
+            raise exceptions.SynphotError(
+                'Fluxes expected to have shape of (N, {0}) but has shape of '
+                '{1}'.format(wavelengths.size, fluxes.shape))
+
+        if exprs is None:
+            exprs = [Provenance('{0} {1} of batch', spec_cls.__name__, i)
+                     for i in xrange(fluxes.shape[0])]
+        elif len(exprs) != fluxes.shape[0]:
+            raise exceptions.SynphotError(
+                'Expected {0} descriptive strings but got {1}'.format(
+                    fluxes.shape[0], len(exprs)))
+
+        self._spec_cls = spec_cls
+        self.wave = wavelengths
+        self.flux = fluxes
+        self.primary_area = area
+        self._exprs = exprs
+
+    def __len__(self):
+        return self.flux.shape[0]
+
+    def __getitem__(self, key):
+        """Spectrum object, or a subset if ``key`` is not an integer."""
+        if isinstance(key, (int, long, np.integer)):
+            return self._spec_cls(
+                self.wave, self.flux[key], area=self.primary_area,
+                header={'expr': self._exprs[key]})
+
+        idx = np.arange(len(self))[key]
+        return self.__class__(
+            self._spec_cls, self.wave, self.flux[idx], area=self.primary_area,
+            exprs=[self._exprs[i] for i in idx])
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self[i]
+
+    def __str__(self):
+        """Descriptive info of the object."""
+        return 'Batch of {0} {1} on {2} wavelengths'.format(
+            len(self), self._spec_cls.__name__, self.wave.size)
+
+    @property
+    def exprs(self):
+        """Descriptive strings of all spectra."""
+        return [str(expr) for expr in self._exprs]
+
+
+class LazySpectrum(object):
+    """Class to handle a lazy expression of spectra.
+
+    Math operators do not evaluate anything; they only build the
+    expression graph after the same validation as
+    :func:`BaseSpectrum._operate_on`. When evaluated, wavelengths of
+    all the spectra in the expression are merged in one go, each
+    spectrum is resampled onto them only once, and then all the
+    operations are applied on the merged wavelengths. Identical
+    sub-expressions are only computed once.
+
+    The result is the same as evaluating the operations one by one
+    for addition and subtraction. For products and ratios involving
+    more than two spectra, each spectrum is resampled directly onto
+    the final wavelengths, instead of resampling products that were
+    sampled at intermediate wavelengths. Negative intermediate values
+    are set to zeroes, as in eager evaluation.
+
+    Use :func:`BaseSpectrum.lazy` to start an expression. For example:
+
+    >>> obs = (sp1.lazy() + sp2 * ext * band).evaluate()  # doctest: +SKIP
+
+    Parameters
+    ----------
+    spec : obj
+        Spectrum object for a leaf of the expression.
+
+    Attributes
+    ----------
+    spec_class : class
+        Class of the evaluated spectrum.
+
+    flux_unit : `astropy.units.core.Unit`
+        Flux unit of the evaluated spectrum.
+
+    primary_area : `astropy.units.quantity.Quantity` or `None`
+        Area that flux covers in cm^2.
+
+    """
+    def __init__(self, spec):
+        if not isinstance(spec, BaseSpectrum):
+            raise exceptions.SynphotError(
+                '{0} is not a spectrum object'.format(spec))
+
+        self.op_type = None
+        self.operands = (spec, )
+        self.spec_class = spec.__class__
+        self.flux_unit = spec.flux.unit
+        self.primary_area = spec.primary_area
+        self.precision = spec.precision
+        self._key = ('leaf', id(spec))
+
+    @classmethod
+    def _from_op(cls, op_type, left, right):
+        """Create a node for ``left op_type right``, where ``left`` is
+        a `LazySpectrum` and ``right`` is a number or a `LazySpectrum`.
+
+        """
+        node = cls.__new__(cls)
+        node.op_type = op_type
+        node.operands = (left, right)
+        node.spec_class = left.spec_class
+        node.flux_unit = left.flux_unit
+        node.primary_area = left.primary_area
+        node.precision = left.precision
+
+        if isinstance(right, LazySpectrum):
+            right_key = right._key
+        else:
+            right_key = ('scalar', right)
+
+        node._key = (op_type, left._key, right_key)
+        return node
+
+    @property
+    def is_leaf(self):
+        """`True` if this node is a spectrum object."""
+        return self.op_type is None
+
+    def __str__(self):
+        """Descriptive info of the expression."""
+        if self.is_leaf:
+            return str(self.operands[0])
+
+        left, right = self.operands
+        return '({0} {1} {2})'.format(left, self.op_type, right)
+
+    def _operate_on(self, other, op_type):
+        """Add given operation between self and other spectrum or
+        scalar value to the expression.
+
+        Validation follows :func:`BaseSpectrum._operate_on`.
+
+        Parameters
+        ----------
+        other : obj or number
+            The other spectrum, lazy expression, or scalar value
+            to operate on.
+
+        op_type : {'+', '-', '*', '/'}
+            Operation type.
+
+        Returns
+        -------
+        newexpr : `LazySpectrum`
+            New lazy expression.
+
+        Raises
+        ------
+        synphot.exceptions.IncompatibleSources
+            If self and other are not compatible.
+
+        """
+        if op_type not in ('+', '-', '*', '/'):  # pragma: no cover
+            raise exceptions.SynphotError(
+                'Operation type {0} not supported'.format(op_type))
+
+        # Scalar operation
+        if isinstance(other, (int, long, float)):
+            return self._from_op(op_type, self, other)
+
+        if isinstance(other, BaseSpectrum):
+            other = LazySpectrum(other)
+        elif not isinstance(other, LazySpectrum):
+            raise exceptions.IncompatibleSources(
+                'other is not a number or a spectrum object')
+
+        # Same as BaseUnitlessSpectrum.__mul__()
+        if (op_type == '*' and
+                issubclass(self.spec_class, BaseUnitlessSpectrum) and
+                issubclass(other.spec_class, SourceSpectrum)):
+            return other._operate_on(self, op_type)
+
+        if self.primary_area != other.primary_area:
+            raise exceptions.IncompatibleSources(
+                'Areas covered by flux are not the same: {0}, {1}'.format(
+                    self.primary_area, other.primary_area))
+
+        if op_type == '/' and other.flux_unit != u.dimensionless_unscaled:
+            raise exceptions.IncompatibleSources(
+                'The other spectrum must be dimensionless in / op')
+
+        if (op_type == '*' and
+                self.flux_unit != u.dimensionless_unscaled and
+                other.flux_unit != u.dimensionless_unscaled):
+            raise exceptions.IncompatibleSources(
+                'One of the spectra must be dimensionless in * op')
+
+        if (op_type in ('+', '-') and
+                not issubclass(other.spec_class, self.spec_class)):
+            raise exceptions.IncompatibleSources(
+                'Cannot perform {0} between {1} and {2}'.format(
+                    op_type, self.spec_class.__name__,
+                    other.spec_class.__name__))
+
+        self_is_mag = self.flux_unit.decompose() == u.mag
+        other_is_mag = other.flux_unit.decompose() == u.mag
+        if ((self_is_mag and other.flux_unit.decompose() not in
+                (u.dimensionless_unscaled, u.mag)) or
+                (not self_is_mag and other_is_mag)):  # pragma: no cover
+            raise exceptions.IncompatibleSources(
+                'Operation between mag and linear flux is not allowed')
+
+        return self._from_op(op_type, self, other)
+
+    def __add__(self, other):
+        """Add self with other."""
+        return self._operate_on(other, '+')
+
+    def __sub__(self, other):
+        """Subtract other from self."""
+        return self._operate_on(other, '-')
+
+    def __mul__(self, other):
+        """Multiply self and other."""
+        return self._operate_on(other, '*')
+
+    def __rmul__(self, other):
+        """This is only called if ``other.__mul__`` cannot operate."""
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        """Divide self by other."""
+        return self._operate_on(other, '/')
+
+    def _leaves(self):
+        """Unique spectrum objects in the expression, from left
+        to right.
+
+        """
+        leaves = []
+        seen = set()
+        stack = [self]
+
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, LazySpectrum):
+                continue
+            if node.is_leaf:
+                spec = node.operands[0]
+                if id(spec) not in seen:
+                    seen.add(id(spec))
+                    leaves.append(spec)
+            else:
+                stack.extend(node.operands[::-1])
+
+        return leaves
+
+    def merge_wave(self):
+        """Return the union of wavelengths of all the spectra in
+        the expression.
+
+        Returns
+        -------
+        out_wavelengths : `astropy.units.quantity.Quantity`
+            Merged wavelengths in the wavelength unit of the left-most
+            spectrum. If the expression only has one spectrum, its
+            wavelengths are returned as-is.
+
+        """
+        leaves = self._leaves()
+        wave_unit = leaves[0].wave.unit
+
+        if len(leaves) == 1:
+            return leaves[0].wave
+
+        all_waves = [units.validate_quantity(
+            sp.wave, wave_unit, equivalencies=u.spectral()).value
+            for sp in leaves]
+        out_wavelengths = utils.merge_wavelengths(
+            np.concatenate(all_waves), [])
+
+        return u.Quantity(out_wavelengths, unit=wave_unit)
+
+    def _metadata(self):
+        """Layer metadata the same way as eager operations."""
+        if self.is_leaf:
+            return self.operands[0].metadata
+
+        left, right = self.operands
+        if isinstance(right, LazySpectrum):
+            parents = (left._metadata(), right._metadata())
+        else:
+            parents = (left._metadata(), )
+
+        return Metadata(parents=parents)
+
+    def _evaluate(self, wavelengths, leaf_cache, node_cache,
+                  flux_unit=None, is_root=False):
+        """Evaluate the expression values on given wavelengths,
+        in ``flux_unit`` (default is ``self.flux_unit``).
+
+        Resampled spectra are stored in ``leaf_cache``.
+        Other results are stored in ``node_cache``, unless it is `None`.
+
+        """
+        if flux_unit is None:
+            flux_unit = self.flux_unit
+        key = (self._key, flux_unit.to_string())
+
+        if self.is_leaf:
+            if key not in leaf_cache:
+                spec = self.operands[0]
+
+                # Convert before resampling, as in eager operation
+                if flux_unit != spec.flux.unit:
+                    spec = copy(spec)
+                    spec.convert_flux(flux_unit)
+
+                leaf_cache[key] = spec.resample(wavelengths).value
+
+            return leaf_cache[key]
+
+        if node_cache is not None and key in node_cache:
+            return node_cache[key]
+
+        left, right = self.operands
+        val_1 = left._evaluate(wavelengths, leaf_cache, node_cache)
+
+        if not isinstance(right, LazySpectrum):
+            val_2 = right
+        elif self.op_type in ('+', '-'):
+            val_2 = right._evaluate(wavelengths, leaf_cache, node_cache,
+                                    flux_unit=self.flux_unit)
+        else:
+            val_2 = right._evaluate(wavelengths, leaf_cache, node_cache)
+
+        if self.op_type == '+':
+            result = val_1 + val_2
+        elif self.op_type == '-':
+            result = val_1 - val_2
+        elif self.op_type == '*':
+            result = val_1 * val_2
+        else:
+            result = val_1 / val_2
+
+        # Intermediate spectra cannot have negative values either
+        if not is_root and self.flux_unit.decompose() != u.mag:
+            np.clip(result, 0, None, out=result)
+
+        if flux_unit != self.flux_unit:
+            result = units.convert_flux(
+                wavelengths, u.Quantity(result, unit=self.flux_unit),
+                flux_unit, area=self.primary_area).value
+
+        if node_cache is not None:
+            node_cache[key] = result
+
+        return result
+
+    def evaluate(self, cache=True):
+        """Evaluate the expression.
+
+        Parameters
+        ----------
+        cache : bool
+            Only compute identical sub-expressions once.
+            Each spectrum is always resampled only once.
+
+        Returns
+        -------
+        newspec : obj
+            Resultant spectrum, of the class and units of the
+            left-most spectrum in the expression.
+
+        """
+        if self.is_leaf:
+            return deepcopy(self.operands[0])
+
+        new_wave = self.merge_wave()
+
+        if cache:
+            node_cache = {}
+        else:
+            node_cache = None
+
+        result = self._evaluate(new_wave, {}, node_cache, is_root=True)
+
+        new_metadata = self._metadata()
+        del new_metadata['expr']  # Let init re-assign this
+
+        return self.spec_class(
+            new_wave, u.Quantity(result, unit=self.flux_unit),
+            area=self.primary_area, header=new_metadata,
+            precision=self.precision)
+
+
+class CompiledBand(object):
+    """Class to handle a passband compiled against a fixed set of
+    source wavelengths.
+
+    For a given passband and source wavelengths, the numerator of
+    :ref:`effective stimulus <synphot-formula-effstim>` is linear in
+    source flux and its denominator only depends on the passband.
+    Both are evaluated here once, the same way as
+    ``Observation.from_spec_band(sp, band).effstim(band=band)`` does
+    (i.e., source and passband are resampled onto their merged
+    wavelengths and integrated with the trapezoid rule). As a result,
+    effective stimulus of any flux sampled at the given wavelengths
+    is reduced to a sparse dot product.
+
+    Calculations are done in Angstrom. The compiled passband only
+    holds NumPy arrays, so it can be pickled and reused by other
+    processes.
+
+    Parameters
+    ----------
+    band : `SpectralElement`
+        Passband to compile.
+
+    wavelengths : array_like or `astropy.units.quantity.Quantity`
+        Wavelength values of the source spectra to be integrated.
+        If not a Quantity, assumed to be in Angstrom.
+
+    Attributes
+    ----------
+    wave : `astropy.units.quantity.Quantity`
+        Source wavelengths in Angstrom, in the given order.
+
+    indices : array_like
+        Indices of ``wave`` with non-zero weights.
+
+    weights : array_like
+        Weights of :math:`\\int \\lambda f T d\\lambda` at ``indices``.
+
+    int_weights : array_like
+        Weights of :math:`\\int f T d\\lambda` at ``indices``.
+
+    norm : float
+        :math:`\\int \\lambda T d\\lambda` of the passband on its own
+        wavelengths.
+
+    expr : str
+        Descriptive string of the compiled passband.
+
+    Raises
+    ------
+    synphot.exceptions.SynphotError
+        Invalid inputs or passband integrates to zero.
+
+    """
+    def __init__(self, band, wavelengths):
+        if not isinstance(band, SpectralElement):
+            raise exceptions.SynphotError(
+                'Compiled passband must be created from a SpectralElement.')
+
+        if not isinstance(wavelengths, u.Quantity):
+            wavelengths = u.Quantity(wavelengths, unit=u.AA)
+
+        utils.validate_wavelengths(wavelengths)
+
+        wave = np.atleast_1d(
+            wavelengths.to(u.AA, equivalencies=u.spectral()).value)
+        band_wave = band.wave.to(u.AA, equivalencies=u.spectral()).value
+        band_thru = band.thru.value
+
+        # Calculations need ascending order
+        order = np.arange(wave.size)
+        if wave[0] > wave[-1]:
+            order = order[::-1]
+        x = wave[order]
+        if band_wave[0] > band_wave[-1]:
+            band_wave = band_wave[::-1]
+            band_thru = band_thru[::-1]
+
+        # Same merged wavelengths and resampling as source * passband
+        merged = utils.merge_wavelengths(x, band_wave)
+        int_w = utils.trapezoid_weights(merged) * np.interp(
+            merged, band_wave, band_thru)
+        eff_w = int_w * merged
+        i_lo, i_hi, w_lo, w_hi = utils.interpolation_weights(merged, x)
+
+        int_weights = (np.bincount(i_lo, int_w * w_lo, minlength=x.size) +
+                       np.bincount(i_hi, int_w * w_hi, minlength=x.size))
+        weights = (np.bincount(i_lo, eff_w * w_lo, minlength=x.size) +
+                   np.bincount(i_hi, eff_w * w_hi, minlength=x.size))
+
+        # Only keep what contributes
+        idx = np.flatnonzero(weights)
+        self.indices = order[idx]
+        self.weights = weights[idx]
+        self.int_weights = int_weights[idx]
+
+        self.norm = utils.trapezoid_integration(
+            band_wave, band_wave * band_thru)
+        utils.validate_totalflux(self.norm)
+
+        self.wave = u.Quantity(wave, unit=u.AA)
+        self.expr = str(band)
+
+    def __str__(self):
+        """Descriptive info of the object."""
+        return '{0} compiled on {1} wavelengths'.format(
+            self.expr, self.wave.size)
+
+    def _get_values(self, fluxes):
+        """Extract flux values and unit, and check their shape."""
+        if isinstance(fluxes, u.Quantity):
+            values = fluxes.value
+            flux_unit = fluxes.unit
+        else:
+            values = np.asarray(fluxes)
+            flux_unit = None
+
+        if values.ndim < 1 or values.shape[-1] != self.wave.size:
+            raise exceptions.SynphotError(
+                'Fluxes expected to have {0} values in the last dimension '
+                'but has shape of {1}'.format(self.wave.size, values.shape))
+
+        return values, flux_unit
+
+    def integrate(self, fluxes):
+        """Integrate fluxes through the passband, i.e.,
+        :math:`\\int f T d\\lambda`, as done by
+        :func:`SourceSpectrum.renorm`.
+
+        Parameters
+        ----------
+        fluxes : array_like or `astropy.units.quantity.Quantity`
+            Flux values at ``self.wave``. A 2D array is treated
+            as a stack of spectra, one per row.
+
+        Returns
+        -------
+        result : number, array_like, or `astropy.units.quantity.Quantity`
+            Integrated result, one per spectrum. If ``fluxes`` is a
+            Quantity, result is in the same unit.
+
+        """
+        values, flux_unit = self._get_values(fluxes)
+        result = np.dot(values[..., self.indices], self.int_weights)
+
+        if flux_unit is not None:
+            result = u.Quantity(result, unit=flux_unit)
+
+        return result
+
+    def effstim(self, fluxes):
+        """Calculate :ref:`effective stimulus <synphot-formula-effstim>`
+        of fluxes through the passband.
+
+        Fluxes must be in linear flux density unit. Unlike
+        :func:`synphot.observation.Observation.effstim`, the result
+        is not validated.
+
+        Parameters
+        ----------
+        fluxes : array_like or `astropy.units.quantity.Quantity`
+            Flux values at ``self.wave``. A 2D array is treated
+            as a stack of spectra, one per row.
+
+        Returns
+        -------
+        eff_stim : number, array_like, or `astropy.units.quantity.Quantity`
+            Effective stimulus, one per spectrum. If ``fluxes`` is a
+            Quantity, result is in the same unit.
+
+        """
+        values, flux_unit = self._get_values(fluxes)
+        result = np.dot(values[..., self.indices], self.weights) / self.norm
+
+        if flux_unit is not None:
+            result = u.Quantity(result, unit=flux_unit)
+
+        return result
+
+
+class Renormalizer(object):
+    """Class to renormalize many source spectra to the same passband.
+
+    Integrated flux of the standard spectrum (flat spectrum in the
+    renormalization unit, or Vega for VEGAMAG) through the passband
+    is cached by :func:`SourceSpectrum.renorm` for the given passband,
+    units, and area. In addition, this class can renormalize:
+
+        * one spectrum to many values at once, see :func:`renorm`;
+        * a stack of spectra sampled at the same wavelengths,
+          where passband integration is reduced to a dot product
+          with a `CompiledBand`, see :func:`factors`.
+
+    Parameters
+    ----------
+    band : `SpectralElement`
+        Spectrum of the passband to use in renormalization.
+
+    vegaspec : `SourceSpectrum`
+        Vega spectrum from :func:`SourceSpectrum.from_vega`.
+        This is *only* used if flux is renormalized to VEGAMAG.
+
+    Raises
+    ------
+    synphot.exceptions.SynphotError
+        Invalid passband.
+
+    """
+    def __init__(self, band, vegaspec=None):
+        if not isinstance(band, SpectralElement):
+            raise exceptions.SynphotError(
+                'Renormalization passband must be a SpectralElement.')
+
+        self.band = band
+        self.vegaspec = vegaspec
+        self._compiled = {}
+
+    def __str__(self):
+        """Descriptive info of the object."""
+        return 'Renormalizer for {0}'.format(self.band)
+
+    def standard_flux(self, renorm_unit, flux_unit=units.PHOTLAM,
+                      wave_unit=u.AA, area=None):
+        """Integrated flux of the standard spectrum through the passband.
+
+        Parameters
+        ----------
+        renorm_unit : str or `astropy.units.core.Unit`
+            Renormalization unit.
+
+        flux_unit, wave_unit : str or `astropy.units.core.Unit`
+            Units of the integrated source flux to compare with.
+            Defaults are PHOTLAM and Angstrom.
+
+        area : float, `astropy.units.quantity.Quantity`, or `None`
+            Area that fluxes cover, as needed by flux unit conversion.
+
+        Returns
+        -------
+        stdflux : float
+            Integrated standard flux in ``flux_unit`` times
+            ``wave_unit``. For count and OBMAG, this is always 1.
+
+        """
+        return _standard_flux(
+            self.band, units.validate_unit(renorm_unit),
+            units.validate_unit(flux_unit), units.validate_unit(wave_unit),
+            area=area, vegaspec=self.vegaspec)
+
+    def renorm(self, spec, renorm_val, force=False):
+        """Renormalize a spectrum to the given value(s).
+
+        Parameters
+        ----------
+        spec : `SourceSpectrum`
+            Spectrum to renormalize.
+
+        renorm_val : number, array_like, or `astropy.units.quantity.Quantity`
+            Value(s) to renormalize the spectrum to. If not a Quantity,
+            assumed to be in ``spec.flux.unit``.
+
+        force : bool
+            See :func:`SourceSpectrum.renorm`.
+
+        Returns
+        -------
+        newsp : `SourceSpectrum` or list of `SourceSpectrum`
+            Renormalized spectrum in units of ``spec``, one per
+            value if ``renorm_val`` is an array. Passband integration
+            is only done once in both cases.
+
+        Raises
+        ------
+        synphot.exceptions.SynphotError
+            Invalid inputs or calculation failed.
+
+        """
+        if not isinstance(spec, SourceSpectrum):
+            raise exceptions.SynphotError(
+                'Only SourceSpectrum can be renormalized.')
+
+        if np.ndim(renorm_val) == 0:
+            return spec.renorm(renorm_val, self.band, force=force,
+                               vegaspec=self.vegaspec)
+
+        consts, is_mag, warnings = spec._renorm_consts(
+            renorm_val, self.band, force, self.vegaspec)
+        results = []
+
+        for const in consts.ravel():
+            if is_mag:
+                newsp = spec.add_mag(float(const))
+            else:
+                newsp = spec.__mul__(float(const))
+            newsp.warnings.update(warnings)
+            results.append(newsp)
+
+        return results
+
+    def compile(self, wavelengths):
+        """Passband compiled against given wavelengths.
+        The result is cached.
+
+        Parameters
+        ----------
+        wavelengths : array_like or `astropy.units.quantity.Quantity`
+            Wavelength values. If not a Quantity, assumed to be in
+            Angstrom.
+
+        Returns
+        -------
+        compiled : `CompiledBand`
+            Compiled passband.
+
+        """
+        if not isinstance(wavelengths, u.Quantity):
+            wavelengths = u.Quantity(wavelengths, unit=u.AA)
+
+        sha = hashlib.sha1(wavelengths.unit.to_string().encode('utf-8'))
+        sha.update(np.ascontiguousarray(wavelengths.value, dtype=np.float64))
+        key = (self.band.fingerprint, sha.hexdigest())
+
+        if key not in self._compiled:
+            self._compiled[key] = self.band.compile(wavelengths)
+
+        return self._compiled[key]
+
+    def factors(self, wavelengths, fluxes, renorm_val, flux_unit=units.PHOTLAM,
+                area=None, force=False):
+        """Renormalization factors of a stack of spectra sampled at the
+        same wavelengths.
+
+        The spectra are renormalized by multiplying each row of
+        ``fluxes`` by its factor. This is the same as
+        :func:`SourceSpectrum.renorm` for each spectrum, except that
+        overlap is only checked once for the whole stack, using
+        wavelengths where any spectrum has non-zero flux.
+
+        Parameters
+        ----------
+        wavelengths : array_like or `astropy.units.quantity.Quantity`
+            Wavelength values. If not a Quantity, assumed to be in
+            Angstrom.
+
+        fluxes : array_like or `astropy.units.quantity.Quantity`
+            Flux values at ``wavelengths``, one spectrum per row.
+            If not a Quantity, assumed to be in ``flux_unit``.
+
+        renorm_val : number, array_like, or `astropy.units.quantity.Quantity`
+            Value(s) to renormalize the spectra to, either one for
+            all or one per spectrum. If not a Quantity, assumed to be
+            in ``flux_unit``. Count and OBMAG are not supported.
+
+        flux_unit : str or `astropy.units.core.Unit`
+            Linear flux density unit of ``fluxes``, if not a Quantity.
+            Default is PHOTLAM.
+
+        area : float, `astropy.units.quantity.Quantity`, or `None`
+            Area that fluxes cover, as needed by flux unit conversion.
+
+        force : bool
+            See :func:`SourceSpectrum.renorm`.
+
+        Returns
+        -------
+        factors : array_like
+            Multiplicative renormalization factor of each spectrum.
+
+        Raises
+        ------
+        synphot.exceptions.DisjointError
+            Renormalization band does not overlap with the spectra.
+
+        synphot.exceptions.PartialOverlap
+            Renormalization band only partially overlaps with the
+            spectra and significant amount of flux falls outside
+            the overlap.
+
+        synphot.exceptions.SynphotError
+            Invalid inputs or calculation failed.
+
+        """
+        if isinstance(fluxes, u.Quantity):
+            flux_unit = fluxes.unit
+            fluxes = fluxes.value
+        else:
+            flux_unit = units.validate_unit(flux_unit)
+
+        fluxes = np.atleast_2d(fluxes)
+
+        if flux_unit.decompose() == u.mag:
+            raise exceptions.SynphotError(
+                'Fluxes must be in linear flux density unit.')
+
+        if not isinstance(renorm_val, u.Quantity):
+            renorm_val = u.Quantity(renorm_val, unit=flux_unit)
+
+        if renorm_val.unit.to_string() in (u.count.to_string(),
+                                           units.OBMAG.to_string()):
+            raise exceptions.SynphotError(
+                '{0} is not supported for batch renormalization.'.format(
+                    renorm_val.unit))
+
+        compiled = self.compile(wavelengths)
+
+        # Validate the overlap once for all spectra
+        proxy = SourceSpectrum(
+            compiled.wave, np.any(fluxes != 0, axis=0).astype(np.float64))
+        proxy._check_renorm_overlap(self.band, force)
+
+        totalflux = compiled.integrate(fluxes)
+        utils.validate_totalflux(totalflux.min())
+        stdflux = self.standard_flux(
+            renorm_val.unit, flux_unit=flux_unit, area=area)
+
+        # Renormalize in magnitudes
+        if renorm_val.unit.decompose() == u.mag:
+            factors = 10**(-0.4 * renorm_val.value) * (stdflux / totalflux)
+
+        # Renormalize in linear flux units
+        else:
+            factors = renorm_val.value * (stdflux / totalflux)
+
+        return factors
+
+
+def _sqrt_ratio(num, den):
+    """Square root of ``num / den`` for arrays, with zero wherever
+    it is undefined, as in `SpectralElement` properties."""
+    val = np.zeros(np.broadcast(num, den).shape, dtype=np.float64)
+    np.divide(num, den, out=val, where=(den != 0))
+    val[val < 0] = 0.0
+    return np.sqrt(val)
+
+
+def _band_properties_on_grid(wave, thru, area):
+    """Properties of passbands sampled at the same wavelengths,
+    from one set of :func:`synphot.utils.band_moments` integrals.
+
+    Parameters
+    ----------
+    wave : array_like
+        Wavelengths in Angstrom.
+
+    thru : array_like
+        Throughput values, one passband per row.
+
+    area : array_like
+        Primary area of each passband in :math:`cm^{2}`,
+        or NaN if undefined.
+
+    Returns
+    -------
+    props : dict
+        Arrays of property values, one per passband.
+        Wavelength properties are in Angstrom.
+
+    """
+    moments = utils.band_moments(wave, thru)
+    ref_wave = moments['ref_wave']
+    thru_int = moments['thru']
+    wave_int = ref_wave * thru_int + moments['wave']
+    tpw_int = moments['thru_per_wave']
+
+    # See avgwave() and rmswidth()
+    dwave = np.zeros_like(thru_int)
+    np.divide(moments['wave'], thru_int, out=dwave, where=(thru_int != 0))
+    rms_width = _sqrt_ratio(moments['wave2'] - 2 * dwave * moments['wave'] +
+                            dwave ** 2 * thru_int, thru_int)
+    avg_wave = np.where(thru_int != 0, ref_wave + dwave, 0.0)
+
+    # See photbw()
+    dlogwave = np.zeros_like(tpw_int)
+    np.divide(moments['logwave'], tpw_int, out=dlogwave, where=(tpw_int != 0))
+    bandw = ref_wave * np.exp(dlogwave) * _sqrt_ratio(
+        moments['logwave2'] - 2 * dlogwave * moments['logwave'] +
+        dlogwave ** 2 * tpw_int, tpw_int)
+
+    # See unit_response(); NaN if area is undefined.
+    with np.errstate(divide='ignore'):
+        uresp = units.HC.value / (area * wave_int)
+
+    ipeak = np.argmax(thru, axis=-1)
+
+    return {'avgwave': avg_wave,
+            'pivot': _sqrt_ratio(wave_int, tpw_int),
+            'equivwidth': thru_int,
+            'rmswidth': rms_width,
+            'photbw': bandw,
+            'fwhm': np.sqrt(8 * np.log(2)) * bandw,
+            'efficiency': tpw_int,
+            'tpeak': thru[np.arange(thru.shape[0]), ipeak],
+            'wpeak': wave[ipeak],
+            'unit_response': uresp}
+
+
+def band_properties(bands, area=None, nthreads=1):
+    """Calculate properties of many passbands at once, as a table.
+
+    Passbands sampled at the same wavelengths are grouped together,
+    and the integrals for each group are calculated in one vectorized
+    pass (see :func:`synphot.utils.band_moments`). Different groups
+    can be split across threads.
+
+    The values are the same as those from the individual
+    `SpectralElement` methods (to floating-point rounding), except
+    that all wavelength properties are in Angstrom. They are always
+    calculated in double precision, so they can differ slightly from
+    the methods for single-precision data.
+
+    Parameters
+    ----------
+    bands : list of `SpectralElement` or `SpectrumBatch`
+        Passbands. A batch must hold `SpectralElement` objects.
+
+    area : float, `astropy.units.quantity.Quantity`, or `None`
+        Area for unit response of all passbands. If not a Quantity,
+        assumed to be in :math:`cm^{2}`. If `None`, area of each
+        passband is used; unit response is NaN if it is undefined.
+
+    nthreads : int
+        Number of threads to split the groups of passbands over.
+
+    Returns
+    -------
+    tab : `astropy.table.Table`
+        One row per passband, in the given order, with these columns:
+        'expr', 'avgwave', 'pivot', 'equivwidth', 'rmswidth',
+        'photbw', 'fwhm', 'efficiency', 'tpeak', 'wpeak', and
+        'unit_response'.
+
+    Raises
+    ------
+    synphot.exceptions.SynphotError
+        Invalid inputs.
+
+    """
+    if area is not None:
+        area = units.validate_quantity(area, units.AREA).value
+
+    if isinstance(bands, SpectrumBatch):
+        if bands._spec_cls is not SpectralElement:
+            raise exceptions.SynphotError(
+                'Batch of {0} is not a batch of passbands.'.format(
+                    bands._spec_cls.__name__))
+        if area is None and bands.primary_area is not None:
+            area = units.validate_quantity(
+                bands.primary_area, units.AREA).value
+
+        nbands = len(bands)
+        exprs = bands.exprs
+        areas = np.empty(nbands, dtype=np.float64)
+        areas[:] = np.nan if area is None else area
+        wave = utils.to_length(bands.wave).to(u.AA).value
+        groups = [(wave, np.arange(nbands), bands.flux.value)]
+
+    else:
+        bands = list(bands)
+        nbands = len(bands)
+        exprs = []
+        areas = np.empty(nbands, dtype=np.float64)
+        grids = {}
+
+        for i, band in enumerate(bands):
+            if not isinstance(band, SpectralElement):
+                raise exceptions.SynphotError(
+                    '{0} is not a passband.'.format(band))
+
+            exprs.append(str(band))
+
+            if area is not None:
+                areas[i] = area
+            elif band.primary_area is not None:
+                areas[i] = band.primary_area.cgs.value
+            else:
+                areas[i] = np.nan
+
+            wave = np.asarray(
+                utils.to_length(band.wave).to(u.AA).value, dtype=np.float64)
+            key = (wave.size,
+                   hashlib.sha1(np.ascontiguousarray(wave)).hexdigest())
+            grids.setdefault(key, (wave, []))[1].append(i)
+
+        groups = [(wave, np.array(idx),
+                   np.array([bands[i].thru.value for i in idx],
+                            dtype=np.float64))
+                  for wave, idx in grids.values()]
+
+    if nbands == 0:
+        raise exceptions.SynphotError('No passbands given.')
+
+    def _calc_group(group):
+        wave, idx, thru = group
+        return _band_properties_on_grid(wave, thru, areas[idx])
+
+    nthreads = max(min(int(nthreads), len(groups)), 1)
+
+    if nthreads == 1:
+        results = [_calc_group(group) for group in groups]
+    else:
+        pool = ThreadPool(nthreads)
+        try:
+            results = pool.map(_calc_group, groups)
+        finally:
+            pool.close()
+            pool.join()
+
+    colunits = [('avgwave', u.AA), ('pivot', u.AA), ('equivwidth', u.AA),
+                ('rmswidth', u.AA), ('photbw', u.AA), ('fwhm', u.AA),
+                ('efficiency', u.dimensionless_unscaled),
+                ('tpeak', units.THROUGHPUT), ('wpeak', u.AA),
+                ('unit_response', units.FLAM)]
+
+    # Explicit dtype, Table cannot guess one for unicode strings on Python 2
+    tab = Table()
+    tab['expr'] = np.array([str(expr) for expr in exprs], dtype=str)
+
+    for colname, colunit in colunits:
+        values = np.empty(nbands, dtype=np.float64)
+        for group, props in zip(groups, results):
+            values[group[1]] = props[colname]
+        tab[colname] = values
+        tab[colname].unit = colunit
+
+    return tab
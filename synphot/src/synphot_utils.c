@@ -6,75 +6,148 @@
 #include "docstrings.h"
 
 
+/* Sum over each bin for a stack of flux vectors.
+
+   intwave has num_bins values and is shared by all rows.
+   avflux and binflux have num_rows rows of num_wave and num_bins
+   values, respectively. Bins are usually contiguous, so each row
+   takes O(num_wave + num_bins) operations.
+
+   Returns 0 on success, or 1 if a bin has zero width.
+   Does not touch any Python object, so it can run without the GIL. */
+static int calcbinflux_rows(npy_intp num_rows, npy_intp num_wave,
+                            npy_intp num_bins, const npy_int64 *first,
+                            const npy_int64 *last, const double *avflux,
+                            const double *deltaw, double *binflux,
+                            double *intwave) {
+  npy_intp i, j, k;
+  double flux_sum, delta_sum;
+  const double *row;
+  double *out_row;
+
+  for (i = 0; i < num_bins; i++) {
+    delta_sum = 0.0;
+
+    for (j = first[i]; j < last[i]; j++) {
+      delta_sum += deltaw[j];
+    }
+
+    if (delta_sum == 0) {
+      return 1;
+    }
+
+    intwave[i] = delta_sum;
+  }
+
+  for (k = 0; k < num_rows; k++) {
+    row = avflux + k * num_wave;
+    out_row = binflux + k * num_bins;
+
+    for (i = 0; i < num_bins; i++) {
+      flux_sum = 0.0;
+
+      for (j = first[i]; j < last[i]; j++) {
+        flux_sum += row[j] * deltaw[j];
+      }
+
+      out_row[i] = flux_sum / intwave[i];
+    }
+  }
+
+  return 0;
+}
+
+
 static PyObject * py_calcbinflux(PyObject *self, PyObject *args) {
   /* input variables */
-  const int out_arr_len;
+  Py_ssize_t out_arr_len;
   PyObject *oindices, *oindices_last, *oavflux, *odeltaw;
-  PyArrayObject *indices, *indices_last, *avflux, *deltaw;
+  PyArrayObject *indices = NULL, *indices_last = NULL;
+  PyArrayObject *avflux = NULL, *deltaw = NULL;
 
   /* local variables */
-  npy_intp i, j;
-  npy_intp num_indices, first, last;
-  double flux_sum, delta_sum;
+  npy_intp i, num_rows, num_wave;
+  npy_intp out_dim[2];
+  const npy_int64 *first, *last;
+  int status;
 
   /* return variables */
-  npy_intp *out_dim;
-  PyArrayObject *binflux, *intwave;
+  PyArrayObject *binflux = NULL, *intwave = NULL;
 
   /* put arguments into variables */
-  if (!PyArg_ParseTuple(args, "iOOOO", &out_arr_len, &oindices, &oindices_last,
-                        &oavflux, &odeltaw)) {
+  if (!PyArg_ParseTuple(args, "nOOOO", &out_arr_len, &oindices,
+                        &oindices_last, &oavflux, &odeltaw)) {
     return NULL;
   }
 
   /* turn inputs into numpy array types */
-  indices = (PyArrayObject *) PyArray_FROMANY(oindices, PyArray_INT64, 1, 1,
+  indices = (PyArrayObject *) PyArray_FROMANY(oindices, NPY_INT64, 1, 1,
                                               NPY_IN_ARRAY);
-  indices_last = (PyArrayObject *) PyArray_FROMANY(oindices_last, PyArray_INT64,
+  indices_last = (PyArrayObject *) PyArray_FROMANY(oindices_last, NPY_INT64,
                                                    1, 1, NPY_IN_ARRAY);
-  avflux = (PyArrayObject *) PyArray_FROMANY(oavflux, PyArray_FLOAT64, 1, 1,
+  avflux = (PyArrayObject *) PyArray_FROMANY(oavflux, NPY_FLOAT64, 1, 2,
                                              NPY_IN_ARRAY);
-  deltaw = (PyArrayObject *) PyArray_FROMANY(odeltaw, PyArray_FLOAT64, 1, 1,
+  deltaw = (PyArrayObject *) PyArray_FROMANY(odeltaw, NPY_FLOAT64, 1, 1,
                                              NPY_IN_ARRAY);
   if (!indices || !indices_last || !avflux || !deltaw) {
-    return NULL;
+    goto fail;
   }
 
-  /* finish creating return variables */
-  out_dim = (npy_intp *) malloc(1 * sizeof(npy_intp));
-  out_dim[0] = (npy_intp) out_arr_len;
-  binflux = (PyArrayObject *) PyArray_SimpleNew(1, out_dim, PyArray_FLOAT64);
-  intwave = (PyArrayObject *) PyArray_SimpleNew(1, out_dim, PyArray_FLOAT64);
-  if (!binflux || !intwave) {
-    return NULL;
+  /* validate shapes and indices */
+  if (PyArray_DIM(indices, 0) != out_arr_len ||
+      PyArray_DIM(indices_last, 0) != out_arr_len) {
+    PyErr_SetString(PyExc_ValueError,
+                    "i_beg and i_end must have len_binwave values.");
+    goto fail;
   }
 
-  num_indices = indices->dimensions[0];
-
-  for (i = 0; i < num_indices; i++) {
-    first = (npy_intp) *(npy_int64 *) PyArray_GETPTR1(indices,i);
-    last = (npy_intp) *(npy_int64 *) PyArray_GETPTR1(indices_last,i);
+  num_wave = PyArray_DIM(deltaw, 0);
+  if (PyArray_NDIM(avflux) == 1) {
+    num_rows = 1;
+  } else {
+    num_rows = PyArray_DIM(avflux, 0);
+  }
 
-    flux_sum = 0.0;
-    delta_sum = 0.0;
+  if (PyArray_DIM(avflux, PyArray_NDIM(avflux) - 1) != num_wave) {
+    PyErr_SetString(PyExc_ValueError,
+                    "avflux and deltaw must have the same number of values.");
+    goto fail;
+  }
 
-    for (j = first; j < last; j++) {
-      delta_sum += *(double *) PyArray_GETPTR1(deltaw, j);
-      flux_sum += (*(double *) PyArray_GETPTR1(avflux, j)) *
-                  (*(double *) PyArray_GETPTR1(deltaw, j));
-    }
+  first = (const npy_int64 *) PyArray_DATA(indices);
+  last = (const npy_int64 *) PyArray_DATA(indices_last);
 
-    if (delta_sum == 0) {
-      PyErr_SetString(PyExc_ZeroDivisionError,
-                      "Division by zero in synphot_utils.calcbinflux.");
-      return NULL;
+  for (i = 0; i < out_arr_len; i++) {
+    if (first[i] < 0 || first[i] > last[i] || last[i] > num_wave) {
+      PyErr_SetString(PyExc_IndexError,
+                      "Bin indices out of range in synphot_utils.calcbinflux.");
+      goto fail;
     }
+  }
 
-    *(npy_float64 *) PyArray_GETPTR1(intwave,i) = (npy_float64) delta_sum;
-    *(npy_float64 *) PyArray_GETPTR1(binflux,i) = (npy_float64) (flux_sum/delta_sum);
+  /* create return variables */
+  out_dim[0] = num_rows;
+  out_dim[1] = (npy_intp) out_arr_len;
+  binflux = (PyArrayObject *) PyArray_SimpleNew(
+      PyArray_NDIM(avflux), out_dim + 2 - PyArray_NDIM(avflux), NPY_FLOAT64);
+  intwave = (PyArrayObject *) PyArray_SimpleNew(1, out_dim + 1, NPY_FLOAT64);
+  if (!binflux || !intwave) {
+    goto fail;
   }
 
-  free(out_dim);
+  Py_BEGIN_ALLOW_THREADS
+  status = calcbinflux_rows(
+      num_rows, num_wave, (npy_intp) out_arr_len, first, last,
+      (const double *) PyArray_DATA(avflux),
+      (const double *) PyArray_DATA(deltaw),
+      (double *) PyArray_DATA(binflux), (double *) PyArray_DATA(intwave));
+  Py_END_ALLOW_THREADS
+
+  if (status != 0) {
+    PyErr_SetString(PyExc_ZeroDivisionError,
+                    "Division by zero in synphot_utils.calcbinflux.");
+    goto fail;
+  }
 
   Py_DECREF(indices);
   Py_DECREF(indices_last);
@@ -82,6 +155,16 @@ static PyObject * py_calcbinflux(PyObject *self, PyObject *args) {
   Py_DECREF(deltaw);
 
   return Py_BuildValue("NN", binflux, intwave);
+
+ fail:
+  Py_XDECREF(indices);
+  Py_XDECREF(indices_last);
+  Py_XDECREF(avflux);
+  Py_XDECREF(deltaw);
+  Py_XDECREF(binflux);
+  Py_XDECREF(intwave);
+
+  return NULL;
 }
 
 
@@ -11,7 +11,7 @@ from astropy import units as u
 from astropy.tests.helper import pytest
 
 # LOCAL
-from .. import analytic, exceptions, spectrum, units
+from .. import analytic, exceptions, spectrum, units, utils
 from ..utils import generate_wavelengths
 
 
@@ -114,6 +114,30 @@ class TextBox(object):
         np.testing.assert_array_equal(specs[0].flux.value, [0, 1, 0, 0])
         np.testing.assert_array_equal(specs[1].flux.value, [0, 0, 0.5, 1])
 
+        batch = box.to_spectrum([4940, 5000, 6000, 6030], batch=True)
+        assert isinstance(batch, spectrum.SpectrumBatch)
+        assert len(batch) == 2
+        np.testing.assert_array_equal(
+            batch.flux.value, [[0, 1, 0, 0], [0, 0, 0.5, 1]])
+        assert batch.exprs == [sp.metadata['expr'] for sp in specs]
+        np.testing.assert_array_equal(
+            batch[1].flux.value, specs[1].flux.value)
+
+
+def test_box_adaptive():
+    box = analytic.Box1DSpectrum(0.5, 5000, 100)
+    bp = box.to_spectrum(rtol=1e-6)
+    assert bp.wave.size == 4
+    np.testing.assert_allclose(bp.equivwidth().value, 50)
+
+    bp = box.to_spectrum(u.Quantity([400, 600], u.nm), rtol=1e-6)
+    np.testing.assert_allclose(bp.wave.value[[0, -1]], [4000, 6000])
+    assert bp.wave.size == 6
+
+    # Models with infinite extent need wavelength range
+    with pytest.raises(exceptions.SynphotError):
+        sp = analytic.BlackBody1DSpectrum(5000).to_spectrum(rtol=1e-3)
+
 
 class TestBlackBody(object):
     """Test BlackBody1DSpectrum class, that uses BlackBody1D."""
@@ -238,6 +262,11 @@ class TestGaussian(object):
         assert gauss.flux_unit == units.FLAM
         np.testing.assert_allclose(sp.integrate(), 1, rtol=1e-5)
 
+    def test_adaptive(self):
+        sp = self.gauss.to_spectrum(rtol=1e-3)
+        assert sp.wave.size < self.refwave.size
+        np.testing.assert_allclose(sp.integrate(), 1, rtol=1e-3)
+
     def test_symmetry(self):
         flux = self.gauss.sample(u.Quantity([3950, 4050], u.AA))
         np.testing.assert_allclose(flux.value[0], flux.value[1])
@@ -306,3 +335,140 @@ class TestPowerLaw(object):
             [1.01666667, 1.01328904, 1.00993377, 1.00660066, 1.00328947,
              1, 0.99673203, 0.99348534, 0.99025974, 0.98705502],
             rtol=1e-6)
+
+
+class TestBandIntegral(object):
+    """Test closed-form integrals through analytic passband."""
+    def setup_class(self):
+        self.box = analytic.Box1DSpectrum(0.8, 5000, 300)
+        # Sampled box must include both edges
+        self.wave = u.Quantity(np.linspace(4850, 5150, 30001), u.AA)
+        self.bp = spectrum.SpectralElement(
+            self.wave, np.zeros(self.wave.size) + 0.8)
+        self.models = {
+            'const': analytic.Const1DSpectrum(2.0, flux_unit=units.FNU),
+            'powerlaw': analytic.PowerLaw1DSpectrum(1, 6000, 4),
+            'gauss': analytic.gaussian_spectrum(1, 4990, 100),
+            'gauss_nm': analytic.gaussian_spectrum(
+                1, u.Quantity(499, u.nm), 10),
+            'bb': analytic.BlackBody1DSpectrum(5500)}
+
+    @pytest.mark.parametrize(
+        ('modelname', 'flux_unit', 'wave_power'),
+        [('const', units.PHOTLAM, 0),
+         ('powerlaw', units.FLAM, 1),
+         ('gauss', units.PHOTLAM, 1),
+         ('gauss_nm', units.FNU, 0),
+         ('bb', units.PHOTLAM, 0),
+         ('bb', units.FLAM, 1)])
+    def test_sampled(self, modelname, flux_unit, wave_power):
+        model = self.models[modelname]
+        ans = analytic.band_integral(
+            model, self.box, flux_unit=flux_unit, wave_power=wave_power)
+        assert ans.unit == flux_unit * u.AA ** (wave_power + 1)
+
+        sp = model.to_spectrum(self.wave) * self.bp
+        sp.convert_flux(flux_unit)
+        x = sp.wave.value
+        np.testing.assert_allclose(
+            ans.value,
+            utils.trapezoid_integration(x, sp.flux.value * x ** wave_power),
+            rtol=1e-9)
+
+    def test_multi_param_sets(self):
+        box = analytic.Box1DSpectrum([1, 0.5], [5000, 6000], [100, 50])
+        ans = analytic.band_integral(
+            analytic.Const1DSpectrum(1, flux_unit=units.PHOTLAM), box)
+        np.testing.assert_allclose(ans.value, [100, 25])
+
+    def test_passband_properties(self):
+        np.testing.assert_allclose(self.box.equivwidth().value, 240)
+        np.testing.assert_allclose(self.box.avgwave().value, 5000)
+        np.testing.assert_allclose(
+            self.box.pivot().value, self.bp.pivot().value, rtol=1e-9)
+
+        box = analytic.Box1DSpectrum(0.8, 500, 30, wave_unit=u.nm)
+        np.testing.assert_allclose(box.equivwidth().value, 240)
+
+    def test_exceptions(self):
+        # No closed form for Gaussian with negative wavelength power
+        with pytest.raises(exceptions.SynphotError):
+            ans = analytic.band_integral(
+                analytic.gaussian_spectrum(1, 4990, 100), self.box,
+                wave_power=-2)
+
+        # Invalid inputs
+        with pytest.raises(exceptions.SynphotError):
+            ans = analytic.band_integral(self.box, self.box)
+        with pytest.raises(exceptions.SynphotError):
+            ans = analytic.band_integral(
+                analytic.flat_spectrum(units.FLAM), self.bp)
+
+
+class TestComposite(object):
+    """Test lazily evaluated composites of analytic spectra."""
+    def setup_class(self):
+        self.wave = np.arange(4000, 6001, 10, dtype=np.float64)
+        self.flat = analytic.flat_spectrum(units.FLAM)
+        self.gauss = analytic.gaussian_spectrum(1e-13, 5000, 100)
+        self.box = analytic.Box1DSpectrum(0.8, 5000, 500)
+
+    def test_sum(self):
+        sp = self.flat + self.gauss
+        assert isinstance(sp, analytic.SummedCompositeSpectrum)
+        assert sp.flux_unit == units.FLAM
+        np.testing.assert_allclose(
+            sp.sample(self.wave).value,
+            (self.flat.sample(self.wave) + self.gauss.sample(self.wave)).value)
+        assert '+' in sp.to_spectrum(self.wave).metadata['expr']
+
+        # Components are converted to flux unit of the first one
+        sp = analytic.Const1DSpectrum(1, flux_unit=units.PHOTLAM) + self.flat
+        ans = units.convert_flux(
+            self.wave, u.Quantity(1, units.FLAM), units.PHOTLAM).value + 1
+        np.testing.assert_allclose(sp.sample(self.wave).value, ans)
+
+        # Nested sums are flattened
+        sp = self.flat + self.gauss + self.flat
+        assert len(sp.components) == 3
+
+    def test_product(self):
+        sp = analytic.BlackBody1DSpectrum(5000) * self.box * 2
+        assert isinstance(sp, analytic.SerialCompositeSpectrum)
+        ans = (analytic.BlackBody1DSpectrum(5000).sample(self.wave).value *
+               self.box.sample(self.wave).value * 2)
+        np.testing.assert_allclose(sp.sample(self.wave).value, ans)
+
+        bp = self.box * analytic.Box1DSpectrum(1, 5200, 500)
+        assert isinstance(bp, analytic.SerialCompositePassband)
+        assert isinstance(bp.to_spectrum(self.wave), spectrum.SpectralElement)
+
+        # Adaptive sampling is limited to the passband
+        sp = (self.flat + self.gauss) * self.box
+        wave = sp.adaptive_wavelengths(rtol=1e-4)
+        np.testing.assert_allclose(wave.value[[0, -1]], [4750, 5250])
+
+    def test_multi_param_sets(self):
+        sp = analytic.Const1DSpectrum([1, 0.5]) + self.flat
+        assert sp.param_dim == 2
+        batch = sp.to_spectrum(self.wave, batch=True)
+        np.testing.assert_allclose(batch.flux.value[:, 0], [2, 1.5])
+        assert 'amplitude=0.5' in str(batch.exprs[1])
+
+    def test_band_integral(self):
+        ans = analytic.band_integral(self.flat + self.gauss, self.box)
+        np.testing.assert_allclose(
+            ans.value,
+            (analytic.band_integral(self.flat, self.box) +
+             analytic.band_integral(self.gauss, self.box)).value)
+
+    def test_exceptions(self):
+        with pytest.raises(exceptions.IncompatibleSources):
+            sp = self.flat * self.gauss
+        with pytest.raises(exceptions.IncompatibleSources):
+            sp = self.flat + self.box
+        with pytest.raises(exceptions.IncompatibleSources):
+            sp = self.flat + 1
+        with pytest.raises(exceptions.IncompatibleSources):
+            sp = analytic.Const1DSpectrum([1, 0.5]) + analytic.Const1DSpectrum(
+                [1, 0.5, 0.2])
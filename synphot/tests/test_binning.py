@@ -61,6 +61,45 @@ def test_center_edge_center_roundtrip():
     assert calc_centers.unit == centers.unit
 
 
+def test_calculate_bin_centers_recurrence():
+    """Test closed-form bin centers against the recurrence
+    with many uneven bins."""
+    edges = np.cumsum(np.random.RandomState(1234).uniform(0.5, 1.5, 100000))
+    edges += 1000
+    ans = np.empty(edges.size - 1)
+    ans[0] = edges[:2].mean()
+    for i in xrange(1, ans.size):
+        ans[i] = 2.0 * edges[i] - ans[i - 1]
+    centers = binning.calculate_bin_centers(edges, as_quantity=False)
+    assert not isinstance(centers, u.Quantity)
+    np.testing.assert_allclose(centers, ans, rtol=1e-12)
+
+
+def test_calculate_bin_out():
+    """Test storing results in given arrays."""
+    centers = u.Quantity([1, 2, 4, 10, 20], unit=u.micron)
+
+    edges = np.empty(6)
+    x = binning.calculate_bin_edges(centers, out=edges)
+    assert np.may_share_memory(x, edges)
+    assert x.unit == u.micron
+    np.testing.assert_array_equal(edges, [0.5, 1.5, 3, 7, 15, 25])
+
+    widths = np.empty(5)
+    x = binning.calculate_bin_widths(edges, out=widths, as_quantity=False)
+    assert x is widths
+    np.testing.assert_array_equal(widths, [1, 1.5, 4, 8, 10])
+
+    x = binning.calculate_bin_centers(edges, out=widths, as_quantity=False)
+    np.testing.assert_array_equal(widths, centers.value)
+
+    with pytest.raises(exceptions.SynphotError):
+        x = binning.calculate_bin_widths(edges, out=np.empty(6))
+    with pytest.raises(exceptions.SynphotError):
+        x = binning.calculate_bin_widths(
+            edges, out=np.empty(5, dtype=np.float32))
+
+
 @pytest.mark.parametrize(
     ('arr'), [u.Quantity(1, u.AA), u.Quantity(np.array([1]), u.AA)])
 def test_calculate_bin_exceptions(arr):
@@ -185,9 +224,54 @@ class TestBinRange(object):
         assert (binning.pixel_range(self.bins, waverange) ==
                 binning.pixel_range(self.bins, waverange[::-1]))
 
+    @pytest.mark.parametrize('mode', ['round', 'min', 'max', 'none'])
+    def test_wave_range_vectorized(self, mode):
+        """Many ranges at once must match one range at a time."""
+        cenwave = np.array([1003, 1003.5, 5000, 5000.25, 5004.5, 11000])
+        npix = np.array([0, 1, 2, 7, 100, 1])
+        w1, w2 = binning.wave_range(self.bins, cenwave, npix, mode=mode)
+        ans = [binning.wave_range(self.bins, c, int(n), mode=mode)
+               for c, n in zip(cenwave, npix)]
+        np.testing.assert_array_equal(w1, [a[0] for a in ans])
+        np.testing.assert_array_equal(w2, [a[1] for a in ans])
+
+        # Broadcast scalar npix
+        w1, w2 = binning.wave_range(self.bins, cenwave[2:5], 3, mode=mode)
+        assert w1.shape == w2.shape == (3, )
+
+        with pytest.raises(exceptions.OverlapError):
+            x = binning.wave_range(self.bins, cenwave, 3, mode=mode)
+
+    @pytest.mark.parametrize('mode', ['round', 'min', 'max', 'none'])
+    def test_pixel_range_vectorized(self, mode):
+        """Many ranges at once must match one range at a time."""
+        waverange = np.array([[1002.5, 1003.2], [5000, 5000], [5008.8, 4999.6],
+                              [5000.2, 5004.5], [10998.3, 11000.5]])
+        npix = binning.pixel_range(self.bins, waverange, mode=mode)
+        ans = [binning.pixel_range(self.bins, w, mode=mode)
+               for w in waverange]
+        np.testing.assert_array_equal(npix, ans)
+
+        with pytest.raises(exceptions.OverlapError):
+            x = binning.pixel_range(self.bins, [[5000, 5001], [500, 5001]])
+
+    def test_range_bin_limits(self):
+        """Ranges that reach the first or last pixel."""
+        assert binning.wave_range(self.bins, 1004, 3, mode='min') == (
+            1002.5, 1005.5)
+        assert binning.wave_range(self.bins, 1003, 1, mode='max') == (
+            1002.5, 1003.5)
+        np.testing.assert_allclose(
+            binning.pixel_range(self.bins, (1002.5, 1003.2), mode='none'), 0.7)
+        np.testing.assert_allclose(
+            binning.pixel_range(self.bins, (10999.8, 11000.5), mode='none'),
+            0.7)
+        assert binning.pixel_range(self.bins, (10999.6, 11000.4),
+                                   mode='min') == 0
+
 
 def test_calcbinflux():
-    """Test both C-ext and Python versions of calcbinflux().
+    """Test both C-ext and NumPy versions of calcbinflux().
 
     This is a simplified version of
     :func:`synphot.observation.Observation.binspec`.
@@ -218,8 +302,8 @@ def test_calcbinflux():
     avflux = (flux[1:] + flux[:-1]) * 0.5
     deltaw = spwave[1:] - spwave[:-1]
 
-    # PYTHON: Sum over each bin.
-    binflux_py, intwave_py = binning._slow_calcbinflux(
+    # NUMPY: Sum over each bin.
+    binflux_py, intwave_py = binning._numpy_calcbinflux(
         bins.size, i_beg, i_end, avflux, deltaw)
 
     # C-EXT: Sum over each bin.
@@ -231,9 +315,9 @@ def test_calcbinflux():
         binflux_c, intwave_c = synphot_utils.calcbinflux(
             bins.size, i_beg, i_end, avflux, deltaw)
 
-        # Compare between Python and C-ext
-        np.testing.assert_allclose(binflux_py, binflux_c)
-        np.testing.assert_allclose(intwave_py, intwave_c)
+        # Compare between NumPy and C-ext, which sum in the same order
+        np.testing.assert_array_equal(binflux_py, binflux_c)
+        np.testing.assert_array_equal(intwave_py, intwave_c)
 
     # Compare with expected values.
     # Flux values are inherited from old test, compare at 0.01% relative diff.
@@ -242,3 +326,84 @@ def test_calcbinflux():
          0.1201307, 0.11970269, 0.11927488,  0.11884699])
     np.testing.assert_allclose(binflux_py, flux_ans, rtol=1e-4)
     np.testing.assert_array_equal(intwave_py, np.ones(bins.size))
+
+
+def test_calcbinflux_2d():
+    """Test summing a stack of fluxes at once, with and without threads."""
+    rng = np.random.RandomState(42)
+    deltaw = rng.uniform(0.5, 1.5, 1000)
+    avflux = rng.uniform(0, 1, (7, 1000))
+    edges = np.arange(0, 1001, 50)
+    i_beg = edges[:-1]
+    i_end = edges[1:]
+
+    binflux, intwave = binning.calcbinflux(
+        i_beg.size, i_beg, i_end, avflux, deltaw)
+    assert binflux.shape == (7, 20)
+    for k in xrange(avflux.shape[0]):
+        binflux_1d, intwave_1d = binning.calcbinflux(
+            i_beg.size, i_beg, i_end, avflux[k], deltaw)
+        np.testing.assert_array_equal(binflux[k], binflux_1d)
+        np.testing.assert_array_equal(intwave, intwave_1d)
+
+    binflux_py, intwave_py = binning._numpy_calcbinflux(
+        i_beg.size, i_beg, i_end, avflux, deltaw)
+    np.testing.assert_array_equal(binflux, binflux_py)
+    np.testing.assert_array_equal(intwave, intwave_py)
+
+    binflux_mt, intwave_mt = binning.calcbinflux(
+        i_beg.size, i_beg, i_end, avflux, deltaw, nthreads=3)
+    np.testing.assert_array_equal(binflux_mt, binflux)
+    np.testing.assert_array_equal(intwave_mt, intwave)
+
+
+def test_numpy_calcbinflux_order():
+    """Test that NumPy calcbinflux() adds values in the same order as
+    the C-ext, for few wide bins and for many narrow bins."""
+    rng = np.random.RandomState(2)
+    deltaw = rng.uniform(0.5, 1.5, 1000)
+    avflux = rng.uniform(0, 1, 1000)
+
+    for edges in (np.arange(0, 1001, 250), np.arange(0, 1001, 4)):
+        i_beg = edges[:-1]
+        i_end = edges[1:]
+        binflux, intwave = binning._numpy_calcbinflux(
+            i_beg.size, i_beg, i_end, avflux, deltaw)
+        for i in xrange(i_beg.size):
+            sum_dw = 0.0
+            sum_flux = 0.0
+            for j in xrange(i_beg[i], i_end[i]):
+                sum_dw += deltaw[j]
+                sum_flux += avflux[j] * deltaw[j]
+            assert intwave[i] == sum_dw
+            assert binflux[i] == sum_flux / sum_dw
+
+
+def test_numpy_calcbinflux_uneven():
+    """Test NumPy calcbinflux() with uneven, non-contiguous, and empty bins
+    against direct sums, and the same errors as the C-ext."""
+    rng = np.random.RandomState(1)
+    deltaw = rng.uniform(0.5, 1.5, 100)
+    avflux = rng.uniform(0, 1, (2, 100))
+    i_beg = np.array([0, 3, 40, 41, 90])
+    i_end = np.array([3, 40, 41, 60, 100])
+
+    binflux, intwave = binning._numpy_calcbinflux(
+        i_beg.size, i_beg, i_end, avflux, deltaw)
+    for i in xrange(i_beg.size):
+        cur_dw = deltaw[i_beg[i]:i_end[i]]
+        np.testing.assert_allclose(intwave[i], cur_dw.sum())
+        np.testing.assert_allclose(
+            binflux[:, i],
+            np.sum(avflux[:, i_beg[i]:i_end[i]] * cur_dw, axis=1) /
+            cur_dw.sum())
+
+    with pytest.raises(ZeroDivisionError):
+        x = binning._numpy_calcbinflux(
+            i_beg.size, i_beg, i_beg, avflux, deltaw)
+    with pytest.raises(IndexError):
+        x = binning._numpy_calcbinflux(
+            i_beg.size, i_beg, i_end + 1, avflux, deltaw)
+    with pytest.raises(ValueError):
+        x = binning._numpy_calcbinflux(
+            i_beg.size + 1, i_beg, i_end, avflux, deltaw)
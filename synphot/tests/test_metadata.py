@@ -0,0 +1,92 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""Test metadata.py module."""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+# ASTROPY
+from astropy.tests.helper import pytest
+
+# LOCAL
+from ..metadata import Metadata, Provenance
+
+
+def test_provenance():
+    p1 = Provenance('{0}', 'bb(5000)')
+    p2 = Provenance('{0} at z={1}', p1, 0.1)
+    assert str(p2) == 'bb(5000) at z=0.1'
+    assert p2 == 'bb(5000) at z=0.1'
+    assert p2.args[0] is p1
+
+    # Long chain should not hit recursion limit
+    p = p1
+    for i in range(5000):
+        p = Provenance('{0} at z={1}', p, 0)
+    assert str(p).endswith('at z=0')
+
+    # Shared operands are rendered once
+    p = p1
+    for i in range(100):
+        p = Provenance('{0}', p, p)
+    assert str(p) == 'bb(5000)'
+
+
+class TestMetadata(object):
+    """Test layered metadata."""
+    def setup_class(self):
+        self.hdr_1 = {'expr': 'sp1', 'a': 1, 'b': 1}
+        self.hdr_2 = {'expr': 'sp2', 'b': 2, 'c': 2}
+
+    def test_layers(self):
+        meta = Metadata(parents=(self.hdr_1, self.hdr_2))
+        assert meta['b'] == 1
+        assert meta['c'] == 2
+        assert 'a' in meta
+        assert 'd' not in meta
+        assert sorted(meta) == ['a', 'b', 'c', 'expr']
+        assert len(meta) == 4
+
+        with pytest.raises(KeyError):
+            meta['d']
+
+    def test_modify(self):
+        meta = Metadata(parents=(self.hdr_1, self.hdr_2))
+        del meta['expr']
+        meta['b'] = 3
+        assert 'expr' not in meta
+        assert meta['b'] == 3
+        assert len(meta) == 3
+
+        # Parents are not modified
+        assert self.hdr_1 == {'expr': 'sp1', 'a': 1, 'b': 1}
+        assert self.hdr_2 == {'expr': 'sp2', 'b': 2, 'c': 2}
+
+        meta['expr'] = Provenance('{0} + {1}', 'sp1', 'sp2')
+        assert meta['expr'] == 'sp1 + sp2'
+        assert isinstance(meta.get_raw('expr'), Provenance)
+
+        with pytest.raises(KeyError):
+            del meta['d']
+
+    def test_copy(self):
+        meta = Metadata({'a': 0}, parents=(self.hdr_1, ))
+        meta2 = meta.copy()
+        meta2['a'] = 5
+        assert meta['a'] == 0
+        assert meta2['a'] == 5
+        assert meta2['expr'] == 'sp1'
+
+    def test_shared_parents(self):
+        # Deep chain where each layer references its parent twice
+        # should not be searched once per path.
+        meta = Metadata(parents=(self.hdr_1, ))
+        for i in range(100):
+            meta = Metadata(parents=(meta, meta))
+        assert meta['b'] == 1
+        assert 'd' not in meta
+        assert sorted(meta) == ['a', 'b', 'expr']
+
+        # Key hidden along one path is still found along the other
+        hidden = Metadata(parents=(self.hdr_2, ))
+        del hidden['c']
+        meta = Metadata(parents=(hidden, self.hdr_2))
+        assert meta['c'] == 2
+        assert sorted(meta) == ['b', 'c', 'expr']
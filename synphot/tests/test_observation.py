@@ -6,6 +6,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import os
 import shutil
 import tempfile
+from copy import deepcopy
 
 # THIRD-PARTY
 import numpy as np
@@ -17,8 +18,8 @@ from astropy.tests.helper import pytest, remote_data
 from astropy.utils.data import get_pkg_data_filename
 
 # LOCAL
-from .. import analytic, spectrum, exceptions, units
-from ..observation import Observation
+from .. import analytic, spectrum, exceptions, units, utils
+from ..observation import CompiledObservationMode, Observation
 
 
 # HST primary mirror
@@ -122,6 +123,31 @@ class TestObservation(object):
         np.testing.assert_allclose(self.obs.flux.value, old_flux.value)
         np.testing.assert_allclose(self.obs.binflux.value, old_binflux.value)
 
+    def test_lazy_binning(self):
+        """Binned data are only calculated when needed, from the native
+        data that were given to binspec(), in their original unit."""
+        obs = Observation.from_spec_band(
+            self.flat_sp, self.bp, binwave=self.binwave)
+        assert obs._binflux is None and obs._bin_edges is None
+
+        # Only native data are used
+        obs.effstim(flux_unit=units.FLAM, band=self.bp)
+        assert obs._binflux is None
+
+        # Math rebins lazily
+        obs2 = obs * 2
+        assert obs2._binflux is None
+        np.testing.assert_allclose(
+            obs2.binflux.value, self.obs.binflux.value * 2)
+
+        obs.convert_flux(units.PHOTNU)
+        assert obs._binflux is None
+        np.testing.assert_allclose(
+            obs.binflux.value,
+            units.convert_flux(self.obs.binwave, self.obs.binflux,
+                               units.PHOTNU).value)
+        assert obs.bin_edges is not None
+
     def test_sampled_binned(self):
         flux = self.obs.sample_binned([6000, 6004, 6009])
         np.testing.assert_allclose(
@@ -134,6 +160,19 @@ class TestObservation(object):
         with pytest.raises(exceptions.UnsortedWavelength):
             flux = self.obs.sample_binned([6004, 6000, 6009])
 
+        with pytest.raises(exceptions.DuplicateWavelength):
+            flux = self.obs.sample_binned([6000, 6004, 6004])
+
+        # Descending order
+        flux = self.obs.sample_binned([6009, 6004, 6000])
+        np.testing.assert_allclose(
+            flux.value, [0.11884699, 0.12098646, 0.12265425], rtol=1e-4)
+
+        # Lookup of all bins
+        np.testing.assert_array_equal(
+            self.obs.sample_binned(self.obs.binwave).value,
+            self.obs.binflux.value)
+
     @pytest.mark.parametrize(
         ('cenwave', 'ans_w1', 'ans_w2'),
         [(u.Quantity(500, u.nm),
@@ -176,6 +215,22 @@ class TestObservation(object):
         np.testing.assert_array_equal(obs.binwave.value, sp.wave.value)
         assert 'foo' in obs.warnings
 
+    def test_from_spec_band_multi(self):
+        """One observation per parameter set of analytic spectrum."""
+        obs = Observation.from_spec_band(
+            analytic.Const1DSpectrum([1, 0.5], area=_area), self.bp)
+        assert len(obs) == 2
+        np.testing.assert_allclose(obs[1].flux.value, 0.5 * obs[0].flux.value)
+        assert 'amplitude=0.5' in obs[1].metadata['expr']
+
+        obs = Observation.from_spec_band(
+            self.flat_sp, analytic.Box1DSpectrum(
+                [1, 1], [5000, 5500], [100, 50], area=_area),
+            binwave=self.binwave)
+        assert len(obs) == 2
+        np.testing.assert_allclose(
+            obs[0].binwave.value, obs[1].binwave.value)
+
     def test_from_spec_band_exceptions(self):
         """The rest of overlap checks are in `TestFromSpecBandForce`."""
         # Invalid input classes
@@ -187,11 +242,10 @@ class TestObservation(object):
         # Ambiguous analytic spectra
         with pytest.raises(exceptions.SynphotError):
             obs = Observation.from_spec_band(
-                analytic.Const1DSpectrum([1, 0.5], area=_area), self.bp)
-        with pytest.raises(exceptions.SynphotError):
-            obs = Observation.from_spec_band(
-                self.flat_sp, analytic.Box1DSpectrum(
-                    [1, 1], [5000, 5500], [100, 50], area=_area))
+                analytic.Const1DSpectrum([1, 0.5], area=_area),
+                analytic.Box1DSpectrum(
+                    [1, 1], [5000, 5500], [100, 50], area=_area),
+                binwave=self.binwave)
 
         # Pure analytic inputs without binwave
         with pytest.raises(exceptions.SynphotError):
@@ -251,6 +305,30 @@ class TestMathOperators(object):
         assert new_obs.binflux.value[4000] == ans
         assert new_obs.binflux.value[0] == 0
 
+    @pytest.mark.parametrize(('is_scalar'), [True, False])
+    def test_inplace_mul_div(self, is_scalar):
+        other = self._get_other(is_scalar)
+        new_obs = deepcopy(self.obs)
+        new_obs *= other
+        new_obs *= other
+        new_obs /= other
+
+        # Native dataset
+        assert new_obs.resample(5000).value == 2
+        assert new_obs.resample(1000).value == 0
+
+        # Binned dataset
+        assert new_obs.binflux.value[4000] == 2
+        assert new_obs.binflux.value[0] == 0
+
+    def test_inplace_no_binset(self):
+        obs = Observation.from_file(_specfile, area=_area)
+        flux = obs.flux.value.copy()
+        obs *= 2
+        obs /= 4
+        np.testing.assert_allclose(obs.flux.value, flux * 0.5)
+        assert obs.binwave is None
+
     @pytest.mark.parametrize(('is_scalar'), [True, False])
     def test_exceptions(self, is_scalar):
         """These operators are disabled."""
@@ -261,6 +339,12 @@ class TestMathOperators(object):
         with pytest.raises(NotImplementedError):
             new_obs = self.obs - other
 
+        new_obs = deepcopy(self.obs)
+        with pytest.raises(NotImplementedError):
+            new_obs += other
+        with pytest.raises(NotImplementedError):
+            new_obs -= other
+
 
 class TestObsPar(object):
     """Test Observation values from IRAF SYNPHOT CALCPHOT.
@@ -293,6 +377,40 @@ class TestObsPar(object):
         np.testing.assert_allclose(eff_lam.value, ans, rtol=1e-5)
         assert eff_lam.unit == u.AA
 
+    def test_moments_cache(self):
+        """Cached moments must follow changes in flux unit and values.
+        References are calculated in double precision, as the moments
+        are, because the data are single precision."""
+        obs = Observation.from_file(_specfile, area=_area)
+        wave = obs.wave.value.astype(np.float64)
+        flux = obs.flux.value.astype(np.float64)
+        ans = utils.avg_wavelength(wave, flux)
+        np.testing.assert_allclose(obs.avgwave().value, ans, rtol=1e-7)
+        ans_eff = obs.effective_wavelength()
+        assert obs.barlam() == obs.barlam()
+        assert len(obs._moments) == 1
+
+        obs.convert_flux(units.PHOTLAM)
+        flux = obs.flux.value.astype(np.float64)
+        ans = utils.avg_wavelength(wave, flux)
+        np.testing.assert_allclose(obs.avgwave().value, ans, rtol=1e-7)
+        ans = utils.barlam(wave, flux)
+        np.testing.assert_allclose(obs.barlam().value, ans, rtol=1e-7)
+        np.testing.assert_allclose(
+            obs.effective_wavelength(mode='efflphot').value,
+            (utils.trapezoid_integration(wave, flux * wave ** 2) /
+             utils.trapezoid_integration(wave, flux * wave)),
+            rtol=1e-7)
+        np.testing.assert_allclose(
+            obs.effective_wavelength().value, ans_eff.value, rtol=1e-7)
+
+        # Flux modified in-place
+        obs *= spectrum.SpectralElement(
+            obs.wave, wave / wave.max(), area=_area)
+        flux = obs.flux.value.astype(np.float64)
+        np.testing.assert_allclose(
+            obs.avgwave().value, utils.avg_wavelength(wave, flux), rtol=1e-7)
+
     def test_efflam_exceptions(self):
         with pytest.raises(exceptions.SynphotError):
             eff_lam = self.obs.effective_wavelength(mode='foo')
@@ -323,6 +441,33 @@ class TestObsPar(object):
         else:
             assert eff_stim.unit == flux_unit
 
+    def test_effstim_many_waveranges(self):
+        """Many ranges at once must match one range at a time.
+        Data are single precision, so only the calculations for many
+        ranges are done fully in double precision."""
+        waverange = u.Quantity(
+            [[400, 500], [499.95, 500.05], [510.3, 620.7], [351, 999]], u.nm)
+        for flux_unit in (units.FLAM, units.PHOTNU, units.ABMAG):
+            eff_stim = self.obs.effstim(
+                flux_unit=flux_unit, band=self.bp, wave_range=waverange)
+            ans = [self.obs.effstim(
+                    flux_unit=flux_unit, band=self.bp, wave_range=w).value
+                   for w in waverange]
+            np.testing.assert_allclose(eff_stim.value, ans, rtol=1e-7)
+            assert eff_stim.unit == flux_unit
+
+    def test_effstim_many_waveranges_inplace(self):
+        """Cached index must follow in-place changes of flux."""
+        obs = Observation.from_file(_specfile, area=_area)
+        waverange = u.Quantity([[400, 500], [510.3, 620.7]], u.nm)
+        eff_stim = obs.effstim(
+            flux_unit=units.FLAM, band=self.bp, wave_range=waverange)
+        obs *= 2
+        np.testing.assert_allclose(
+            obs.effstim(flux_unit=units.FLAM, band=self.bp,
+                        wave_range=waverange).value,
+            2 * eff_stim.value, rtol=1e-7)
+
     @remote_data
     def test_effstim_vegamag(self):
         vspec = spectrum.SourceSpectrum.from_vega(
@@ -340,6 +485,69 @@ class TestObsPar(object):
         eff_stim = obs.effstim(flux_unit=units.FLAM, band=bp)
         np.testing.assert_allclose(eff_stim.value, 2.03E-15, rtol=5e-4)
 
+        # Multiple parameter sets
+        bp = analytic.Box1DSpectrum([1, 1], [5000, 5500], [100, 50])
+        eff_stim = self.obs.effstim(flux_unit=units.STMAG, band=bp)
+        ans = [self.obs.effstim(
+                flux_unit=units.STMAG,
+                band=analytic.Box1DSpectrum(1, x0, width)).value
+               for x0, width in ((5000, 100), (5500, 50))]
+        np.testing.assert_allclose(eff_stim.value, ans)
+        assert eff_stim.unit == units.STMAG
+
+    def test_effstim_analytic_all(self):
+        """Closed form for analytic source spectrum and passband."""
+        sp = analytic.PowerLaw1DSpectrum(1, 5000, 2, flux_unit=units.PHOTLAM)
+        bp = analytic.Box1DSpectrum(1, 5000, 100)
+        obs = Observation.from_spec_band(
+            sp, bp, binwave=np.arange(4900, 5101, 10.0))
+        eff_stim = obs.effstim(flux_unit=units.PHOTLAM, band=bp)
+        ans = analytic.band_integral(sp, bp, wave_power=1).value / 5e5
+        np.testing.assert_allclose(eff_stim.value, ans)
+
+        # Sampled data are used once they change
+        obs.flux = obs.flux * 2
+        eff_stim = obs.effstim(flux_unit=units.PHOTLAM, band=bp)
+        assert not np.allclose(eff_stim.value, 2 * ans, rtol=1e-6)
+
+    def test_effstim_analytic_partial(self):
+        """Closed form only covers wavelengths of the observation."""
+        sp = analytic.PowerLaw1DSpectrum(1, 5000, 4)
+        bp = analytic.Box1DSpectrum(1, 5000, 300)
+        obs = Observation.from_spec_band(
+            sp, bp, binwave=np.arange(4000, 5001.0))
+        eff_stim = obs.effstim(flux_unit=units.FLAM, band=bp, binned=False)
+
+        # Sampled data
+        obs._analytic = None
+        ans = obs.effstim(flux_unit=units.FLAM, band=bp, binned=False)
+        np.testing.assert_allclose(eff_stim.value, ans.value, rtol=5e-4)
+
+    def test_integrate_analytic(self):
+        """Closed form for analytic source spectrum and passband."""
+        sp = analytic.PowerLaw1DSpectrum(1, 5000, 2, flux_unit=units.PHOTLAM)
+        bp = analytic.Box1DSpectrum(1, 5000, 100)
+        obs = Observation.from_spec_band(
+            sp, bp, binwave=np.arange(4900, 5101, 10.0))
+        totalflux = obs.integrate()
+        ans = analytic.band_integral(sp, bp)
+        np.testing.assert_allclose(totalflux.value, ans.value)
+        assert totalflux.unit == obs.flux.unit
+
+        # Partial coverage
+        obs = Observation.from_spec_band(
+            sp, bp, binwave=np.arange(4900, 5001, 10.0))
+        totalflux = obs.integrate()
+        np.testing.assert_allclose(
+            totalflux.value,
+            analytic.band_integral(
+                sp, analytic.Box1DSpectrum(1, 4975, 50)).value)
+
+        # Given wavelengths are sampled
+        np.testing.assert_allclose(
+            obs.integrate(wavelengths=obs.wave).value,
+            spectrum.SourceSpectrum(obs.wave, obs.flux).integrate().value)
+
     def test_effstim_exceptions(self):
         # Invalid flux unit
         with pytest.raises(exceptions.SynphotError):
@@ -361,11 +569,6 @@ class TestObsPar(object):
                 band=spectrum.SpectralElement(
                     [3249.9, 3250, 3750, 3750.1], [0, 1.0, 1.0, 0]))
 
-        # Ambiguous analytic passband
-        with pytest.raises(exceptions.SynphotError):
-            eff_stim = self.obs.effstim(
-                band=analytic.Box1DSpectrum([1, 1], [5000, 5500], [100, 50]))
-
         # Missing Vega spectrum
         with pytest.raises(exceptions.SynphotError):
             eff_stim = self.obs.effstim(flux_unit=units.VEGAMAG, band=self.bp)
@@ -383,11 +586,11 @@ class TestCountRate(object):
             wave, u.Quantity(wave - 1000, u.count), units.FLAM, area=_area)
         sp = spectrum.SourceSpectrum(
             wave, flux_flam, area=_area, header={'expr': 'slope1'})
-        bp = spectrum.SpectralElement(
+        self.bp = spectrum.SpectralElement(
             [1000, 1009.95, 1010, 1030, 1030.05, 1100], [0, 0, 1, 1, 0, 0],
             area=_area, header={'expr': 'handmade_box'})
         self.obs = Observation.from_spec_band(
-            sp, bp, binwave=np.arange(1000, 1020))
+            sp, self.bp, binwave=np.arange(1000, 1020))
 
     def test_no_waverange(self):
         """Use all bins."""
@@ -406,6 +609,24 @@ class TestCountRate(object):
         ct_rate = self.obs.countrate(wave_range=[w1, w2])
         np.testing.assert_allclose(ct_rate.value, ans, rtol=1e-4)
 
+    @pytest.mark.parametrize('binned', [True, False])
+    def test_waverange_quantity_list(self, binned):
+        """Single range given as a list of Quantity."""
+        waverange = [u.Quantity(1013, u.AA), u.Quantity(101.6, u.nm)]
+        ct_rate = self.obs.countrate(wave_range=waverange, binned=binned)
+        ans = self.obs.countrate(wave_range=[1013, 1016], binned=binned)
+        np.testing.assert_allclose(ct_rate.value, ans.value, rtol=1e-12)
+        assert ct_rate.isscalar
+
+        eff_stim = self.obs.effstim(
+            flux_unit=units.PHOTLAM, band=self.bp, wave_range=waverange,
+            binned=binned)
+        ans = self.obs.effstim(
+            flux_unit=units.PHOTLAM, band=self.bp, wave_range=[1013, 1016],
+            binned=binned)
+        np.testing.assert_allclose(eff_stim.value, ans.value, rtol=1e-12)
+        assert eff_stim.isscalar
+
     def test_waverange_no_bin(self):
         """Use given wavelength range on native dataset.
 
@@ -428,14 +649,56 @@ class TestCountRate(object):
         with pytest.raises(exceptions.PartialOverlap):
             ct_rate = self.obs.countrate(wave_range=[w1, w2])
 
+    @pytest.mark.parametrize('binned', [True, False])
+    def test_many_waveranges(self, binned):
+        """Many ranges at once must match one range at a time."""
+        waverange = np.array([[1000, 1019], [1013, 1016], [1012.8, 1016],
+                              [1013.2, 1016], [1010.3, 1010.7], [1011, 1012]])
+        ct_rate = self.obs.countrate(wave_range=waverange, binned=binned)
+        ans = [self.obs.countrate(wave_range=w, binned=binned).value
+               for w in waverange]
+        np.testing.assert_allclose(ct_rate.value, ans, rtol=1e-12)
+        assert ct_rate.unit == u.count
+
+        # Given in other unit
+        ct_rate = self.obs.countrate(
+            wave_range=u.Quantity(waverange[1:], u.AA).to(u.nm),
+            binned=binned)
+        np.testing.assert_allclose(ct_rate.value, ans[1:], rtol=1e-12)
+
+        # Magnitude
+        ob_mag = self.obs.effstim(
+            flux_unit=units.OBMAG, wave_range=waverange, binned=binned)
+        np.testing.assert_allclose(ob_mag.value, -2.5 * np.log10(ans))
+
+        # Data have changed
+        obs = self.obs * 2
+        ct_rate = obs.countrate(wave_range=waverange, binned=binned)
+        np.testing.assert_allclose(ct_rate.value, 2 * np.array(ans))
+
+    def test_many_waveranges_force(self):
+        waverange = [[1016, 1026], [999, 1016], [1013, 1016]]
+        ct_rate = self.obs.countrate(wave_range=waverange, force=True)
+        np.testing.assert_allclose(ct_rate.value, [140, 172.75, 116],
+                                   rtol=1e-4)
+
+        with pytest.raises(exceptions.PartialOverlap):
+            ct_rate = self.obs.countrate(wave_range=waverange)
+
     def test_waverange_exceptions(self):
         # Invalid wavelength range
         with pytest.raises(exceptions.SynphotError):
             ct_rate = self.obs.countrate(wave_range=[1016, 1013.2])
+        with pytest.raises(exceptions.SynphotError):
+            ct_rate = self.obs.countrate(
+                wave_range=[[1013, 1016], [1016, 1013.2]])
 
         # Disjoint wavelength range
         with pytest.raises(exceptions.DisjointError):
             ct_rate = self.obs.countrate(wave_range=[1020, 1030])
+        with pytest.raises(exceptions.DisjointError):
+            ct_rate = self.obs.countrate(
+                wave_range=[[1013, 1016], [1020, 1030]])
 
 
 class TestFromSpecBandForce(object):
@@ -466,6 +729,63 @@ class TestFromSpecBandForce(object):
         assert force_type in obs.warnings['PartialOverlap']
 
 
+class TestCompiledObservationMode(object):
+    """Test compiled observation mode against Observation."""
+    def setup_class(self):
+        self.bp = spectrum.SpectralElement.from_file(_bandfile, area=_area)
+        self.wave = np.arange(3000, 11000, 2.5)
+        self.binwave = np.arange(4000, 7000, 7.3)
+        self.flux = u.Quantity(
+            [1e-15 * (self.wave / 5000) ** -2,
+             1e-16 * (1 + np.sin(self.wave / 50.0))], units.FLAM)
+        self.cmode = CompiledObservationMode(
+            self.bp, self.binwave, self.wave, flux_unit=units.FLAM,
+            area=_area)
+
+    def test_binflux(self):
+        binflux = self.cmode.binflux(self.flux)
+        assert binflux.shape == (2, self.binwave.size)
+        assert binflux.unit == units.FLAM
+
+        for i in range(2):
+            sp = spectrum.SourceSpectrum(self.wave, self.flux[i], area=_area)
+            obs = Observation.from_spec_band(sp, self.bp, binwave=self.binwave)
+            np.testing.assert_allclose(binflux[i].value, obs.binflux.value,
+                                       rtol=1e-10)
+
+            counts = units.convert_flux(
+                obs.binwave, obs.binflux, u.count, area=_area)
+            np.testing.assert_allclose(
+                self.cmode.counts(self.flux[i].value), counts.value,
+                rtol=1e-10)
+            np.testing.assert_allclose(
+                self.cmode.countrate(self.flux[i]).value,
+                obs.countrate().value, rtol=1e-10)
+
+    def test_flux_unit(self):
+        """Quantity is converted to compiled flux unit."""
+        flux = units.convert_flux(self.wave, self.flux, units.PHOTLAM)
+        np.testing.assert_allclose(
+            self.cmode.binflux(flux).value,
+            self.cmode.binflux(self.flux.value), rtol=1e-10)
+
+    def test_exceptions(self):
+        with pytest.raises(exceptions.SynphotError):
+            x = self.cmode.binflux(np.ones(10))
+        with pytest.raises(exceptions.SynphotError):
+            x = CompiledObservationMode(
+                self.bp, self.binwave, self.wave).counts(self.flux)
+        with pytest.raises(exceptions.SynphotError):
+            x = CompiledObservationMode(
+                self.bp, self.binwave, self.wave, flux_unit=units.ABMAG)
+        with pytest.raises(exceptions.PartialOverlap):
+            x = CompiledObservationMode(
+                self.bp, self.binwave, np.arange(5000, 11000))
+        with pytest.raises(exceptions.DisjointError):
+            x = CompiledObservationMode(
+                self.bp, self.binwave, np.arange(20000, 30000))
+
+
 class TestReadWriteObs(object):
     """Test from_file() and to_fits() methods (no binned data)."""
     def setup_class(self):
@@ -10,6 +10,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import numpy as np
 
 # ASTROPY
+from astropy import constants as const
 from astropy import units as u
 
 # LOCAL
@@ -26,3 +27,49 @@ def test_bb_photlam_arsec():
     flux = planck.bb_photlam_arcsec(wave, 1000.0)
     np.testing.assert_allclose(flux.value[5000], 3.89141e-08, rtol=2.5e-3)
     assert flux.unit == units.PHOTLAM / u.arcsec ** 2
+
+
+def test_bbfunc_temperatures():
+    """Test ``bbfunc()`` with array of temperatures and at the limits."""
+    wave = utils.generate_wavelengths(num=100)[0]
+    temperatures = np.array([[1000.0, 5000.0], [1e4, 3e4]])
+    flux = planck.bbfunc(wave, temperatures)
+    assert flux.shape == (2, 2, 100)
+    assert flux.unit == units.PHOTLAM / u.sr
+    np.testing.assert_allclose(
+        flux.value[1, 0], planck.bbfunc(wave, 1e4).value, rtol=1e-14)
+    np.testing.assert_array_equal(
+        planck.bb_photlam(wave, u.Quantity(temperatures[0], u.K)).value,
+        planck.bb_photlam(wave, temperatures[0]).value)
+
+    # Wien limit underflows to zero without overflow
+    with np.errstate(over='raise', invalid='raise'):
+        flux = planck.bbfunc([500, 1000], 1.0)
+    np.testing.assert_array_equal(flux.value, 0)
+
+    # Rayleigh-Jeans limit
+    x = 1e-10
+    wave = 1e8
+    temperature = (const.h * const.c / (const.k_B * x)).to(
+        u.AA * u.K).value / wave
+    flux = planck.bbfunc(wave, temperature)
+    ans = 2e24 * const.c.cgs.value / (wave ** 4 * x)
+    np.testing.assert_allclose(flux.value, ans, rtol=1e-9)
+
+
+def test_bb_photlam_integral():
+    """Test ``bb_photlam_integral()`` against sampled spectrum."""
+    wave = np.linspace(1000, 2000, 100001)
+    ans = planck.bb_photlam_integral(1000, 2000, [3000.0, 5e4])
+    assert ans.unit == units.PHOTLAM * u.AA
+    for i, temperature in enumerate((3000.0, 5e4)):
+        flux = planck.bb_photlam(wave, temperature).value
+        np.testing.assert_allclose(
+            ans.value[i], utils.trapezoid_integration(wave, flux), rtol=1e-9)
+
+    # Both series, and the exact form for wavelength power of 2
+    for power in (-1, 0, 1, 2):
+        flux = planck._bb_values(wave, 1e4) * wave ** power
+        np.testing.assert_allclose(
+            planck._bb_integral_values(1000, 2000, 1e4, power),
+            utils.trapezoid_integration(wave, flux), rtol=1e-9)
@@ -6,6 +6,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import os
 import shutil
 import tempfile
+from copy import deepcopy
 
 # THIRD-PARTY
 import numpy as np
@@ -17,7 +18,7 @@ from astropy.tests.helper import pytest, remote_data
 from astropy.utils.data import get_pkg_data_filename
 
 # LOCAL
-from .. import analytic, spectrum, exceptions, units
+from .. import analytic, spectrum, exceptions, units, utils
 from ..observation import Observation
 from ..utils import generate_wavelengths
 
@@ -94,6 +95,42 @@ def test_flux_conversion(in_q, out_u, ans):
     assert result.unit == ans.unit
 
 
+def test_flux_conversion_kernel():
+    """Test cached conversion kernels and output buffer."""
+    kernel = units.get_conversion_kernel(units.STMAG, u.Jy)
+    assert units.get_conversion_kernel('stmag', 'Jy') is kernel
+    np.testing.assert_allclose(
+        kernel(_wave.value, _flux_stmag.value), _flux_jy.value, rtol=1e-6)
+
+    # Single precision input is converted in double precision,
+    # but keeps its precision
+    flux32 = _flux_flam.value.astype(np.float32)
+    kernel = units.get_conversion_kernel(units.FLAM, units.FNU)
+    result = kernel(_wave.value, flux32)
+    assert result.dtype == np.float32
+    np.testing.assert_array_equal(
+        result, kernel(_wave.value, flux32.astype(np.float64)).astype(
+            np.float32))
+    result = units.convert_flux(
+        _wave, u.Quantity(flux32, units.FLAM), units.ABMAG)
+    assert result.dtype == np.float32
+
+    # No kernel if more than wavelengths are needed
+    assert units.get_conversion_kernel(units.PHOTLAM, u.count) is None
+    assert units.get_conversion_kernel(units.VEGAMAG, units.FLAM) is None
+
+    # Output buffer, including in-place and via PHOTLAM
+    buf = _flux_flam.value.copy()
+    result = units.convert_flux(_wave, _flux_flam, units.ABMAG, out=buf)
+    assert np.may_share_memory(result.value, buf)
+    np.testing.assert_allclose(buf, _flux_abmag.value, rtol=1e-6)
+    buf = _flux_count.value.copy()
+    result = units.convert_flux(_wave, buf * u.count, units.FLAM, out=buf,
+                                area=_area)
+    np.testing.assert_allclose(buf, _flux_flam.value, rtol=1e-6)
+    assert result.unit == units.FLAM
+
+
 @remote_data
 @pytest.mark.parametrize(
     ('in_q', 'out_u', 'ans'),
@@ -311,9 +348,46 @@ class TestSourceSpectrum(object):
 
         # Exceptions
         with pytest.raises(exceptions.SynphotError):
-            sp_zlen = sp_z0.apply_redshift([1, 2, 3])
+            sp_zlen = sp_z0.apply_redshift([[1, 2, 3]])
         with pytest.raises(exceptions.SynphotError):
             sp_zlen = sp_z0.apply_redshift(u.Quantity(2))
+        with pytest.raises(exceptions.SynphotError):
+            sp_zlen = sp_z0.apply_redshift([0, -1])
+
+    def test_redshift_batch(self):
+        """Test SourceSpectrum apply_redshift() with many redshifts."""
+        wave = np.arange(1000, 11000, 2.5)
+        sp = spectrum.SourceSpectrum(
+            wave, 1e-14 * np.exp(-0.5 * ((wave - 3000) / 500) ** 2))
+        bp = spectrum.SpectralElement.from_file(_bandfile)
+        z = [0, 0.5, 0.75]
+
+        sp_z = sp.apply_redshift(z)
+        assert isinstance(sp_z, spectrum.RedshiftedSpectra)
+        assert len(sp_z) == 3
+        assert len(sp_z[1:]) == 2
+        np.testing.assert_array_equal(sp_z[1].wave.value, wave * 1.5)
+        assert str(sp_z[1]) == str(sp.apply_redshift(0.5))
+
+        # Redshifts share wavelengths, so results differ from individual
+        # observations by the sampling error of the trapezoid rule.
+        for flux_unit in (units.FLAM, units.STMAG):
+            ans = [Observation.from_spec_band(x, bp).effstim(
+                flux_unit=flux_unit, band=bp).value for x in sp_z]
+            np.testing.assert_allclose(
+                sp_z.effstim(bp, flux_unit=flux_unit).value, ans, rtol=1e-6)
+
+        # Blocks of redshifts give the same results as all at once
+        sp_z._block_size = 2
+        np.testing.assert_allclose(
+            sp_z.effstim(bp, flux_unit=units.STMAG).value, ans, rtol=1e-6)
+
+        # Passband is beyond spectrum when redshifted
+        with pytest.raises(exceptions.PartialOverlap):
+            x = sp.apply_redshift([0, 0.5, 2.5]).effstim(bp)
+        x = sp.apply_redshift([0, 0.5, 2.5]).effstim(bp, force='extrap')
+        with pytest.raises(exceptions.DisjointError):
+            x = sp.apply_redshift([0, 10]).effstim(bp)
 
 
 class TestAddMag(object):
@@ -607,6 +681,61 @@ def test_filter_exception():
         sp = spectrum.SpectralElement.from_filter('foo')
 
 
+def test_band_moments_memoized():
+    """Passband properties from memoized integrals must match direct
+    integrals, even for a narrow passband, and follow data changes."""
+    wave = np.linspace(5000, 5002, 2001)
+    bp = spectrum.SpectralElement(
+        wave, np.exp(-0.5 * ((wave - 5001) / 0.1) ** 2), area=_area)
+    thru = bp.thru.value
+    avg_wave = utils.avg_wavelength(wave, thru)
+    np.testing.assert_allclose(bp.avgwave().value, avg_wave, rtol=1e-14)
+    np.testing.assert_allclose(
+        bp.rmswidth().value,
+        np.sqrt(utils.trapezoid_integration(wave, (wave - avg_wave) ** 2 * thru) /
+                utils.trapezoid_integration(wave, thru)), rtol=1e-12)
+    bar_lam = utils.barlam(wave, thru)
+    np.testing.assert_allclose(
+        bp.photbw().value,
+        bar_lam * np.sqrt(
+            utils.trapezoid_integration(
+                wave, thru * np.log(wave / bar_lam) ** 2 / wave) /
+            utils.trapezoid_integration(wave, thru / wave)), rtol=1e-12)
+    pivwv = bp.pivot()
+    assert len(bp._moments) == 1
+
+    # Reassigned throughput
+    bp.thru = bp.thru * np.linspace(1, 2, wave.size)
+    assert bp.pivot() != pivwv
+    np.testing.assert_allclose(
+        bp.pivot().value ** 2,
+        (utils.trapezoid_integration(wave, bp.thru.value * wave) /
+         utils.trapezoid_integration(wave, bp.thru.value / wave)),
+        rtol=1e-14)
+
+    # Reassigned wavelengths
+    pivwv = bp.pivot()
+    bp.wave = u.Quantity(wave / 10, u.nm)
+    np.testing.assert_allclose(bp.pivot().value, pivwv.value / 10,
+                               rtol=1e-14)
+    assert bp.pivot().unit == u.nm
+
+    # Throughput modified in-place
+    bp = spectrum.SpectralElement(wave, thru, area=_area)
+    pivwv = bp.pivot()
+    assert sorted(bp._moments[None][1]) == ['thru_per_wave', 'wave']
+    rms_width = bp.rmswidth()
+    bp *= spectrum.SpectralElement(
+        wave, np.linspace(2, 1, wave.size), area=_area)
+    assert bp.pivot() < pivwv
+    np.testing.assert_allclose(
+        bp.pivot().value ** 2,
+        (utils.trapezoid_integration(wave, bp.thru.value * wave) /
+         utils.trapezoid_integration(wave, bp.thru.value / wave)),
+        rtol=1e-14)
+    assert bp.rmswidth() != rms_width
+
+
 class TestMathOperators(object):
     """Test spectrum math operators."""
     def setup_class(self):
@@ -794,6 +923,70 @@ class TestMathOperators(object):
         with pytest.raises(exceptions.IncompatibleSources):
             sp = self.sp_1 + spectrum.SourceSpectrum(_wave, _flux_jy)
 
+    def test_inplace(self):
+        """In-place operators give same results as other operators."""
+        sp = deepcopy(self.sp_1)
+        flux = sp.flux
+        sp *= 2
+        sp /= 4
+        sp += 1e-15
+        sp -= self.sp_1 * 0.1
+        assert sp.flux is flux
+        ans = (self.sp_1 * 2 / 4 + 1e-15) - self.sp_1 * 0.1
+        self._check_sp(sp, ans.wave.value, ans.flux.value)
+
+        # Same wavelengths but different flux unit
+        sp2 = spectrum.SourceSpectrum(_wave, _flux_flam, area=_area)
+        sp2 += self.sp_2
+        self._check_sp(sp2, _wave.value, 2 * _flux_flam.value)
+
+        # Different wavelengths need a new spectrum
+        sp2 = sp
+        sp2 *= self.bp_1
+        assert sp2 is not sp
+        ans = sp * self.bp_1
+        self._check_sp(sp2, ans.wave.value, ans.flux.value)
+
+        # Result is not a SpectralElement
+        bp = deepcopy(self.bp_1)
+        bp *= self.sp_1
+        assert isinstance(bp, spectrum.SourceSpectrum)
+
+        with pytest.raises(exceptions.IncompatibleSources):
+            bp /= self.sp_1
+
+    def test_lazy(self):
+        """Lazy expressions give same results as eager operations."""
+        # Only sums: identical
+        expr = self.sp_1.lazy() + self.sp_2 - 5e-15
+        sp = expr.evaluate()
+        ans = (self.sp_1 + self.sp_2) - 5e-15
+        self._check_sp(sp, ans.wave.value, ans.flux.value)
+        assert str(expr).endswith(' - 5e-15)')
+
+        # Passband on the left and spectrum on the right
+        sp = (2 * self.bp_1.lazy() * self.sp_1).evaluate(cache=False)
+        ans = self.bp_1 * 2 * self.sp_1
+        self._check_sp(sp, ans.wave.value, ans.flux.value)
+
+        # Eager operation with lazy expression
+        sp = (self.sp_1 + self.sp_1.lazy()).evaluate()
+        self._check_sp(sp, self.sp_1.wave.value, 2 * self.sp_1.flux.value)
+
+        # Repeated sub-expression
+        sub = self.sp_1.lazy() * self.bp_1
+        sp = (sub + sub).evaluate()
+        ans = self.sp_1 * self.bp_1
+        self._check_sp(sp, ans.wave.value, 2 * ans.flux.value)
+
+        # Same validation as eager operations
+        with pytest.raises(exceptions.IncompatibleSources):
+            expr = self.sp_1.lazy() + self.bp_1
+        with pytest.raises(exceptions.IncompatibleSources):
+            expr = self.bp_1.lazy() / self.sp_1
+        with pytest.raises(exceptions.IncompatibleSources):
+            expr = self.sp_1.lazy() * [1, 2, 3]
+
 
 class TestCheckOverlap(object):
     """Test spectrum overlap check."""
@@ -942,6 +1135,291 @@ class TestRenorm(object):
             rn_sp = self.bb.renorm(u.Quantity(10, units.VEGAMAG), self.abox)
 
 
+class TestRenormalizer(object):
+    """Test renormalization of many spectra to one passband."""
+    def setup_class(self):
+        self.bp = spectrum.SpectralElement.from_file(_bandfile, area=_area)
+        self.wave = np.arange(3000, 11000, 2.5)
+        self.fluxes = np.array(
+            [1e-15 * (self.wave / 5500) ** i for i in (-2, 0, 1, 3)])
+        self.rn = spectrum.Renormalizer(self.bp)
+
+    @pytest.mark.parametrize(
+        'rn_val',
+        [u.Quantity(1e-16, units.FLAM),
+         u.Quantity(1e-4, units.PHOTLAM),
+         u.Quantity(20, units.STMAG)])
+    def test_factors(self, rn_val):
+        ans = []
+        for flux in self.fluxes:
+            sp = spectrum.SourceSpectrum(self.wave, flux, area=_area)
+            rn_sp = sp.renorm(rn_val, self.bp)
+            ans.append(rn_sp.flux.value[0] / flux[0])
+
+        factors = self.rn.factors(self.wave, self.fluxes, rn_val,
+                                  flux_unit=units.FLAM, area=_area)
+        np.testing.assert_allclose(factors, ans)
+
+        # Cached standard flux and compiled passband are reused
+        assert self.rn.compile(self.wave) is self.rn.compile(self.wave)
+        assert (self.rn.standard_flux(rn_val.unit, units.FLAM, area=_area) ==
+                self.rn.standard_flux(rn_val.unit, units.FLAM, area=_area))
+
+    def test_stdflux_cache(self):
+        cache_size = spectrum._STDFLUX_CACHE_SIZE
+        spectrum._STDFLUX_CACHE_SIZE = 2
+        spectrum.clear_standard_fluxes()
+        assert len(spectrum._STDFLUX_CACHE) == 0
+
+        try:
+            stdfluxes = [self.rn.standard_flux(unit, units.FLAM, area=_area)
+                         for unit in (units.FLAM, units.PHOTLAM, units.FNU)]
+            assert len(spectrum._STDFLUX_CACHE) == 2
+
+            # Oldest entry was dropped but is recalculated as needed
+            assert self.rn.standard_flux(
+                units.FLAM, units.FLAM, area=_area) == stdfluxes[0]
+            assert len(spectrum._STDFLUX_CACHE) == 2
+        finally:
+            spectrum._STDFLUX_CACHE_SIZE = cache_size
+            spectrum.clear_standard_fluxes()
+
+        assert len(spectrum._STDFLUX_CACHE) == 0
+
+    def test_renorm_values(self):
+        sp = spectrum.SourceSpectrum(self.wave, self.fluxes[0], area=_area)
+        rn_vals = u.Quantity([1, 10, 100], u.count)
+        results = self.rn.renorm(sp, rn_vals)
+        assert len(results) == 3
+
+        for rn_val, rn_sp in zip(rn_vals, results):
+            ans = sp.renorm(rn_val, self.bp)
+            np.testing.assert_allclose(rn_sp.flux.value, ans.flux.value)
+
+        rn_sp = self.rn.renorm(sp, rn_vals[1])
+        np.testing.assert_allclose(rn_sp.flux.value, results[1].flux.value)
+
+    def test_exceptions(self):
+        # Invalid passband
+        with pytest.raises(exceptions.SynphotError):
+            spectrum.Renormalizer(np.ones(10))
+
+        # Invalid spectrum
+        with pytest.raises(exceptions.SynphotError):
+            self.rn.renorm(self.bp, [1, 2])
+
+        # Non-density unit in batch
+        with pytest.raises(exceptions.SynphotError):
+            self.rn.factors(self.wave, self.fluxes, u.Quantity(1, u.count))
+
+        # Disjoint passband
+        with pytest.raises(exceptions.DisjointError):
+            self.rn.factors(self.wave + 20000, self.fluxes, 1)
+
+
+class TestSpectrumBatch(object):
+    """Test spectra sharing the same wavelengths."""
+    def setup_class(self):
+        self.wave = np.arange(3000, 11000, 2.5)
+        self.fluxes = np.array(
+            [1e-15 * (self.wave / 5500) ** i for i in (-2, 0, 1, 3)])
+        self.batch = spectrum.SpectrumBatch(
+            spectrum.SourceSpectrum, self.wave, self.fluxes, area=_area,
+            exprs=['pl({0})'.format(i) for i in (-2, 0, 1, 3)])
+
+    def test_items(self):
+        assert len(self.batch) == 4
+        assert str(self.batch) == 'Batch of 4 SourceSpectrum on 3200 wavelengths'
+
+        sp = self.batch[2]
+        assert isinstance(sp, spectrum.SourceSpectrum)
+        np.testing.assert_array_equal(sp.flux.value, self.fluxes[2])
+        assert sp.flux.unit == units.FLAM
+        assert sp.metadata['expr'] == 'pl(1)'
+        assert sp.primary_area == _area
+
+        sub = self.batch[::2]
+        assert sub.exprs == ['pl(-2)', 'pl(1)']
+        assert [s.metadata['expr'] for s in sub] == sub.exprs
+
+        batch = spectrum.SpectrumBatch(
+            spectrum.SpectralElement, self.wave, self.fluxes[:2] * 0)
+        assert batch[1].metadata['expr'] == 'SpectralElement 1 of batch'
+
+    def test_exceptions(self):
+        with pytest.raises(exceptions.SynphotError):
+            spectrum.SpectrumBatch(Observation, self.wave, self.fluxes)
+        with pytest.raises(exceptions.SynphotError):
+            spectrum.SpectrumBatch(
+                spectrum.SourceSpectrum, self.wave, self.fluxes[:, :-1])
+        with pytest.raises(exceptions.SynphotError):
+            spectrum.SpectrumBatch(
+                spectrum.SourceSpectrum, self.wave, self.fluxes, exprs=['a'])
+
+
+class TestBandProperties(object):
+    """Test table of properties for many passbands."""
+    def setup_class(self):
+        self.wave = np.arange(3000, 11000, 2.5)
+        self.thrus = np.array(
+            [np.exp(-0.5 * ((self.wave - x0) / 200) ** 2)
+             for x0 in (4000, 6000, 8000)])
+        self.bands = [spectrum.SpectralElement.from_file(_bandfile, area=_area)]
+        self.bands += [spectrum.SpectralElement(self.wave, thru)
+                       for thru in self.thrus]
+        self.bands.append(spectrum.SpectralElement(
+            u.Quantity(self.wave[::2], u.nm), self.thrus[0, ::2]))
+
+    @staticmethod
+    def _double(bp):
+        # Properties table is calculated in double precision
+        return spectrum.SpectralElement(
+            bp.wave.astype(np.float64), bp.thru.astype(np.float64),
+            area=bp.primary_area)
+
+    def _compare(self, tab, bands):
+        bands = [self._double(bp) for bp in bands]
+        for colname in ('avgwave', 'pivot', 'rmswidth', 'photbw', 'fwhm',
+                        'efficiency', 'tpeak', 'wpeak', 'equivwidth'):
+            ans = [getattr(bp, colname)() for bp in bands]
+            ans = [x.to(tab[colname].unit).value for x in ans]
+            np.testing.assert_allclose(tab[colname], ans, rtol=1e-7,
+                                       err_msg=colname)
+
+    @pytest.mark.parametrize('nthreads', [1, 3])
+    def test_list(self, nthreads):
+        tab = spectrum.band_properties(self.bands, nthreads=nthreads)
+        assert len(tab) == len(self.bands)
+        assert list(tab['expr']) == [str(bp) for bp in self.bands]
+        assert tab['expr'].dtype.kind in ('S', 'U')
+        assert tab['pivot'].unit == u.AA
+        self._compare(tab[:-1], self.bands[:-1])
+
+        # Wavelengths in nm are reported in Angstrom
+        np.testing.assert_allclose(
+            tab['pivot'][-1], self.bands[-1].pivot().to(u.AA).value,
+            rtol=1e-12)
+
+        # Unit response is NaN where area is undefined
+        np.testing.assert_allclose(
+            tab['unit_response'][0],
+            self._double(self.bands[0]).unit_response().value,
+            rtol=1e-7)
+        assert np.isnan(tab['unit_response'][1:]).all()
+
+        tab = spectrum.band_properties(self.bands, area=_area)
+        assert np.isfinite(tab['unit_response']).all()
+
+    def test_batch(self):
+        batch = spectrum.SpectrumBatch(
+            spectrum.SpectralElement, self.wave, self.thrus, area=_area)
+        tab = spectrum.band_properties(batch)
+        assert list(tab['expr']) == batch.exprs
+        self._compare(tab, list(batch))
+        np.testing.assert_allclose(
+            tab['unit_response'], [bp.unit_response().value for bp in batch],
+            rtol=1e-12)
+
+    def test_exceptions(self):
+        with pytest.raises(exceptions.SynphotError):
+            spectrum.band_properties([])
+        with pytest.raises(exceptions.SynphotError):
+            spectrum.band_properties(
+                [spectrum.SourceSpectrum(self.wave, self.thrus[0])])
+        with pytest.raises(exceptions.SynphotError):
+            spectrum.band_properties(spectrum.SpectrumBatch(
+                spectrum.SourceSpectrum, self.wave, self.thrus))
+
+
+class TestCompiledBand(object):
+    """Test passband compiled against fixed source wavelengths."""
+    def setup_class(self):
+        self.bp = spectrum.SpectralElement.from_file(_bandfile)
+        self.wave = np.arange(3000, 11000, 2.5)
+        self.fluxes = np.array(
+            [1e-15 * (self.wave / 5500) ** i for i in (-2, 0, 1, 3)])
+        self.cbp = self.bp.compile(self.wave)
+
+    def _effstim(self, flux):
+        sp = spectrum.SourceSpectrum(self.wave, flux)
+        obs = Observation.from_spec_band(sp, self.bp)
+        return obs.effstim(band=self.bp).value
+
+    def test_effstim(self):
+        ans = [self._effstim(f) for f in self.fluxes]
+        np.testing.assert_allclose(self.cbp.effstim(self.fluxes), ans)
+        np.testing.assert_allclose(
+            self.cbp.effstim(self.fluxes[0]), ans[0])
+
+        # Descending wavelengths
+        cbp = self.bp.compile(self.wave[::-1])
+        np.testing.assert_allclose(cbp.effstim(self.fluxes[:, ::-1]), ans)
+
+    def test_integrate(self):
+        sp = spectrum.SourceSpectrum(self.wave, self.fluxes[1])
+        ans = (sp * self.bp).integrate().value
+        res = self.cbp.integrate(u.Quantity(self.fluxes[1], units.FLAM))
+        assert res.unit == units.FLAM
+        np.testing.assert_allclose(res.value, ans)
+
+    def test_pickle(self):
+        import pickle
+        cbp = pickle.loads(pickle.dumps(self.cbp))
+        np.testing.assert_array_equal(
+            cbp.effstim(self.fluxes), self.cbp.effstim(self.fluxes))
+        assert str(cbp) == str(self.cbp)
+
+    def test_exceptions(self):
+        with pytest.raises(exceptions.SynphotError):
+            self.cbp.effstim(self.fluxes[:, :-1])
+        with pytest.raises(exceptions.SynphotError):
+            spectrum.CompiledBand(self.fluxes, self.wave)
+
+
+class TestPrecision(object):
+    """Test single-precision flux storage."""
+    def setup_class(self):
+        self.wave = np.arange(3000, 11000, 0.5)
+        self.flux = 1e-14 * np.exp(-0.5 * ((self.wave - 6000) / 800) ** 2)
+        self.bp = spectrum.SpectralElement.from_file(_bandfile, area=_area)
+
+    def test_dtype(self):
+        sp = spectrum.SourceSpectrum(self.wave, self.flux, area=_area,
+                                     precision='single')
+        assert sp.precision == 'single'
+        assert sp.flux.dtype == np.float32
+        assert sp.wave.dtype == np.float64
+
+        sp2 = sp * self.bp
+        assert sp2.flux.dtype == np.float32
+        assert sp2.resample(self.wave).dtype == np.float32
+        sp2.convert_flux(units.PHOTLAM)
+        assert sp2.flux.dtype == np.float32
+
+        sp3 = spectrum.SourceSpectrum(self.wave, self.flux)
+        assert sp3.precision == 'double'
+        assert sp3.flux.dtype == np.float64
+
+        with pytest.raises(exceptions.SynphotError):
+            sp = spectrum.SourceSpectrum(self.wave, self.flux,
+                                         precision='half')
+
+    def test_error_bound(self):
+        """Integrated results are within a few float32 epsilon."""
+        ans = []
+        for precision in ('double', 'single'):
+            sp = spectrum.SourceSpectrum(self.wave, self.flux, area=_area,
+                                         precision=precision)
+            obs = Observation.from_spec_band(sp, self.bp)
+            ans.append([obs.effstim(band=self.bp).value,
+                        obs.effstim(flux_unit='count').value,
+                        sp.renorm(u.Quantity(1000, u.count),
+                                  self.bp).flux.value.max()])
+
+        eps = np.finfo(np.float32).eps
+        np.testing.assert_allclose(ans[1], ans[0], rtol=10 * eps)
+
+
 class TestWriteSpec(object):
     """Test spectrum to_fits() method."""
     def setup_class(self):
@@ -115,6 +115,42 @@ def test_genwave(num, delta, log, ans):
     assert isinstance(wave_str, basestring)
 
 
+class TestAdaptiveWave(object):
+    """Test adaptive wavelength generation."""
+    @staticmethod
+    def _gauss(x):
+        return np.exp(-0.5 * ((x - 5000.0) / 20.0) ** 2)
+
+    @pytest.mark.parametrize(('rtol'), [1e-3, 1e-5])
+    def test_rtol(self, rtol):
+        wave = utils.adaptive_wavelengths(
+            self._gauss, 4800, 5200, rtol=rtol, breakpoints=[5000])
+        ans = np.sqrt(2 * np.pi) * 20
+        assert wave[0] == 4800 and wave[-1] == 5200
+        assert np.all(np.diff(wave) > 0)
+        assert abs(utils.trapezoid_integration(
+            wave, self._gauss(wave)) / ans - 1) < rtol
+
+    def test_linear(self):
+        """Linear and multiple functions do not need refinement."""
+        wave = utils.adaptive_wavelengths(
+            lambda x: np.vstack([x, np.zeros_like(x)]).T, 1000, 2000,
+            breakpoints=[500, 1500, 3000])
+        np.testing.assert_array_equal(wave, [1000, 1500, 2000])
+
+    def test_max_points(self):
+        wave = utils.adaptive_wavelengths(
+            self._gauss, 4800, 5200, rtol=1e-10, breakpoints=[5000],
+            max_points=50)
+        assert 50 <= wave.size < 100
+
+    def test_exceptions(self):
+        with pytest.raises(exceptions.SynphotError):
+            wave = utils.adaptive_wavelengths(self._gauss, 5000, 4000)
+        with pytest.raises(exceptions.SynphotError):
+            wave = utils.adaptive_wavelengths(self._gauss, 4000, 5000, rtol=0)
+
+
 class TestMergeWave(object):
     """Test wavelengths merging."""
     def setup_class(self):
@@ -154,6 +190,33 @@ class TestTrapezoidIntegration(object):
         bar_lam = utils.barlam(self.wave.value, self.thru.value)
         np.testing.assert_allclose(bar_lam, 5331.8945)
 
+    def test_band_moments(self):
+        """Compare fused integrals with separate trapezoid integrals."""
+        wave = self.wave.value.astype(np.float64)
+        thru = self.thru.value.astype(np.float64)
+        moments = utils.band_moments(wave, thru)
+        ref_wave = moments['ref_wave']
+        assert ref_wave == wave[thru.argmax()]
+
+        for key, y in (
+                ('thru', thru),
+                ('wave', thru * (wave - ref_wave)),
+                ('wave2', thru * (wave - ref_wave) ** 2),
+                ('thru_per_wave', thru / wave),
+                ('logwave', thru * np.log(wave / ref_wave) / wave),
+                ('logwave2', thru * np.log(wave / ref_wave) ** 2 / wave)):
+            np.testing.assert_allclose(
+                moments[key], utils.trapezoid_integration(wave, y),
+                rtol=1e-12)
+
+        # Many passbands on same wavelengths, and descending order
+        batch = utils.band_moments(wave[::-1], [thru[::-1], 2 * thru[::-1]])
+        for key in moments:
+            np.testing.assert_allclose(batch[key][0], moments[key],
+                                       rtol=1e-12)
+        np.testing.assert_allclose(batch['thru'][1], 2 * moments['thru'],
+                                   rtol=1e-12)
+
     @pytest.mark.parametrize(('a'), [np.array([]), np.array([1])])
     def test_zero_ans(self, a):
         """Test that empty and single-element arrays return zero."""
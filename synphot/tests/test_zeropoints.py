@@ -0,0 +1,121 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""Test zeropoints.py module."""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+# STDLIB
+import json
+import os
+import shutil
+import tempfile
+
+# THIRD-PARTY
+import numpy as np
+
+# ASTROPY
+from astropy import units as u
+from astropy.tests.helper import pytest
+from astropy.utils.data import get_pkg_data_filename
+
+# LOCAL
+from .. import config, exceptions, spectrum, units, zeropoints
+from ..observation import Observation
+
+
+# HST primary mirror
+_area = u.Quantity(45238.93416, units.AREA)
+
+# Test data files
+_bandfile = get_pkg_data_filename(
+    os.path.join('data', 'hst_acs_hrc_f555w.fits'))
+_specfile = get_pkg_data_filename(
+    os.path.join('data', 'hst_acs_hrc_f555w_x_grw70d5824.fits'))
+
+
+class TestZeropoints(object):
+    """Test Vega zero points with a fake Vega spectrum."""
+    def setup_class(self):
+        self.outdir = tempfile.mkdtemp()
+        self.zptfile = os.path.join(self.outdir, 'zpt.json')
+        config.VEGA_ZPT_FILE.set(self.zptfile)
+        zeropoints.clear_zeropoints()
+
+        wave = np.arange(1000, 12000, 10, dtype=np.float64)
+        self.vspec = spectrum.SourceSpectrum(
+            wave, u.Quantity(3.6e-9 * (wave / 5500) ** -2, units.FLAM),
+            area=_area, header={'filename': 'fake_vega.fits'})
+        self.bp = spectrum.SpectralElement.from_file(_bandfile, area=_area)
+
+    def test_effstim(self):
+        ans = Observation.from_spec_band(self.vspec, self.bp).effstim(
+            flux_unit=units.FLAM, band=self.bp)
+        zpt = zeropoints.vega_effstim(self.bp, self.vspec)
+        np.testing.assert_allclose(zpt, ans.value)
+
+        # Stored on disk and reloaded from there
+        with open(self.zptfile) as fin:
+            assert zpt in json.load(fin).values()
+        zeropoints.clear_zeropoints()
+        assert zeropoints.vega_effstim(self.bp, self.vspec) == zpt
+
+    def test_integral(self):
+        sp = self.vspec * self.bp
+        sp.convert_flux(units.PHOTLAM)
+        np.testing.assert_allclose(
+            zeropoints.vega_integral(self.bp, self.vspec),
+            sp.integrate().value)
+
+    def test_obs_vegamag(self):
+        obs = Observation.from_file(_specfile, area=_area)
+        eff_stim = obs.effstim(
+            flux_unit=units.VEGAMAG, band=self.bp, vegaspec=self.vspec)
+        ans = -2.5 * np.log10(
+            obs.effstim(flux_unit=units.FLAM, band=self.bp).value /
+            zeropoints.vega_effstim(self.bp, self.vspec))
+        np.testing.assert_allclose(eff_stim.value, ans)
+        assert eff_stim.unit == units.VEGAMAG
+
+    def test_fingerprint(self):
+        zpt = zeropoints.vega_effstim(self.bp, self.vspec)
+        bp2 = self.bp * 0.5
+        assert bp2.fingerprint != self.bp.fingerprint
+        np.testing.assert_allclose(
+            zeropoints.vega_effstim(bp2, self.vspec), zpt)
+        assert (zeropoints.vega_integral(bp2, self.vspec) !=
+                zeropoints.vega_integral(self.bp, self.vspec))
+
+    def test_shared_file(self):
+        zpt = zeropoints.vega_effstim(self.bp, self.vspec)
+
+        # Another process saves a zero point to the same file
+        with open(self.zptfile) as fin:
+            zpts = json.load(fin)
+        zpts['other:key'] = 1.0
+        with open(self.zptfile, 'w') as fout:
+            json.dump(zpts, fout)
+
+        # It is kept when a new zero point is saved ...
+        bp2 = self.bp * 0.25
+        zeropoints.vega_integral(bp2, self.vspec)
+        with open(self.zptfile) as fin:
+            zpts = json.load(fin)
+        assert zpts['other:key'] == 1.0
+        assert zpt in zpts.values()
+
+        # Zero points saved by others later are used instead of being
+        # calculated again
+        zpts['other:key2'] = 2.0
+        with open(self.zptfile, 'w') as fout:
+            json.dump(zpts, fout)
+        assert zeropoints._get_zeropoint('other:key2', None) == 2.0
+
+    def test_exceptions(self):
+        with pytest.raises(exceptions.SynphotError):
+            zeropoints.vega_effstim(self.bp, None)
+        with pytest.raises(exceptions.SynphotError):
+            zeropoints.vega_effstim(self.vspec, self.vspec)
+
+    def teardown_class(self):
+        zeropoints.clear_zeropoints(remove_file=True)
+        config.VEGA_ZPT_FILE.set('')
+        zeropoints.clear_zeropoints()
+        shutil.rmtree(self.outdir)
@@ -16,8 +16,8 @@ from . import exceptions
 __all__ = ['H', 'C', 'HC', 'AREA', 'THROUGHPUT', 'PHOTLAM', 'PHOTNU', 'FLAM',
            'FNU', 'STMAG', 'ABMAG', 'OBMAG', 'VEGAMAG', 'ABZERO', 'STZERO',
            'spectral_density_mag', 'spectral_density_vega',
-           'spectral_density_count', 'convert_flux', 'validate_unit',
-           'validate_quantity']
+           'spectral_density_count', 'get_conversion_kernel', 'convert_flux',
+           'validate_unit', 'validate_quantity']
 
 
 #-------------------#
@@ -172,8 +172,9 @@ def spectral_density_count(wav, area):
 
     wav = wav.to(u.AA, equivalencies=u.spectral())
     area = area.to(AREA)
-    bin_widths = calculate_bin_widths(calculate_bin_edges(wav))
-    factor = bin_widths.value * area.value
+    factor = calculate_bin_widths(
+        calculate_bin_edges(wav.value, as_quantity=False), as_quantity=False)
+    factor *= area.value
 
     def converter_count(x):
         return x * factor
@@ -191,9 +192,171 @@ def spectral_density_count(wav, area):
             (PHOTLAM, OBMAG, converter_obmag, iconverter_obmag)]
 
 
-def convert_flux(wavelengths, fluxes, out_flux_unit, **kwargs):
+def _photlam_relation(unit, unit_name):
+    """Relation of given flux unit with PHOTLAM for wavelengths in
+    Angstrom, i.e., ``flux = scale * wave**power * photlam`` for
+    linear flux density and
+    ``flux = -2.5 * log10(scale * wave**power * photlam) + zero``
+    for STMAG and ABMAG.
+
+    Returns
+    -------
+    rel : tuple or `None`
+        ``(scale, power, zero)``, where ``zero`` is `None` for linear
+        flux density. `None` if the unit needs more than wavelengths
+        to convert (e.g., count, OBMAG, and VEGAMAG).
+
+    """
+    if unit_name == STMAG.to_string():
+        return HC.value, -1, STZERO.value
+    elif unit_name == ABMAG.to_string():
+        return H.value, 1, ABZERO.value
+    elif unit.decompose() == u.mag or unit.physical_type == 'unknown':
+        return None
+
+    for ref_unit, scale, power in ((PHOTLAM, 1.0, 0),
+                                   (FLAM, HC.value, -1),
+                                   (PHOTNU, 1.0 / C.value, 2),
+                                   (FNU, H.value, 1)):
+        if unit.is_equivalent(ref_unit):
+            return scale * ref_unit.to(unit), power, None
+
+    return None
+
+
+class _ConversionKernel(object):
+    """Flux conversion between two units that only depends on
+    wavelengths, expressed as NumPy operations on values.
+
+    See :func:`get_conversion_kernel`.
+
+    """
+    def __init__(self, in_rel, out_rel):
+        self.scale = out_rel[0] / in_rel[0]
+        self.power = out_rel[1] - in_rel[1]
+        self.in_zero = in_rel[2]
+        self.out_zero = out_rel[2]
+
+    def __call__(self, wavelengths, fluxes, out=None):
+        """Convert flux values.
+
+        Parameters
+        ----------
+        wavelengths : array_like
+            Wavelength values in Angstrom.
+
+        fluxes : array_like
+            Flux values in the input unit.
+
+        out : array_like or `None`
+            Array to store the result, which may be ``fluxes``.
+            If `None`, a new array is created, with the precision
+            of ``fluxes``.
+
+        Returns
+        -------
+        out : array_like
+            Flux values in the output unit.
+
+        """
+        # Always calculate in double precision, but return the
+        # precision of the input
+        dtype = _flux_dtype(fluxes)
+        fluxes = np.asarray(fluxes, dtype=np.float64)
+        wave = np.asarray(wavelengths, dtype=np.float64)
+
+        if out is None or out.dtype != np.float64:
+            if self.power != 0:
+                shape = np.broadcast(fluxes, wave).shape
+            else:
+                shape = fluxes.shape
+            result = np.empty(shape, dtype=np.float64)
+        else:
+            result = out
+
+        # Magnitude to linear
+        if self.in_zero is not None:
+            np.subtract(fluxes, self.in_zero, out=result)
+            np.multiply(result, -0.4, out=result)
+            np.power(10.0, result, out=result)
+            np.multiply(result, self.scale, out=result)
+        else:
+            np.multiply(fluxes, self.scale, out=result)
+
+        if self.power != 0:
+            np.multiply(result, wave ** self.power, out=result)
+
+        # Linear to magnitude
+        if self.out_zero is not None:
+            np.log10(result, out=result)
+            np.multiply(result, -2.5, out=result)
+            np.add(result, self.out_zero, out=result)
+
+        if out is None:
+            out = result.astype(dtype)
+        elif out is not result:
+            out[...] = result
+
+        return out
+
+
+def _flux_dtype(fluxes):
+    """Precision of converted fluxes, which is that of the input
+    fluxes, or double precision if they are not floating-point."""
+    dtype = np.asarray(fluxes).dtype
+    if not np.issubdtype(dtype, np.floating):
+        dtype = np.dtype(np.float64)
+    return dtype
+
+
+# Conversion kernels, see get_conversion_kernel()
+_KERNELS = {}
+
+
+def get_conversion_kernel(in_flux_unit, out_flux_unit):
+    """Get cached kernel for flux conversion between two units.
+
+    Conversion between any linear flux density units, STMAG, and
+    ABMAG only depends on wavelengths. It is resolved once per pair
+    of units into a scale factor, a power of wavelength, and
+    magnitude zero points. The returned kernel applies them directly
+    to value arrays, i.e., ``kernel(wave, fluxes, out=None)``, where
+    ``wave`` is in Angstrom and ``out`` is an optional output array.
+
+    Parameters
+    ----------
+    in_flux_unit, out_flux_unit : str or `astropy.units.core.Unit`
+        Input and output flux units.
+
+    Returns
+    -------
+    kernel : callable or `None`
+        Conversion kernel. `None` if conversion needs more than
+        wavelengths (e.g., count, OBMAG, and VEGAMAG).
+
+    """
+    in_flux_unit = validate_unit(in_flux_unit)
+    out_flux_unit = validate_unit(out_flux_unit)
+    key = (in_flux_unit.to_string(), out_flux_unit.to_string())
+
+    if key not in _KERNELS:
+        in_rel = _photlam_relation(in_flux_unit, key[0])
+        out_rel = _photlam_relation(out_flux_unit, key[1])
+
+        if in_rel is None or out_rel is None:
+            _KERNELS[key] = None
+        else:
+            _KERNELS[key] = _ConversionKernel(in_rel, out_rel)
+
+    return _KERNELS[key]
+
+
+def convert_flux(wavelengths, fluxes, out_flux_unit, out=None, **kwargs):
     """Perform :ref:`flux conversion <synphot-flux-conversion>`.
 
+    Conversions that only depend on wavelengths use the kernels
+    from :func:`get_conversion_kernel`.
+
     Parameters
     ----------
     wavelengths : array_like or `astropy.units.quantity.Quantity`
@@ -215,6 +378,10 @@ def convert_flux(wavelengths, fluxes, out_flux_unit, **kwargs):
         Vega spectrum from :func:`synphot.spectrum.SourceSpectrum.from_vega`.
         This is *only* used for conversions involving VEGAMAG.
 
+    out : array_like or `None`
+        Array to store the converted flux values, which may be
+        the input values. If `None`, a new array is created.
+
     Returns
     -------
     out_flux : `astropy.units.quantity.Quantity`
@@ -233,51 +400,68 @@ def convert_flux(wavelengths, fluxes, out_flux_unit, **kwargs):
         fluxes = u.Quantity(fluxes, unit=PHOTLAM)
 
     out_flux_unit = validate_unit(out_flux_unit)
-    out_flux_unit_name = out_flux_unit.to_string()
-    in_flux_unit_name = fluxes.unit.to_string()
 
     # No conversion necessary
-    if in_flux_unit_name == out_flux_unit_name:
-        return fluxes
-
-    in_flux_type = fluxes.unit.physical_type
-    out_flux_type = out_flux_unit.physical_type
+    if fluxes.unit.to_string() == out_flux_unit.to_string():
+        if out is None:
+            return fluxes
+        out[...] = fluxes.value
+        return u.Quantity(out, unit=out_flux_unit, copy=False)
 
     # Wavelengths must Quantity
     if not isinstance(wavelengths, u.Quantity):
         wavelengths = u.Quantity(wavelengths, unit=u.AA)
 
-    # Use built-in astropy equivalencies
-    if in_flux_type != 'unknown' and out_flux_type != 'unknown':
-        return fluxes.to(
-            out_flux_unit, equivalencies=u.spectral_density(wavelengths))
+    if wavelengths.unit == u.AA:
+        wave = wavelengths.value
+    else:
+        wave = wavelengths.to(u.AA, equivalencies=u.spectral()).value
+
+    # Direct conversion
+    kernel = get_conversion_kernel(fluxes.unit, out_flux_unit)
+    if kernel is not None:
+        return u.Quantity(kernel(wave, fluxes.value, out=out),
+                          unit=out_flux_unit, copy=False)
+
+    # Keep PHOTLAM in double precision, and only round the result
+    # to the precision of the input
+    dtype = _flux_dtype(fluxes.value)
 
     # Convert input unit to PHOTLAM
-    if fluxes.unit == PHOTLAM:
-        flux_photlam = fluxes
-    elif in_flux_type != 'unknown':
-        flux_photlam = fluxes.to(
-            PHOTLAM, equivalencies=u.spectral_density(wavelengths))
+    kernel = get_conversion_kernel(fluxes.unit, PHOTLAM)
+    if kernel is not None:
+        flux_photlam = u.Quantity(
+            kernel(wave, np.asarray(fluxes.value, dtype=np.float64)),
+            unit=PHOTLAM, copy=False)
     else:
         flux_photlam = _convert_flux(wavelengths, fluxes, PHOTLAM, **kwargs)
 
     # Convert PHOTLAM to output unit
-    if out_flux_unit == PHOTLAM:
-        out_flux = flux_photlam
-    elif out_flux_type != 'unknown':
-        out_flux = flux_photlam.to(
-            out_flux_unit, equivalencies=u.spectral_density(wavelengths))
+    kernel = get_conversion_kernel(PHOTLAM, out_flux_unit)
+    if kernel is not None:
+        out_flux = u.Quantity(kernel(wave, flux_photlam.value, out=out),
+                              unit=out_flux_unit, copy=False)
     else:
         out_flux = _convert_flux(
             wavelengths, flux_photlam, out_flux_unit, **kwargs)
+        if out is not None:
+            out[...] = out_flux.value
+            out_flux = u.Quantity(out, unit=out_flux_unit, copy=False)
+
+    if out is None and out_flux.dtype != dtype:
+        out_flux = u.Quantity(out_flux, dtype=dtype)
 
     return out_flux
 
 
 def _convert_flux(wavelengths, fluxes, out_flux_unit, area=None, vegaspec=None):
-    """Flux conversion for PHOTLAM <-> X."""
+    """Flux conversion for PHOTLAM <-> X, in double precision."""
     flux_unit_names = (fluxes.unit.to_string(), out_flux_unit.to_string())
 
+    # Always calculate in double precision
+    if fluxes.dtype != np.float64:
+        fluxes = u.Quantity(fluxes.value.astype(np.float64), unit=fluxes.unit)
+
     if PHOTLAM.to_string() not in flux_unit_names:
         raise exceptions.SynphotError(
             'PHOTLAM must be one of the conversion units but get '
@@ -6,15 +6,20 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import numpy as np
 
 # ASTROPY
+from astropy import log
 from astropy import units as u
 
 # LOCAL
-from . import exceptions, units
+from . import config, exceptions, units
 
 
 __all__ = ['overlap_status', 'validate_totalflux', 'validate_wavelengths',
-           'to_length', 'generate_wavelengths', 'merge_wavelengths',
-           'trapezoid_integration', 'avg_wavelength', 'barlam']
+           'validate_precision',
+           'to_length', 'generate_wavelengths', 'adaptive_wavelengths',
+           'merge_wavelengths',
+           'interpolation_weights', 'trapezoid_weights',
+           'trapezoid_integration', 'avg_wavelength', 'barlam',
+           'band_moments']
 
 
 def overlap_status(a, b):
@@ -136,6 +141,39 @@ def validate_wavelengths(wavelengths):
                 rows=np.where(dw == 0)[0])
 
 
+def validate_precision(precision=None):
+    """Check flux precision mode.
+
+    Parameters
+    ----------
+    precision : {`None`, 'single', 'double'}
+        Precision mode. If `None`, use
+        :data:`synphot.config.FLUX_PRECISION`.
+
+    Returns
+    -------
+    precision : {'single', 'double'}
+        Validated precision mode.
+
+    Raises
+    ------
+    synphot.exceptions.SynphotError
+        Invalid precision mode.
+
+    """
+    if precision is None:
+        precision = config.FLUX_PRECISION()
+
+    precision = precision.lower()
+
+    if precision not in ('single', 'double'):
+        raise exceptions.SynphotError(
+            'precision={0} is invalid, must be "single" or '
+            '"double"'.format(precision))
+
+    return precision
+
+
 def to_length(wavelengths, wave_unit=u.AA):
     """Ensure wavelengths are of length type.
 
@@ -232,6 +270,101 @@ def generate_wavelengths(minwave=500, maxwave=26000, num=10000, delta=None,
     return u.Quantity(waveset, unit=wave_unit, dtype=np.float64), waveset_str
 
 
+def adaptive_wavelengths(func, minwave, maxwave, rtol=1e-4, breakpoints=None,
+                         max_points=100000):
+    """Generate wavelengths that sample a function such that its
+    trapezoid integral has the given relative error, by refining
+    only where the function is not linear enough.
+
+    Each interval is compared with the trapezoid of its two halves,
+    using the function value at its midpoint. Intervals are bisected
+    until the sum of these differences is within the tolerance.
+
+    Parameters
+    ----------
+    func : callable
+        Function of wavelength values that returns an array of the
+        same length, or of shape ``(n_wave, n_sets)`` for a function
+        with multiple parameter sets.
+
+    minwave, maxwave : float
+        Lower and upper limits of the wavelengths.
+
+    rtol : float
+        Relative integration error, with respect to the integral
+        of the absolute value of the function (for each parameter set).
+
+    breakpoints : array_like or `None`
+        Wavelengths that must be included, such as discontinuities
+        and locations of features narrower than the initial grid.
+        Those outside of the limits are ignored.
+
+    max_points : int
+        Refinement stops with a warning when the number of
+        wavelengths reaches this number.
+
+    Returns
+    -------
+    waveset : array_like
+        Sorted wavelength values, including the limits.
+
+    Raises
+    ------
+    synphot.exceptions.SynphotError
+        Invalid inputs.
+
+    """
+    if not minwave < maxwave:
+        raise exceptions.SynphotError('Invalid wavelength range.')
+    if not rtol > 0:
+        raise exceptions.SynphotError('Relative tolerance must be positive.')
+
+    waveset = np.array([minwave, maxwave], dtype=np.float64)
+    if breakpoints is not None:
+        breakpoints = np.asarray(breakpoints, dtype=np.float64).ravel()
+        waveset = np.union1d(waveset, breakpoints[
+            (breakpoints > minwave) & (breakpoints < maxwave)])
+
+    values = np.asarray(func(waveset), dtype=np.float64).reshape(
+        waveset.size, -1)
+
+    while waveset.size < max_points:
+        midwave = 0.5 * (waveset[1:] + waveset[:-1])
+        midvalues = np.asarray(func(midwave), dtype=np.float64).reshape(
+            midwave.size, -1)
+        dx = (waveset[1:] - waveset[:-1])[:, np.newaxis]
+
+        # Trapezoid of each interval minus that of its halves, times 2
+        err = np.abs(0.5 * (values[1:] + values[:-1]) - midvalues) * dx
+
+        # Allowed error for each parameter set. Nothing to refine
+        # for functions that are zero everywhere.
+        tol = rtol * np.sum(0.25 * dx * (np.abs(values[1:]) +
+                                         np.abs(values[:-1]) +
+                                         2 * np.abs(midvalues)), axis=0)
+        tol[tol == 0] = np.inf
+
+        if np.all(err.sum(axis=0) <= tol):
+            break
+
+        # Bisect intervals with more than their share of the error,
+        # down to floating point resolution
+        i_refine = np.where(
+            np.any(err > tol / dx.size, axis=1) &
+            (midwave > waveset[:-1]) & (midwave < waveset[1:]))[0]
+        if i_refine.size == 0:
+            break
+
+        waveset = np.insert(waveset, i_refine + 1, midwave[i_refine])
+        values = np.insert(values, i_refine + 1, midvalues[i_refine], axis=0)
+
+    else:
+        log.warn('Maximum number of wavelengths ({0}) is reached before '
+                 'achieving relative error of {1}.'.format(max_points, rtol))
+
+    return waveset
+
+
 def merge_wavelengths(waveset1, waveset2, threshold=1e-12):
     """Return the union of the two sets of wavelengths using
     :func:`numpy.union1d`.
@@ -271,6 +404,78 @@ def merge_wavelengths(waveset1, waveset2, threshold=1e-12):
     return out_wavelengths
 
 
+def interpolation_weights(new_x, old_x):
+    """Express linear interpolation as sparse weights.
+
+    This is the linear operator behind :func:`numpy.interp`,
+    including its constant extrapolation beyond the ends of ``old_x``.
+    That is, for any ``y`` sampled at ``old_x``::
+
+        np.interp(new_x, old_x, y) == w_lo * y[i_lo] + w_hi * y[i_hi]
+
+    Parameters
+    ----------
+    new_x : array_like
+        Values to interpolate at.
+
+    old_x : array_like
+        Values being interpolated from. Must be in ascending order,
+        with at least one value.
+
+    Returns
+    -------
+    i_lo, i_hi : array_like
+        Indices of ``old_x`` bracketing each ``new_x``.
+
+    w_lo, w_hi : array_like
+        Weights associated with ``i_lo`` and ``i_hi``, respectively.
+
+    """
+    new_x = np.asarray(new_x, dtype=np.float64)
+    old_x = np.asarray(old_x, dtype=np.float64)
+
+    i_hi = np.clip(np.searchsorted(old_x, new_x, side='right'),
+                   1, max(old_x.size - 1, 1))
+    i_lo = i_hi - 1
+
+    if old_x.size == 1:
+        i_hi = i_lo
+        w_hi = np.zeros(new_x.shape, dtype=np.float64)
+    else:
+        w_hi = np.clip(
+            (new_x - old_x[i_lo]) / (old_x[i_hi] - old_x[i_lo]), 0.0, 1.0)
+
+    return i_lo, i_hi, 1.0 - w_hi, w_hi
+
+
+def trapezoid_weights(x):
+    """Weights that turn trapezoid integration into a dot product.
+
+    For any ``y`` sampled at ascending ``x``, ``np.dot(weights, y)`` is
+    the same integral as :func:`trapezoid_integration`.
+
+    Parameters
+    ----------
+    x : array_like
+        Wavelength values in ascending order.
+
+    Returns
+    -------
+    weights : array_like
+        Integration weights associated with ``x``.
+
+    """
+    x = np.asarray(x, dtype=np.float64)
+    weights = np.zeros(x.shape, dtype=np.float64)
+
+    if x.size > 1:
+        dx = 0.5 * (x[1:] - x[:-1])
+        weights[:-1] += dx
+        weights[1:] += dx
+
+    return weights
+
+
 def trapezoid_integration(x, y):
     """Perform trapezoid integration for spectrum data.
 
@@ -348,3 +553,73 @@ def barlam(wave, flux):
         bar_lam = np.exp(num / den)
 
     return bar_lam
+
+
+def band_moments(wave, thru, ref_wave=None):
+    """Calculate, in one pass, the trapezoid integrals of throughput
+    that passband properties need (e.g., pivot wavelength, RMS width,
+    and equivalent width).
+
+    The integrals are taken about a reference wavelength,
+    :math:`\\lambda_{0}`, inside the passband. Thus, widths calculated
+    from them do not lose precision for narrow passbands.
+
+    Parameters
+    ----------
+    wave : array_like
+        Wavelength values, in ascending or descending order.
+
+    thru : array_like
+        Throughput values. For many passbands sampled at the same
+        wavelengths, this has the shape ``(P, N)``, where ``N`` is
+        the number of wavelengths.
+
+    ref_wave : float, array_like, or `None`
+        Reference wavelength(s), in the unit of ``wave``.
+        If `None`, wavelength at peak throughput of each passband.
+
+    Returns
+    -------
+    moments : dict
+        Integrals over :math:`\\lambda`, one value per passband:
+
+            * 'ref_wave' - :math:`\\lambda_{0}`
+            * 'thru' - :math:`T`
+            * 'wave' - :math:`T (\\lambda - \\lambda_{0})`
+            * 'wave2' - :math:`T (\\lambda - \\lambda_{0})^{2}`
+            * 'thru_per_wave' - :math:`T / \\lambda`
+            * 'logwave' - :math:`T \\ln (\\lambda / \\lambda_{0}) / \\lambda`
+            * 'logwave2' - :math:`T \\ln^{2} (\\lambda / \\lambda_{0}) / \\lambda`
+
+    """
+    wave = np.asarray(wave, dtype=np.float64)
+    thru = np.asarray(thru, dtype=np.float64)
+
+    # Same sign convention as trapezoid_integration()
+    weights = trapezoid_weights(wave)
+    if wave.size > 1 and wave[-1] < wave[0]:
+        weights *= -1
+
+    if ref_wave is None:
+        ref_wave = wave[np.argmax(thru, axis=-1)]
+    ref_wave = np.asarray(ref_wave, dtype=np.float64)
+
+    shape = thru.shape[:-1] + (6, wave.size)
+    terms = np.empty(shape, dtype=np.float64)
+    terms[..., 0, :] = 1.0
+    np.subtract(wave, ref_wave[..., np.newaxis], out=terms[..., 1, :])
+    np.multiply(terms[..., 1, :], terms[..., 1, :], out=terms[..., 2, :])
+    terms[..., 3, :] = 1.0 / wave
+    np.log(wave / ref_wave[..., np.newaxis], out=terms[..., 4, :])
+    np.multiply(terms[..., 4, :], terms[..., 4, :], out=terms[..., 5, :])
+    terms[..., 4:, :] *= terms[..., 3:4, :]
+
+    sums = np.einsum('...kn,...n->...k', terms, thru * weights)
+
+    return {'ref_wave': ref_wave,
+            'thru': sums[..., 0],
+            'wave': sums[..., 1],
+            'wave2': sums[..., 2],
+            'thru_per_wave': sums[..., 3],
+            'logwave': sums[..., 4],
+            'logwave2': sums[..., 5]}
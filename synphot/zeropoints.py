@@ -0,0 +1,251 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""This module handles Vega zero points of passbands.
+
+VEGAMAG calculations need integrals of Vega spectrum through
+a passband, which only depend on the passband and Vega. Each
+integral is calculated once, kept in memory, and also stored in
+a JSON file given by :data:`synphot.config.VEGA_ZPT_FILE` so it
+can be reused by later sessions.
+
+Integrals are keyed by :attr:`synphot.spectrum.BaseSpectrum.fingerprint`
+of passband and Vega, so a modified passband or a different Vega
+file never uses a stale value.
+
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+# STDLIB
+import json
+import os
+import tempfile
+
+# ASTROPY
+from astropy import log
+from astropy import units as u
+from astropy.config.paths import get_cache_dir
+
+# LOCAL
+from . import config, exceptions, units, utils
+
+
+__all__ = ['get_zpt_filename', 'vega_effstim', 'vega_integral',
+           'clear_zeropoints']
+
+# Zero points loaded from or to be saved to file
+_ZEROPOINTS = {}
+_LOADED_FROM = [None]
+
+
+def get_zpt_filename():
+    """Get the filename where Vega zero points are stored.
+
+    Returns
+    -------
+    filename : str or `None`
+        Value of :data:`synphot.config.VEGA_ZPT_FILE`, or
+        ``synphot_vega_zpt.json`` in Astropy cache directory if not
+        set. It is `None` if configured as ``'none'``, in which case
+        zero points are only kept in memory.
+
+    """
+    filename = config.VEGA_ZPT_FILE()
+
+    if not filename:
+        filename = os.path.join(get_cache_dir(), 'synphot_vega_zpt.json')
+    elif filename.lower() == 'none':
+        filename = None
+
+    return filename
+
+
+def _read(filename):
+    """Read zero points from file, if any."""
+    if filename is None or not os.path.isfile(filename):
+        return {}
+
+    try:
+        with open(filename) as fin:
+            zeropoints = json.load(fin)
+    except (IOError, OSError, ValueError) as e:
+        log.warn('Vega zero points not loaded from {0}: {1}'.format(
+            filename, e))
+        zeropoints = {}
+
+    return zeropoints
+
+
+def _load(filename):
+    """Load zero points from file, once per filename."""
+    if filename == _LOADED_FROM[0]:
+        return
+
+    _ZEROPOINTS.clear()
+    _LOADED_FROM[0] = filename
+    _ZEROPOINTS.update(_read(filename))
+
+
+def _save(filename):
+    """Save zero points to file, replacing it atomically.
+
+    Zero points saved to the file by other processes since it was
+    loaded are merged in first, so they are not dropped.
+
+    """
+    if filename is None:
+        return
+
+    for key, val in _read(filename).items():
+        _ZEROPOINTS.setdefault(key, val)
+
+    try:
+        dirname = os.path.dirname(os.path.abspath(filename))
+        fd, tmpname = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+        with os.fdopen(fd, 'w') as fout:
+            json.dump(_ZEROPOINTS, fout, indent=0, sort_keys=True)
+        os.rename(tmpname, filename)
+    except (IOError, OSError) as e:
+        log.warn('Vega zero points not saved to {0}: {1}'.format(
+            filename, e))
+
+
+def _get_zeropoint(key, func):
+    """Return zero point from cache, calculating it if needed."""
+    filename = get_zpt_filename()
+    _load(filename)
+
+    # Another process may have saved it since the file was loaded
+    if key not in _ZEROPOINTS:
+        _ZEROPOINTS.update(_read(filename))
+
+    if key not in _ZEROPOINTS:
+        _ZEROPOINTS[key] = float(func())
+        _save(filename)
+
+    return _ZEROPOINTS[key]
+
+
+def _validate_inputs(band, vegaspec):
+    """Check inputs and return Vega part of zero point key."""
+    from .spectrum import SourceSpectrum, SpectralElement
+
+    if not isinstance(band, SpectralElement):
+        raise exceptions.SynphotError('Missing passband data.')
+
+    if not isinstance(vegaspec, SourceSpectrum):
+        raise exceptions.SynphotError('Vega spectrum is missing.')
+
+    vega_file = os.path.basename(vegaspec.metadata.get('filename', ''))
+
+    return '{0}:{1}'.format(vega_file, vegaspec.fingerprint)
+
+
+def vega_effstim(band, vegaspec):
+    """Calculate :ref:`effective stimulus <synphot-formula-effstim>`
+    of Vega through the passband in FLAM.
+
+    This is the zero point used by
+    :func:`synphot.observation.Observation.effstim` for VEGAMAG.
+
+    Parameters
+    ----------
+    band : `synphot.spectrum.SpectralElement`
+        Passband.
+
+    vegaspec : `synphot.spectrum.SourceSpectrum`
+        Vega spectrum from
+        :func:`synphot.spectrum.SourceSpectrum.from_vega`.
+
+    Returns
+    -------
+    eff_stim : float
+        Vega effective stimulus in FLAM.
+
+    Raises
+    ------
+    synphot.exceptions.SynphotError
+        Invalid inputs or calculation failed.
+
+    """
+    vega_key = _validate_inputs(band, vegaspec)
+    key = 'effstim:{0}:{1}'.format(band.fingerprint, vega_key)
+
+    def _calc():
+        sp = vegaspec * band
+        wave = sp.wave.to(u.AA, equivalencies=u.spectral())
+        flux = units.convert_flux(wave, sp.flux, units.FLAM)
+        band_wave = band.wave.to(u.AA, equivalencies=u.spectral()).value
+
+        num = utils.trapezoid_integration(wave.value, wave.value * flux.value)
+        den = utils.trapezoid_integration(
+            band_wave, band_wave * band.thru.value)
+        utils.validate_totalflux(num)
+        utils.validate_totalflux(den)
+
+        return num / den
+
+    return _get_zeropoint(key, _calc)
+
+
+def vega_integral(band, vegaspec, flux_unit=units.PHOTLAM, wave_unit=u.AA):
+    """Integrate Vega through the passband, i.e.,
+    :math:`\\int f_{Vega} T d\\lambda`.
+
+    This is the standard flux used by
+    :func:`synphot.spectrum.SourceSpectrum.renorm` for VEGAMAG.
+
+    Parameters
+    ----------
+    band : `synphot.spectrum.SpectralElement`
+        Passband.
+
+    vegaspec : `synphot.spectrum.SourceSpectrum`
+        Vega spectrum from
+        :func:`synphot.spectrum.SourceSpectrum.from_vega`.
+
+    flux_unit, wave_unit : str or `astropy.units.core.Unit`
+        Flux density and wavelength units for integration.
+        Defaults are PHOTLAM and Angstrom.
+
+    Returns
+    -------
+    result : float
+        Integrated flux in ``flux_unit`` times ``wave_unit``.
+
+    Raises
+    ------
+    synphot.exceptions.SynphotError
+        Invalid inputs or calculation failed.
+
+    """
+    vega_key = _validate_inputs(band, vegaspec)
+    flux_unit = units.validate_unit(flux_unit)
+    wave_unit = units.validate_unit(wave_unit)
+    key = 'integral:{0}:{1}:{2}:{3}'.format(
+        band.fingerprint, vega_key, flux_unit.to_string(),
+        wave_unit.to_string())
+
+    def _calc():
+        sp = vegaspec * band
+        sp.convert_flux(flux_unit)
+        sp.convert_wave(wave_unit)
+        return sp.integrate().value
+
+    return _get_zeropoint(key, _calc)
+
+
+def clear_zeropoints(remove_file=False):
+    """Clear Vega zero points kept in memory.
+
+    Parameters
+    ----------
+    remove_file : bool
+        Also delete the file given by :func:`get_zpt_filename`.
+
+    """
+    _ZEROPOINTS.clear()
+    _LOADED_FROM[0] = None
+
+    if remove_file:
+        filename = get_zpt_filename()
+        if filename is not None and os.path.isfile(filename):
+            os.remove(filename)